@@ -58,11 +58,16 @@
         'views/cowork_tag_views.xml',
         'views/cowork_membership_plan_views.xml',
         'views/cowork_membership_views.xml',
+        'views/cowork_space_reservation_views.xml',
         'views/cowork_access_request_views.xml',
+        'views/cowork_access_request_series_views.xml',
         'views/cowork_security_deposit_views.xml',
         'views/cowork_rating_views.xml',
         'views/cowork_credits_views.xml',
         'views/cowork_passes_views.xml',
+        'views/cowork_call_room_hours_views.xml',
+        'views/cowork_ledger_checkpoint_views.xml',
+        'views/cowork_notification_outbox_views.xml',
         'views/res_partner_views.xml',
         'views/crm_lead_views.xml',
         'views/sale_order_views.xml',
@@ -70,6 +75,9 @@
         # Wizards
         'wizard/mass_mail_wizard_views.xml',
         'wizard/member_card_wizard_views.xml',
+        'wizard/cowork_grant_bulk_wizard_views.xml',
+        'wizard/cowork_renew_batch_wizard_views.xml',
+        'wizard/cowork_allocate_spaces_wizard_views.xml',
         
         # Reports
         'report/membership_report.xml',
@@ -1,6 +1,6 @@
 # -*- coding: utf-8 -*-
 
-from odoo import http, _
+from odoo import fields, http, _
 from odoo.http import request
 from odoo.addons.portal.controllers.portal import CustomerPortal
 
@@ -31,3 +31,18 @@ class CoworkPortal(CustomerPortal):
         
         # Redirect to the Sale Order for payment
         return request.redirect(so.get_portal_url())
+
+    @http.route(['/cowork/availability'], type='json', auth="user", website=True)
+    def cowork_availability(self, service_ids, start, end, granularity=None, **kwargs):
+        """Intervalos libres por servicio (fechas UTC en formato 'YYYY-MM-DD HH:MM:SS')"""
+        services = request.env['cowork.service'].sudo().browse(
+            [int(service_id) for service_id in service_ids]).exists().filtered('active')
+        slots = services.available_slots(
+            services.ids, start, end, granularity=int(granularity) if granularity else None)
+        return {
+            service_id: [
+                {'start': fields.Datetime.to_string(slot_start), 'end': fields.Datetime.to_string(slot_end)}
+                for slot_start, slot_end in intervals
+            ]
+            for service_id, intervals in slots.items()
+        }
@@ -1,5 +1,6 @@
 # -*- coding: utf-8 -*-
 
+from . import cowork_bulk_mixin
 from . import cowork_floor
 from . import cowork_desk
 from . import cowork_bed
@@ -9,10 +10,19 @@ from . import cowork_policy
 from . import cowork_tag
 from . import cowork_membership_plan
 from . import cowork_membership
+from . import cowork_space_reservation
+from . import cowork_space_allocator
 from . import cowork_access_request
+from . import cowork_access_request_series
 from . import cowork_security_deposit
 from . import cowork_rating
 from . import cowork_credits
 from . import cowork_passes
+from . import cowork_call_room_hours
+from . import cowork_ledger_checkpoint
+from . import cowork_spending_lock
+from . import cowork_notification_outbox
+from . import cowork_kpi_snapshot
+from . import cowork_credits_liability_report
 from . import res_partner
 from . import crm_lead
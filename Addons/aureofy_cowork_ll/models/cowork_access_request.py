@@ -8,7 +8,7 @@ from odoo.exceptions import UserError, ValidationError
 class CoworkAccessRequest(models.Model):
     _name = 'cowork.access.request'
     _description = 'Solicitud de Acceso a Servicio'
-    _inherit = ['mail.thread', 'mail.activity.mixin']
+    _inherit = ['mail.thread', 'mail.activity.mixin', 'cowork.bulk.mixin']
     _order = 'date_request desc'
 
     name = fields.Char(string='Referencia', readonly=True, copy=False,
@@ -27,6 +27,7 @@ class CoworkAccessRequest(models.Model):
                                     default=fields.Datetime.now, readonly=True)
     date_scheduled = fields.Datetime(string='Fecha Programada', required=True)
     duration_hours = fields.Float(string='Duración (horas)', default=1.0)
+    date_end = fields.Datetime(string='Fecha de Fin', compute='_compute_date_end', store=True)
     
     state = fields.Selection([
         ('draft', 'Borrador'),
@@ -82,10 +83,23 @@ class CoworkAccessRequest(models.Model):
     rejection_reason = fields.Text(string='Motivo de Rechazo')
     
     user_id = fields.Many2one('res.users', string='Aprobador')
+    series_id = fields.Many2one('cowork.access.request.series', string='Serie',
+                                 index='btree_not_null', ondelete='set null', copy=False)
     
     company_id = fields.Many2one('res.company', string='Compañía',
                                   default=lambda self: self.env.company)
     
+    def init(self):
+        # Índice de (servicio, rango) para detectar solapes de reservas vigentes
+        # con una sola consulta que solo lee las reservas del mismo servicio
+        self.env.cr.execute("CREATE EXTENSION IF NOT EXISTS btree_gist")
+        self.env.cr.execute("DROP INDEX IF EXISTS cowork_access_request_slot_idx")
+        self.env.cr.execute("""
+            CREATE INDEX IF NOT EXISTS cowork_access_request_service_slot_idx
+                ON cowork_access_request USING gist (service_id, tsrange(date_scheduled, date_end))
+             WHERE state NOT IN ('rejected', 'cancelled')
+        """)
+
     @api.model_create_multi
     def create(self, vals_list):
         for vals in vals_list:
@@ -185,6 +199,14 @@ class CoworkAccessRequest(models.Model):
             else:
                 self.payment_method = 'invoice'
 
+    @api.depends('date_scheduled', 'duration_hours')
+    def _compute_date_end(self):
+        for record in self:
+            if record.date_scheduled:
+                record.date_end = record.date_scheduled + timedelta(hours=record.duration_hours or 0.0)
+            else:
+                record.date_end = False
+
     @api.depends('service_id.price', 'duration_hours')
     def _compute_price(self):
         for record in self:
@@ -206,41 +228,85 @@ class CoworkAccessRequest(models.Model):
 
     @api.constrains('service_id', 'date_scheduled', 'duration_hours', 'state')
     def _check_overlap(self):
-        for record in self:
-            if record.state in ['rejected', 'cancelled'] or not record.date_scheduled:
-                continue
-            
-            start_date = record.date_scheduled
-            end_date = start_date + timedelta(hours=record.duration_hours)
-            
-            domain = [
-                ('id', '!=', record.id),
-                ('service_id', '=', record.service_id.id),
-                ('state', 'not in', ['rejected', 'cancelled']),
-                ('date_scheduled', '<', end_date),
-            ]
-            
-            overlap_candidates = self.search(domain)
-            for candidate in overlap_candidates:
-                candidate_end = candidate.date_scheduled + timedelta(hours=candidate.duration_hours)
-                if candidate_end > start_date:
-                    raise ValidationError(_('El servicio ya está reservado para este horario.'))
-                    
-            # Verificar Pisos Exclusivos
-            # Si reservo un escritorio en un piso exclusivo, debo ser el inquilino exclusivo.
-            # O si reservo el piso entero?
-            # Asumimos que los escritorios tienen floor_id
-            # No tenemos floor_id directo en service, pero quizás en desk relacionado?
-            # cowork_service no tiene link a desk/floor.
-            # Pero cowork_access_request suele ser para services genéricos o específicos?
-            # Faltaría linkear la solicitud a un recurso específico si es "Book a Desk".
-            # Asumiremos que el service_id puede representar un recurso o hay un campo faltante.
-            # Si no hay campo resource_id, no podemos validar exclusive floor aquí fácilmente sin cambiar modelo.
-            # PERO: desk_id está en cowork.membership para asignación fija.
-            # Si esto es "Booking", debería haber un target.
-            # Vamos a asumir que validation global está bien, pero para Exclusive Floors:
-            # Si hay un piso Exclusive Rented, nadie más debería poder reservar recursos ahí.
-            pass
+        bookings = self.filtered(
+            lambda r: r.state not in ['rejected', 'cancelled'] and r.date_scheduled)
+        if not bookings:
+            return
+        bookings._lock_services()
+        self.flush_model(['service_id', 'date_scheduled', 'date_end', 'state'])
+        # Cada reserva con las que se solapan con ella (incluida ella misma)
+        self.env.cr.execute("""
+            SELECT a.id, a.date_scheduled, a.date_end, s.capacity, b.date_scheduled, b.date_end
+              FROM cowork_access_request a
+              JOIN cowork_service s ON s.id = a.service_id
+              JOIN cowork_access_request b
+                ON tsrange(b.date_scheduled, b.date_end) && tsrange(a.date_scheduled, a.date_end)
+               AND b.state NOT IN ('rejected', 'cancelled')
+               AND b.service_id = a.service_id
+             WHERE a.id = ANY(%s)
+        """, [bookings.ids])
+        windows = {}
+        for booking_id, date_start, date_end, capacity, other_start, other_end in self.env.cr.fetchall():
+            window = windows.setdefault(booking_id, (date_start, date_end, capacity or 1, []))
+            window[3].append((other_start, other_end))
+        Service = self.env['cowork.service']
+        for date_start, date_end, capacity, intervals in windows.values():
+            if len(intervals) > capacity and \
+                    Service._peak_occupancy(intervals, date_start, date_end) > capacity:
+                raise ValidationError(_('El servicio ya está reservado para este horario.'))
+
+        # Pisos exclusivos: cowork.service no enlaza escritorios ni pisos, por lo que
+        # la exclusividad se valida en la asignación de la membresía.
+
+    @api.model
+    def _get_conflicting_slots(self, service, intervals):
+        """Devolver los inicios de ``intervals`` que excederían la capacidad del servicio.
+
+        Lee las reservas vigentes que tocan cualquiera de los intervalos
+        ``(inicio, fin)`` en una sola consulta sobre el índice de rangos,
+        bloqueando antes el servicio.
+        """
+        if not intervals:
+            return []
+        self._lock_services(service)
+        self.flush_model(['service_id', 'date_scheduled', 'date_end', 'state'])
+        starts, ends = zip(*intervals)
+        self.env.cr.execute("""
+            SELECT slot.date_start, slot.date_end, b.date_scheduled, b.date_end
+              FROM unnest(%s::timestamp[], %s::timestamp[]) AS slot(date_start, date_end)
+              JOIN cowork_access_request b
+                ON tsrange(b.date_scheduled, b.date_end) && tsrange(slot.date_start, slot.date_end)
+               AND b.state NOT IN ('rejected', 'cancelled')
+               AND b.service_id = %s
+        """, [list(starts), list(ends), service.id])
+        busy = {}
+        for date_start, date_end, other_start, other_end in self.env.cr.fetchall():
+            busy.setdefault((date_start, date_end), [(date_start, date_end)]).append((other_start, other_end))
+        Service = self.env['cowork.service']
+        capacity = service.capacity or 1
+        return sorted(
+            date_start for (date_start, date_end), slot_intervals in busy.items()
+            if Service._peak_occupancy(slot_intervals, date_start, date_end) > capacity
+        )
+
+    def _lock_services(self, services=None):
+        """Serializar las reservas de los servicios hasta el fin de la transacción.
+
+        Igual que ``cowork.spending.lock``: la fila del servicio se actualiza en
+        lugar de solo bloquearse, de modo que con REPEATABLE READ una reserva
+        concurrente ya confirmada provoca un error de serialización (y el
+        reintento de la transacción) en vez de pasar desapercibida. ``services``
+        permite bloquear servicios antes de crear sus reservas.
+        """
+        service_ids = sorted(set((services or self.service_id).ids))
+        if service_ids:
+            self.env['cowork.service'].flush_model()
+            self.env.cr.execute("""
+                UPDATE cowork_service s
+                   SET write_date = s.write_date
+                  FROM (SELECT id FROM cowork_service WHERE id = ANY(%s) ORDER BY id FOR UPDATE) t
+                 WHERE s.id = t.id
+            """, [service_ids])
     
     @api.constrains('is_guest', 'payment_method')
     def _check_guest_payment(self):
@@ -282,20 +348,17 @@ class CoworkAccessRequest(models.Model):
             if record.payment_method == 'credits':
                 # Descontar créditos
                 record.credits_used = record.credits_cost
-                self.env['cowork.credits'].create({
-                    'partner_id': record.partner_id.id,
+                self.env['cowork.credits'].debit(record.partner_id.id, record.credits_cost, {
                     'membership_id': record.membership_id.id,
+                    'access_request_id': record.id,
                     'credits_type': 'used',
-                    'credits_amount': -record.credits_cost,
                     'description': _('Uso de servicio: %s') % record.service_id.name,
                 })
             elif record.payment_method == 'passes':
                 record.passes_used = 1
-                self.env['cowork.passes'].create({
-                    'partner_id': record.partner_id.id,
+                self.env['cowork.passes'].debit(record.partner_id.id, 1, {
                     'membership_id': record.membership_id.id,
                     'pass_type': 'used',
-                    'amount': -1,
                     'description': _('Uso de Pase: %s') % record.service_id.name,
                 })
                 
@@ -305,10 +368,14 @@ class CoworkAccessRequest(models.Model):
                     description = _('Pase de Invitado: %s') % (record.guest_name or _('N/A'))
                     
                 # Opcional: Crear un registro de log o similar
-                record.membership_id.message_post(body=description)
+                if not self._is_bulk():
+                    record.membership_id.message_post(body=description)
             elif record.payment_method == 'call_room_hours':
                 record.call_room_hours_used = record.duration_hours
-                record.membership_id.call_room_hours_used += record.duration_hours
+                self.env['cowork.call.room.hours'].debit(record.membership_id, record.duration_hours, {
+                    'access_request_id': record.id,
+                    'description': _('Uso de Call Room: %s') % record.service_id.name,
+                })
             elif record.payment_method == 'invoice':
                 # Crear factura
                 record._create_invoice()
@@ -340,14 +407,8 @@ class CoworkAccessRequest(models.Model):
         for record in self:
             if record.state == 'approved':
                 if record.payment_method == 'credits':
-                    # Devolver créditos
-                    self.env['cowork.credits'].create({
-                        'partner_id': record.partner_id.id,
-                        'membership_id': record.membership_id.id,
-                        'credits_type': 'refund',
-                        'credits_amount': record.credits_used,
-                        'description': _('Devolución por cancelación: %s') % record.service_id.name,
-                    })
+                    # Devolver créditos: un lote por cada lote consumido, con su mismo vencimiento
+                    record._refund_credits()
                 elif record.payment_method == 'passes':
                     self.env['cowork.passes'].create({
                         'partner_id': record.partner_id.id,
@@ -356,9 +417,75 @@ class CoworkAccessRequest(models.Model):
                         'amount': 1,
                         'description': _('Reembolso de Pase: %s') % record.service_id.name,
                     })
+                elif record.payment_method == 'call_room_hours':
+                    record._refund_call_room_hours()
                     
             record.write({'state': 'cancelled'})
     
+    def _refund_credits(self):
+        """Devolver los créditos consumidos por la solicitud"""
+        self.ensure_one()
+        usages = self.env['cowork.credits'].search([
+            ('access_request_id', '=', self.id),
+            ('credits_type', '=', 'used'),
+        ])
+        description = _('Devolución por cancelación: %s') % self.service_id.name
+        # La devolución conserva el precio y el origen del lote para el pasivo
+        vals_list = [{
+            'partner_id': usage.partner_id.id,
+            'membership_id': usage.membership_id.id,
+            'access_request_id': self.id,
+            'credits_type': 'refund',
+            'credits_amount': -usage.credits_amount,
+            'date_expiration': usage.lot_id.date_expiration,
+            'origin_lot_id': usage.lot_id.id,
+            'price_per_credit': usage.lot_id.price_per_credit,
+            'sale_id': usage.lot_id.sale_id.id,
+            'currency_id': (usage.lot_id.currency_id or usage.currency_id).id,
+            'description': description,
+        } for usage in usages]
+        if not vals_list and self.credits_used:
+            # Solicitudes aprobadas antes de enlazar los consumos a la solicitud
+            vals_list.append({
+                'partner_id': self.partner_id.id,
+                'membership_id': self.membership_id.id,
+                'access_request_id': self.id,
+                'credits_type': 'refund',
+                'credits_amount': self.credits_used,
+                'description': description,
+            })
+        return self.env['cowork.credits'].create(vals_list)
+
+    def _refund_call_room_hours(self):
+        """Devolver las horas de Call Room al periodo en que se consumieron"""
+        self.ensure_one()
+        usages = self.env['cowork.call.room.hours'].search([
+            ('access_request_id', '=', self.id),
+            ('entry_type', '=', 'used'),
+        ])
+        description = _('Devolución por cancelación: %s') % self.service_id.name
+        vals_list = [{
+            'partner_id': usage.partner_id.id,
+            'membership_id': usage.membership_id.id,
+            'period_start': usage.period_start,
+            'access_request_id': self.id,
+            'entry_type': 'refund',
+            'hours': -usage.hours,
+            'description': description,
+        } for usage in usages]
+        if not vals_list and self.call_room_hours_used:
+            # Solicitudes aprobadas con el contador anterior al historial de horas
+            vals_list.append({
+                'partner_id': self.partner_id.id,
+                'membership_id': self.membership_id.id,
+                'period_start': self.membership_id._get_call_room_period_start(),
+                'access_request_id': self.id,
+                'entry_type': 'refund',
+                'hours': self.call_room_hours_used,
+                'description': description,
+            })
+        return self.env['cowork.call.room.hours'].create(vals_list)
+
     def _create_invoice(self):
         """Crear factura para el servicio"""
         self.ensure_one()
@@ -385,21 +512,12 @@ class CoworkAccessRequest(models.Model):
     
     def _send_admin_notification(self):
         """Enviar notificación al administrador"""
-        template = self.env.ref('aureofy_cowork_ll.email_template_access_request_admin',
-                                raise_if_not_found=False)
-        if template:
-            template.send_mail(self.id, force_send=True)
+        self._queue_template('aureofy_cowork_ll.email_template_access_request_admin')
     
     def _send_member_approval_notification(self):
         """Enviar notificación de aprobación al miembro"""
-        template = self.env.ref('aureofy_cowork_ll.email_template_access_approved',
-                                raise_if_not_found=False)
-        if template:
-            template.send_mail(self.id, force_send=True)
+        self._queue_template('aureofy_cowork_ll.email_template_access_approved', 'partner_id')
     
     def _send_member_rejection_notification(self):
         """Enviar notificación de rechazo al miembro"""
-        template = self.env.ref('aureofy_cowork_ll.email_template_access_rejected',
-                                raise_if_not_found=False)
-        if template:
-            template.send_mail(self.id, force_send=True)
+        self._queue_template('aureofy_cowork_ll.email_template_access_rejected', 'partner_id')
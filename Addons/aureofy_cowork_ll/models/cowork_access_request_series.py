@@ -0,0 +1,222 @@
+# -*- coding: utf-8 -*-
+
+from datetime import timedelta
+
+from dateutil import rrule
+
+from odoo import models, fields, api, _
+from odoo.exceptions import UserError, ValidationError
+
+RRULE_FREQ = {
+    'daily': rrule.DAILY,
+    'weekly': rrule.WEEKLY,
+    'monthly': rrule.MONTHLY,
+}
+
+# Límite de ocurrencias por serie
+MAX_OCCURRENCES = 366
+
+# Campos cuyo cambio regenera las ocurrencias futuras
+RULE_FIELDS = ['service_id', 'date_start', 'duration_hours', 'rrule_type', 'interval',
+               'end_type', 'count', 'until']
+
+
+class CoworkAccessRequestSeries(models.Model):
+    _name = 'cowork.access.request.series'
+    _description = 'Serie de Reservas Recurrentes'
+    _inherit = ['mail.thread', 'cowork.bulk.mixin']
+    _order = 'date_start desc, id desc'
+
+    name = fields.Char(string='Referencia', readonly=True, copy=False,
+                       default=lambda self: _('Nuevo'))
+    membership_id = fields.Many2one('cowork.membership', string='Membresía',
+                                     required=True, ondelete='cascade')
+    partner_id = fields.Many2one('res.partner', string='Miembro',
+                                  related='membership_id.partner_id', store=True)
+    service_id = fields.Many2one('cowork.service', string='Servicio', required=True,
+                                  domain=[('is_paid', '=', True)], tracking=True)
+
+    date_start = fields.Datetime(string='Primera Ocurrencia', required=True, tracking=True)
+    duration_hours = fields.Float(string='Duración (horas)', default=1.0, tracking=True)
+    rrule_type = fields.Selection([
+        ('daily', 'Diaria'),
+        ('weekly', 'Semanal'),
+        ('monthly', 'Mensual'),
+    ], string='Repetición', required=True, default='weekly', tracking=True)
+    interval = fields.Integer(string='Cada', default=1, required=True,
+                               help='Repetir cada N días, semanas o meses')
+    end_type = fields.Selection([
+        ('count', 'Número de Ocurrencias'),
+        ('until', 'Hasta la Fecha'),
+    ], string='Termina', required=True, default='count')
+    count = fields.Integer(string='Ocurrencias', default=4)
+    until = fields.Date(string='Hasta')
+
+    payment_method = fields.Selection([
+        ('credits', 'Créditos'),
+        ('passes', 'Pase de Acceso'),
+        ('call_room_hours', 'Horas Incluidas (Call Room)'),
+        ('invoice', 'Factura'),
+        ('free', 'Gratuito'),
+    ], string='Método de Pago', default='credits', required=True)
+
+    state = fields.Selection([
+        ('draft', 'Borrador'),
+        ('confirmed', 'Confirmada'),
+        ('cancelled', 'Cancelada'),
+    ], string='Estado', default='draft', tracking=True)
+
+    request_ids = fields.One2many('cowork.access.request', 'series_id', string='Ocurrencias')
+    request_count = fields.Integer(string='Número de Ocurrencias', compute='_compute_request_count')
+
+    company_id = fields.Many2one('res.company', string='Compañía',
+                                  default=lambda self: self.env.company)
+
+    _sql_constraints = [
+        ('interval_positive', 'CHECK(interval > 0)', 'El intervalo debe ser mayor que cero.'),
+    ]
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        for vals in vals_list:
+            if vals.get('name', _('Nuevo')) == _('Nuevo'):
+                vals['name'] = self.env['ir.sequence'].next_by_code('cowork.access.request.series') or _('Nuevo')
+        return super().create(vals_list)
+
+    def write(self, vals):
+        res = super().write(vals)
+        if any(f in vals for f in RULE_FIELDS):
+            self.filtered(lambda s: s.state == 'confirmed')._sync_occurrences()
+        return res
+
+    @api.depends('request_ids')
+    def _compute_request_count(self):
+        counts = dict(self.env['cowork.access.request']._read_group(
+            [('series_id', 'in', self.ids)], ['series_id'], ['__count']))
+        for series in self:
+            series.request_count = counts.get(series._origin, 0)
+
+    def _get_occurrence_dates(self, after=None):
+        """Expandir la regla en las fechas de inicio de cada ocurrencia"""
+        self.ensure_one()
+        params = {
+            'dtstart': self.date_start,
+            'interval': self.interval,
+        }
+        if self.end_type == 'count':
+            params['count'] = min(self.count, MAX_OCCURRENCES)
+        else:
+            if not self.until:
+                raise UserError(_('Indique la fecha de fin de la serie.'))
+            params['until'] = fields.Datetime.to_datetime(self.until) + timedelta(days=1, seconds=-1)
+        dates = list(rrule.rrule(RRULE_FREQ[self.rrule_type], **params)[:MAX_OCCURRENCES])
+        if after:
+            dates = [date for date in dates if date >= after]
+        return dates
+
+    def _create_occurrences(self, after=None):
+        """Crear las ocurrencias de la serie en una sola alta, sin conflictos"""
+        vals_list = []
+        for series in self:
+            vals_list += series._prepare_occurrences(series._get_occurrence_dates(after))
+        return self.env['cowork.access.request'].create(vals_list)
+
+    def _prepare_occurrences(self, dates):
+        """Valores de las ocurrencias en ``dates``; falla si alguna no tiene hueco"""
+        self.ensure_one()
+        duration = timedelta(hours=self.duration_hours)
+        conflicts = self.env['cowork.access.request']._get_conflicting_slots(
+            self.service_id, [(date, date + duration) for date in dates])
+        if conflicts:
+            raise ValidationError(_(
+                'El servicio %(service)s ya está reservado en: %(dates)s',
+                service=self.service_id.name,
+                dates=', '.join(fields.Datetime.to_string(date) for date in conflicts)))
+        offset = len(self.request_ids)
+        return [{
+            'name': '%s/%03d' % (self.name, offset + index),
+            'series_id': self.id,
+            'membership_id': self.membership_id.id,
+            'service_id': self.service_id.id,
+            'date_scheduled': date,
+            'duration_hours': self.duration_hours,
+            'payment_method': self.payment_method,
+            'state': 'pending',
+        } for index, date in enumerate(dates, start=1)]
+
+    def _sync_occurrences(self):
+        """Ajustar las ocurrencias futuras a la regla actual.
+
+        Las ocurrencias cuyo horario no cambia se conservan con su estado; solo
+        se cancelan, con sus devoluciones, las que la regla ya no incluye. Las
+        nuevas que reemplazan a una ocurrencia aprobada del mismo día se
+        aprueban de nuevo. El administrador recibe un aviso por serie.
+        """
+        AccessRequest = self.env['cowork.access.request']
+        now = fields.Datetime.now()
+        for series in self:
+            future = series._get_future_occurrences()
+            dates = series._get_occurrence_dates(after=now)
+            slots = {(series.service_id, date, series.duration_hours) for date in dates}
+            removed = future.filtered(
+                lambda r: (r.service_id, r.date_scheduled, r.duration_hours) not in slots)
+            kept_dates = set((future - removed).mapped('date_scheduled'))
+            approved_days = {r.date_scheduled.date() for r in removed if r.state == 'approved'}
+            removed.action_cancel()
+            added = AccessRequest.create(series._prepare_occurrences(
+                [date for date in dates if date not in kept_dates]))
+            added.filtered(lambda r: r.date_scheduled.date() in approved_days)._bulk().action_approve()
+            if not removed and not added:
+                continue
+            series.message_post(body=_(
+                'Serie actualizada: %(kept)s ocurrencias conservadas, %(removed)s canceladas '
+                'y %(added)s nuevas.', kept=len(future - removed), removed=len(removed),
+                added=len(added)))
+            if added.filtered(lambda r: r.state == 'pending'):
+                series._send_admin_notification()
+
+    def _get_future_occurrences(self):
+        return self.request_ids.filtered(
+            lambda r: r.state not in ('cancelled', 'rejected')
+            and r.date_scheduled >= fields.Datetime.now())
+
+    def _send_admin_notification(self):
+        """Avisar al administrador una vez por serie de las ocurrencias por aprobar"""
+        self._queue_template('aureofy_cowork_ll.email_template_access_request_series_admin')
+
+    def _cancel_future_occurrences(self):
+        """Cancelar las ocurrencias pendientes de realizar, con sus devoluciones"""
+        future = self._get_future_occurrences()
+        future.action_cancel()
+        return future
+
+    def action_confirm(self):
+        """Generar las ocurrencias y notificar una sola vez al administrador"""
+        for series in self:
+            if series.state != 'draft':
+                raise UserError(_('Solo se pueden confirmar series en borrador.'))
+        occurrences = self._create_occurrences()
+        self.write({'state': 'confirmed'})
+        self._send_admin_notification()
+        for series in self:
+            series.message_post(body=_('Serie confirmada con %s ocurrencias.') % len(series.request_ids))
+        return occurrences
+
+    def action_approve(self):
+        """Aprobar todas las ocurrencias pendientes de la serie"""
+        self.request_ids.filtered(lambda r: r.state == 'pending')._bulk().action_approve()
+
+    def action_cancel(self):
+        """Cancelar la serie y sus ocurrencias futuras"""
+        self._cancel_future_occurrences()
+        self.write({'state': 'cancelled'})
+
+    def action_view_requests(self):
+        self.ensure_one()
+        return {
+            'type': 'ir.actions.act_window',
+            'name': _('Ocurrencias'),
+            'res_model': 'cowork.access.request',
+            'view_mode': 'tree,form,calendar',
+            'domain': [('series_id', '=', self.id)],
+        }
@@ -53,12 +53,63 @@ class CoworkBed(models.Model):
     # Campos relacionados
     city = fields.Char(related='floor_id.city', string='Ciudad', store=True)
     
+    def init(self):
+        # Contadores de los pisos existentes (también corrige cualquier desvío)
+        self.env['cowork.floor']._rebuild_space_counters(['bed'])
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super().create(vals_list)
+        self.env['cowork.floor']._update_space_counters('bed', added=records._floor_state_keys())
+        return records
+
+    def write(self, vals):
+        if not {'floor_id', 'state', 'active'} & set(vals):
+            return super().write(vals)
+        removed = self._floor_state_keys()
+        res = super().write(vals)
+        self.env['cowork.floor']._update_space_counters('bed', removed, self._floor_state_keys())
+        return res
+
+    def unlink(self):
+        removed = self._floor_state_keys()
+        res = super().unlink()
+        self.env['cowork.floor']._update_space_counters('bed', removed)
+        return res
+
+    def _floor_state_keys(self):
+        """Pares (piso, estado) de los camas activos, para los contadores del piso"""
+        return [(record.floor_id.id, record.state) for record in self
+                if record.active and record.floor_id]
+
     def action_set_available(self):
         self.write({'state': 'available', 'member_id': False, 'membership_id': False})
     
     def action_set_maintenance(self):
         self.write({'state': 'maintenance'})
     
+    def _is_free_for(self, membership):
+        """Se puede asignar ya a ``membership``: sin titular vigente de otro miembro.
+
+        Un titular cuya membresía aún no empezó no bloquea el espacio.
+        """
+        self.ensure_one()
+        current = self.membership_id
+        return (not current or current.state not in ('confirmed', 'active')
+                or current.date_start > fields.Date.context_today(self)
+                or self.member_id == membership.partner_id)
+
+    @api.model
+    def search_available(self, bed_type=None, city=None, date_from=None, date_to=None):
+        """Obtener camas sin reservas entre ``date_from`` y ``date_to`` (sin fin si vacío)"""
+        domain = []
+        if bed_type:
+            domain.append(('bed_type', '=', bed_type))
+        if city:
+            domain.append(('city', 'ilike', city))
+        return self.env['cowork.space.reservation']._search_free_spaces(
+            self._name, domain, date_from or fields.Date.context_today(self), date_to)
+
     @api.model
     def get_available_by_type(self, bed_type, city=None):
         """Obtener camas disponibles filtradas por tipo y ciudad"""
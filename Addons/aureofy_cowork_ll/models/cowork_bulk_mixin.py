@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+
+import logging
+
+from odoo import models
+
+_logger = logging.getLogger(__name__)
+
+# Contexto del modo silencioso para crons, importaciones y acciones masivas:
+# - tracking_disable / mail_notrack: sin valores de seguimiento ni mensajes de log
+# - mail_create_nolog: sin mensaje "creado" en cada alta
+# - cowork_bulk: los métodos de negocio omiten el chatter por registro, encolan
+#   los emails en lugar de enviarlos en línea y dejan un resumen por lote
+BULK_CONTEXT = {
+    'tracking_disable': True,
+    'mail_notrack': True,
+    'mail_create_nolog': True,
+    'cowork_bulk': True,
+}
+
+
+class CoworkBulkMixin(models.AbstractModel):
+    _name = 'cowork.bulk.mixin'
+    _description = 'Modo Silencioso para Procesos Masivos'
+
+    def _bulk(self):
+        """Devolver el recordset en modo silencioso (ver ``BULK_CONTEXT``)"""
+        return self.with_context(**BULK_CONTEXT)
+
+    def _is_bulk(self):
+        return bool(self.env.context.get('cowork_bulk'))
+
+    def _post_bulk_summary(self, message):
+        """Publicar un único resumen del lote en el chatter del contacto de la compañía"""
+        _logger.info("%s: %s", self._name, message)
+        self.env.company.partner_id.sudo().message_post(
+            body=message,
+            subject=self.env['ir.model']._get(self._name).name,
+            author_id=self.env.user.partner_id.id,
+            subtype_xmlid='mail.mt_note',
+        )
+
+    def _send_template(self, xmlid):
+        """Enviar una plantilla a cada registro; en modo silencioso solo se encola"""
+        template = self.env.ref(xmlid, raise_if_not_found=False)
+        if not template or not self:
+            return
+        if self._is_bulk():
+            template.send_mail_batch(self.ids)
+        else:
+            for record in self:
+                template.send_mail(record.id, force_send=True)
+
+    def _queue_template(self, xmlid, recipient_field=None):
+        """Encolar una plantilla por registro; la envía el cron de la cola de notificaciones"""
+        template = self.env.ref(xmlid, raise_if_not_found=False)
+        if not template or not self:
+            return
+        self.env['cowork.notification.outbox']._enqueue(template, self, recipient_field)
@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+
+from odoo import models, fields, api, tools, _
+from odoo.exceptions import UserError
+
+# Movimientos que cuentan como consumo del periodo (la devolución lo revierte)
+USAGE_TYPES = ('used', 'refund')
+
+
+class CoworkCallRoomHours(models.Model):
+    _name = 'cowork.call.room.hours'
+    _description = 'Horas de Call Room'
+    _order = 'date desc, id desc'
+
+    partner_id = fields.Many2one('res.partner', string='Miembro', required=True,
+                                  index=True, ondelete='cascade')
+    membership_id = fields.Many2one('cowork.membership', string='Membresía', required=True,
+                                     index=True, ondelete='cascade')
+    period_start = fields.Date(string='Inicio del Periodo', required=True,
+                                help='Periodo de beneficios al que se imputa el movimiento')
+    access_request_id = fields.Many2one('cowork.access.request', string='Solicitud de Acceso',
+                                         index='btree_not_null', ondelete='set null')
+
+    entry_type = fields.Selection([
+        ('granted', 'Otorgadas por Plan'),
+        ('used', 'Usadas'),
+        ('refund', 'Reembolso'),
+        ('bonus', 'Bonificación'),
+        ('renewal', 'Renovación Mensual'),
+        ('expired', 'Expiradas'),
+    ], string='Tipo', required=True)
+
+    hours = fields.Float(string='Horas', required=True,
+                          help='Positivo para agregar, negativo para usar')
+
+    date = fields.Datetime(string='Fecha', default=fields.Datetime.now)
+    description = fields.Char(string='Descripción')
+
+    company_id = fields.Many2one('res.company', string='Compañía',
+                                  default=lambda self: self.env.company)
+
+    def init(self):
+        # Migrar el contador flotante de instalaciones previas como saldo inicial del periodo
+        if not tools.column_exists(self.env.cr, 'cowork_membership', 'call_room_hours_used'):
+            return
+        self.env.cr.execute("""
+            INSERT INTO cowork_call_room_hours
+                   (partner_id, membership_id, period_start, entry_type, hours, date,
+                    description, company_id)
+            SELECT m.partner_id, m.id, COALESCE(m.call_room_period_start, m.date_start),
+                   'granted', GREATEST(m.call_room_hours_granted - COALESCE(m.call_room_hours_used, 0), 0),
+                   now() at time zone 'UTC', 'Saldo inicial', m.company_id
+              FROM cowork_membership m
+             WHERE m.state IN ('confirmed', 'active')
+               AND m.call_room_hours_granted > 0
+               AND NOT EXISTS (SELECT 1 FROM cowork_call_room_hours h WHERE h.membership_id = m.id)
+        """)
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super().create(vals_list)
+        records._update_period_balances()
+        return records
+
+    def write(self, vals):
+        if not any(f in vals for f in ['hours', 'entry_type', 'membership_id', 'period_start']):
+            return super().write(vals)
+        self._update_period_balances(sign=-1)
+        res = super().write(vals)
+        self._update_period_balances()
+        return res
+
+    def unlink(self):
+        self._update_period_balances(sign=-1)
+        return super().unlink()
+
+    def _update_period_balances(self, sign=1):
+        """Propagar los movimientos al balance materializado por periodo"""
+        deltas = {}
+        for record in self:
+            key = (record.membership_id.id, record.period_start)
+            balance, used = deltas.get(key, (0.0, 0.0))
+            balance += sign * record.hours
+            if record.entry_type in USAGE_TYPES:
+                used -= sign * record.hours
+            deltas[key] = (balance, used)
+        self.env['cowork.call.room.balance']._apply_deltas(deltas)
+
+    @api.model
+    def debit(self, membership, hours, vals=None):
+        """Consumir horas del periodo vigente de forma atómica"""
+        membership.ensure_one()
+        self.env['cowork.spending.lock']._acquire(membership.partner_id.ids)
+        available = membership._get_call_room_hours().get(membership.id, (0.0, 0.0))[1]
+        if available < hours:
+            raise UserError(_('No tiene horas de Call Room disponibles. '
+                              'Disponible: %s, Requerido: %s') % (available, hours))
+        vals = dict(vals or {},
+                    partner_id=membership.partner_id.id,
+                    membership_id=membership.id,
+                    period_start=membership._get_call_room_period_start(),
+                    hours=-hours)
+        vals.setdefault('entry_type', 'used')
+        return self.create(vals)
+
+
+class CoworkCallRoomBalance(models.Model):
+    _name = 'cowork.call.room.balance'
+    _description = 'Balance de Horas de Call Room por Periodo'
+    _rec_name = 'membership_id'
+    _order = 'period_start desc, membership_id'
+
+    membership_id = fields.Many2one('cowork.membership', string='Membresía', required=True,
+                                     index=True, ondelete='cascade', readonly=True)
+    period_start = fields.Date(string='Inicio del Periodo', required=True, readonly=True)
+    hours_used = fields.Float(string='Horas Usadas', default=0.0, readonly=True)
+    balance = fields.Float(string='Horas Disponibles', default=0.0, readonly=True,
+                            help='Suma de los movimientos del periodo, mantenida en cada '
+                                 'alta, modificación o baja.')
+
+    _sql_constraints = [
+        ('period_uniq', 'unique(membership_id, period_start)',
+         'Solo puede existir un balance por membresía y periodo.'),
+    ]
+
+    def init(self):
+        # Poblar el balance a partir del historial existente
+        self.env.cr.execute("""
+            INSERT INTO cowork_call_room_balance (membership_id, period_start, hours_used, balance)
+            SELECT membership_id, period_start,
+                   -SUM(CASE WHEN entry_type IN %s THEN hours ELSE 0 END), SUM(hours)
+              FROM cowork_call_room_hours
+             GROUP BY membership_id, period_start
+            ON CONFLICT (membership_id, period_start) DO NOTHING
+        """, [USAGE_TYPES])
+
+    @api.model
+    def _apply_deltas(self, deltas):
+        """Sumar variaciones {(membership_id, period_start): (balance, usadas)}.
+
+        El UPSERT bloquea la fila del periodo hasta el fin de la transacción,
+        por lo que dos movimientos concurrentes nunca pierden actualizaciones.
+        """
+        keys = sorted(key for key, delta in deltas.items() if key[0] and key[1] and any(delta))
+        if not keys:
+            return
+        self.env.cr.execute("""
+            INSERT INTO cowork_call_room_balance
+                   (membership_id, period_start, balance, hours_used,
+                    create_uid, create_date, write_uid, write_date)
+            SELECT t.membership_id, t.period_start, t.balance, t.used,
+                   %(uid)s, now() at time zone 'UTC', %(uid)s, now() at time zone 'UTC'
+              FROM unnest(%(membership_ids)s::int[], %(periods)s::date[],
+                          %(balances)s::float8[], %(used)s::float8[])
+                   AS t(membership_id, period_start, balance, used)
+            ON CONFLICT (membership_id, period_start) DO UPDATE
+               SET balance = cowork_call_room_balance.balance + EXCLUDED.balance,
+                   hours_used = cowork_call_room_balance.hours_used + EXCLUDED.hours_used,
+                   write_uid = EXCLUDED.write_uid,
+                   write_date = EXCLUDED.write_date
+        """, {
+            'uid': self.env.uid,
+            'membership_ids': [key[0] for key in keys],
+            'periods': [key[1] for key in keys],
+            'balances': [deltas[key][0] for key in keys],
+            'used': [deltas[key][1] for key in keys],
+        })
+        self.invalidate_model(['balance', 'hours_used'])
@@ -1,8 +1,14 @@
 # -*- coding: utf-8 -*-
 
+import logging
+import threading
+
 from odoo import models, fields, api, _
+from odoo.exceptions import UserError
 from dateutil.relativedelta import relativedelta
 
+_logger = logging.getLogger(__name__)
+
 
 class CoworkCredits(models.Model):
     _name = 'cowork.credits'
@@ -34,6 +40,23 @@ class CoworkCredits(models.Model):
     # Expiración
     date_expiration = fields.Date(string='Fecha de Vencimiento')
     
+    # Lotes: cada movimiento positivo es un lote que se consume por orden de vencimiento
+    remaining_amount = fields.Integer(string='Saldo del Lote', readonly=True, copy=False,
+                                       help='Créditos del lote aún no consumidos ni vencidos')
+    lot_id = fields.Many2one('cowork.credits', string='Lote Consumido', readonly=True,
+                              index='btree_not_null', ondelete='set null',
+                              help='Lote del que se descuenta este movimiento')
+    consumption_ids = fields.One2many('cowork.credits', 'lot_id', string='Consumos del Lote')
+    origin_lot_id = fields.Many2one('cowork.credits', string='Lote de Origen', readonly=True,
+                                     ondelete='set null',
+                                     help='En las devoluciones, lote del que salieron los créditos')
+    access_request_id = fields.Many2one('cowork.access.request', string='Solicitud de Acceso',
+                                         index='btree_not_null', ondelete='set null')
+    
+    active = fields.Boolean(string='Activo', default=True,
+                             help='Los movimientos incluidos en un checkpoint pueden archivarse '
+                                  'sin alterar el balance')
+    
     # Para compras de créditos
     invoice_id = fields.Many2one('account.move', string='Factura')
     sale_id = fields.Many2one('sale.order', string='Orden de Venta')
@@ -56,12 +79,298 @@ class CoworkCredits(models.Model):
             else:
                 record.total_amount = 0
     
+    def init(self):
+        # Índices parciales sobre los lotes abiertos: consumo FIFO y barrido de vencimientos
+        self.env.cr.execute("""
+            CREATE INDEX IF NOT EXISTS cowork_credits_open_lot_partner_idx
+                ON cowork_credits (partner_id, date_expiration)
+             WHERE remaining_amount > 0
+        """)
+        self.env.cr.execute("""
+            CREATE INDEX IF NOT EXISTS cowork_credits_open_lot_expiration_idx
+                ON cowork_credits (date_expiration)
+             WHERE remaining_amount > 0 AND date_expiration IS NOT NULL
+        """)
+        # Saldo inicial de los lotes existentes: se imputan los consumos en orden FIFO
+        self.env.cr.execute("""
+            WITH used AS (
+                SELECT partner_id, -SUM(credits_amount) AS amount
+                  FROM cowork_credits
+                 WHERE credits_amount < 0
+                 GROUP BY partner_id
+            ), lots AS (
+                SELECT id, partner_id, credits_amount,
+                       SUM(credits_amount) OVER (
+                           PARTITION BY partner_id
+                           ORDER BY date_expiration NULLS LAST, date, id
+                       ) AS cumulative
+                  FROM cowork_credits
+                 WHERE credits_amount > 0 AND remaining_amount IS NULL
+            )
+            UPDATE cowork_credits c
+               SET remaining_amount = GREATEST(0, LEAST(lots.credits_amount,
+                                                        lots.cumulative - COALESCE(used.amount, 0)))
+              FROM lots
+              LEFT JOIN used ON used.partner_id = lots.partner_id
+             WHERE c.id = lots.id
+        """)
+        self.env.cr.execute("""
+            UPDATE cowork_credits SET remaining_amount = 0
+             WHERE remaining_amount IS NULL
+        """)
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        for vals in vals_list:
+            if 'remaining_amount' not in vals:
+                vals['remaining_amount'] = max(vals.get('credits_amount', 0), 0)
+        self.env['cowork.ledger.checkpoint']._lock_ledger_writes('credits')
+        records = super().create(vals_list)
+        records._update_partner_balances()
+        records.filtered(lambda c: c.credits_amount < 0)._draw_from_lots()
+        return records
+
+    def write(self, vals):
+        if any(f in vals for f in ['credits_amount', 'partner_id', 'membership_id']):
+            self.env['cowork.ledger.checkpoint']._check_entries_editable('credits', self)
+        if 'credits_amount' not in vals and 'partner_id' not in vals:
+            return super().write(vals)
+        self._update_partner_balances(sign=-1)
+        if 'credits_amount' in vals:
+            self._draw_from_lots(sign=-1)
+            for lot in self.filtered(lambda c: c.credits_amount > 0):
+                lot.remaining_amount = max(0, lot.remaining_amount + vals['credits_amount'] - lot.credits_amount)
+        res = super().write(vals)
+        self._update_partner_balances()
+        if 'credits_amount' in vals:
+            self.filtered(lambda c: c.lot_id and c.credits_amount < 0)._draw_from_lots()
+        return res
+
+    def unlink(self):
+        self.env['cowork.ledger.checkpoint']._check_entries_editable('credits', self)
+        self._update_partner_balances(sign=-1)
+        self._draw_from_lots(sign=-1)
+        return super().unlink()
+
+    def _draw_from_lots(self, sign=1):
+        """Descontar los consumos del saldo de sus lotes.
+
+        Los consumos enlazados a un lote lo afectan directamente; los que
+        no tienen lote (altas manuales) se imputan FIFO sobre los lotes
+        vigentes del miembro para mantener saldo de lotes y balance alineados.
+        Con ``sign=-1`` se revierte el efecto de los consumos enlazados.
+        """
+        consumptions = self.filtered(lambda c: c.credits_amount < 0)
+        linked = consumptions.filtered('lot_id')
+        if linked:
+            deltas = {}
+            for record in linked:
+                deltas[record.lot_id.id] = deltas.get(record.lot_id.id, 0) + sign * record.credits_amount
+            self.flush_model(['remaining_amount'])
+            self.env.cr.execute("""
+                UPDATE cowork_credits c
+                   SET remaining_amount = GREATEST(0, c.remaining_amount + t.delta)
+                  FROM unnest(%s::int[], %s::int[]) AS t(lot_id, delta)
+                 WHERE c.id = t.lot_id
+            """, [list(deltas), list(deltas.values())])
+            self.invalidate_model(['remaining_amount'])
+        if sign < 0:
+            return
+        for record in consumptions - linked:
+            self._draw_fifo(record.partner_id.id, -record.credits_amount)
+
+    @api.model
+    def _lock_open_lots(self, partner_id):
+        """Bloquear y devolver [(lot_id, saldo)] de los lotes vigentes en orden FIFO"""
+        self.flush_model(['partner_id', 'remaining_amount', 'date_expiration', 'date'])
+        self.env.cr.execute("""
+            SELECT id, remaining_amount
+              FROM cowork_credits
+             WHERE partner_id = %s
+               AND remaining_amount > 0
+               AND (date_expiration IS NULL OR date_expiration >= %s)
+             ORDER BY date_expiration NULLS LAST, date, id
+               FOR UPDATE
+        """, [partner_id, fields.Date.context_today(self)])
+        return self.env.cr.fetchall()
+
+    @api.model
+    def _draw_fifo(self, partner_id, amount):
+        """Restar ``amount`` de los lotes vigentes del miembro, primero los que vencen antes"""
+        allocations = []
+        for lot_id, remaining in self._lock_open_lots(partner_id):
+            if amount <= 0:
+                break
+            taken = min(remaining, amount)
+            allocations.append((lot_id, taken))
+            amount -= taken
+        if allocations:
+            self.env.cr.execute("""
+                UPDATE cowork_credits c
+                   SET remaining_amount = c.remaining_amount - t.taken
+                  FROM unnest(%s::int[], %s::int[]) AS t(lot_id, taken)
+                 WHERE c.id = t.lot_id
+            """, [[a[0] for a in allocations], [a[1] for a in allocations]])
+            self.invalidate_model(['remaining_amount'])
+        return allocations
+
+    @api.model
+    def consume(self, partner_id, amount, vals=None):
+        """Consumir créditos de un miembro, primero de los lotes que vencen antes.
+
+        Crea un movimiento negativo por cada lote consumido, enlazado a él.
+        Si los lotes no alcanzan, el resto queda en un movimiento sin lote.
+        """
+        vals = dict(vals or {}, partner_id=partner_id)
+        vals.setdefault('credits_type', 'used')
+        vals_list, missing = self._split_by_lots(self._lock_open_lots(partner_id), amount, vals)
+        if missing > 0:
+            vals_list.append(dict(vals, credits_amount=-missing))
+        return self.create(vals_list)
+
+    @api.model
+    def _split_by_lots(self, lots, amount, vals):
+        """Repartir ``amount`` entre ``lots`` en orden; devuelve (valores, resto sin cubrir)"""
+        vals_list = []
+        for lot_id, remaining in lots:
+            if amount <= 0:
+                break
+            taken = min(remaining, amount)
+            vals_list.append(dict(vals, lot_id=lot_id, credits_amount=-taken))
+            amount -= taken
+        return vals_list, amount
+
+    @api.model
+    def debit(self, partner_id, amount, vals=None):
+        """Consumir créditos de forma atómica sin dejar el balance en negativo.
+
+        Toma el bloqueo de consumo del miembro y luego los lotes vigentes, y
+        solo acepta el consumo si esos lotes lo cubren: un lote vencido que el
+        barrido aún no cerró no cuenta como disponible. Nunca deja un
+        movimiento sin lote.
+        """
+        self.env['cowork.spending.lock']._acquire([partner_id])
+        lots = self._lock_open_lots(partner_id)
+        available = min(sum(remaining for _lot_id, remaining in lots),
+                        self.get_partner_balance(partner_id))
+        if available < amount:
+            raise UserError(_('No tiene suficientes créditos disponibles. '
+                              'Disponible: %s, Requerido: %s') % (max(available, 0), amount))
+        vals = dict(vals or {}, partner_id=partner_id)
+        vals.setdefault('credits_type', 'used')
+        vals_list, _missing = self._split_by_lots(lots, amount, vals)
+        return self.create(vals_list)
+
+    def _expire_lots(self, description=None):
+        """Vencer el saldo pendiente de los lotes del recordset"""
+        vals_list = [{
+            'partner_id': lot.partner_id.id,
+            'membership_id': lot.membership_id.id,
+            'lot_id': lot.id,
+            'credits_type': 'expired',
+            'credits_amount': -lot.remaining_amount,
+            'description': description or _('Vencimiento de créditos'),
+        } for lot in self if lot.remaining_amount > 0]
+        return self.create(vals_list)
+
+    @api.model
+    def _cron_expire_lots(self, batch_size=10000):
+        """Vencer los lotes con fecha de vencimiento pasada.
+
+        Trabaja por bloques en SQL: cierra los lotes, inserta el movimiento
+        de vencimiento y ajusta el balance de cada miembro en una sola
+        sentencia por bloque.
+        """
+        auto_commit = not getattr(threading.current_thread(), 'testing', False)
+        self.flush_model()
+        description = _('Vencimiento de créditos')
+        total = 0
+        while True:
+            self.env['cowork.ledger.checkpoint']._lock_ledger_writes('credits')
+            self.env.cr.execute("""
+                WITH lots AS (
+                    SELECT id, remaining_amount
+                      FROM cowork_credits
+                     WHERE remaining_amount > 0
+                       AND date_expiration < %(today)s
+                     ORDER BY date_expiration, id
+                     LIMIT %(limit)s
+                       FOR UPDATE SKIP LOCKED
+                ), closed AS (
+                    UPDATE cowork_credits c
+                       SET remaining_amount = 0,
+                           write_uid = %(uid)s,
+                           write_date = now() at time zone 'UTC'
+                      FROM lots
+                     WHERE c.id = lots.id
+                 RETURNING c.id, c.partner_id, c.membership_id, c.company_id,
+                           c.currency_id, lots.remaining_amount AS amount
+                ), moves AS (
+                    INSERT INTO cowork_credits
+                           (partner_id, membership_id, lot_id, company_id, currency_id,
+                            credits_type, credits_amount, remaining_amount, total_amount, active,
+                            date, description, create_uid, create_date, write_uid, write_date)
+                    SELECT partner_id, membership_id, id, company_id, currency_id,
+                           'expired', -amount, 0, 0, TRUE,
+                           now() at time zone 'UTC', %(description)s,
+                           %(uid)s, now() at time zone 'UTC', %(uid)s, now() at time zone 'UTC'
+                      FROM closed
+                 RETURNING partner_id, credits_amount
+                )
+                SELECT partner_id, SUM(credits_amount), COUNT(*)
+                  FROM moves
+                 GROUP BY partner_id
+            """, {
+                'today': fields.Date.context_today(self),
+                'limit': batch_size,
+                'uid': self.env.uid,
+                'description': description,
+            })
+            rows = self.env.cr.fetchall()
+            if not rows:
+                break
+            self.env['cowork.credits.balance']._apply_deltas({row[0]: row[1] for row in rows})
+            count = sum(row[2] for row in rows)
+            total += count
+            self.invalidate_model()
+            if auto_commit:
+                self.env.cr.commit()
+            if count < batch_size:
+                break
+        _logger.info("Vencidos %s lotes de créditos", total)
+        return total
+
+    def _update_partner_balances(self, sign=1):
+        """Propagar los movimientos al balance materializado por miembro"""
+        deltas = {}
+        for record in self:
+            partner_id = record.partner_id.id
+            deltas[partner_id] = deltas.get(partner_id, 0) + sign * record.credits_amount
+        self.env['cowork.credits.balance']._apply_deltas(deltas)
+
     @api.model
     def get_partner_balance(self, partner_id):
         """Obtener balance de créditos de un partner"""
-        credits = self.search([('partner_id', '=', partner_id)])
-        return sum(credits.mapped('credits_amount')) or 0
+        return self.get_partner_balances([partner_id]).get(partner_id, 0)
+
+    @api.model
+    def get_partner_balances(self, partner_ids):
+        """Obtener balances de varios partners en una sola consulta"""
+        return self.env['cowork.credits.balance']._get_balances(partner_ids)
     
+    @api.model
+    def grant_bulk(self, partner_ids, amount, credits_type='bonus', date_expiration=False,
+                   description=False):
+        """Otorgar la misma cantidad de créditos a muchos miembros en una sola alta"""
+        description = description or _('Otorgamiento de %s créditos') % amount
+        return self.create([{
+            'partner_id': partner_id,
+            'credits_type': credits_type,
+            'credits_amount': amount,
+            'date_expiration': date_expiration,
+            'description': description,
+        } for partner_id in dict.fromkeys(partner_ids)])
+
     @api.model
     def purchase_credits(self, partner_id, amount, price_per_credit, validity_years=1):
         """Comprar créditos para un miembro"""
@@ -173,3 +482,101 @@ class CoworkCreditPackage(models.Model):
                 'list_price': self.price,
                 'currency_id': self.currency_id.id,
             })
+
+
+class CoworkCreditsBalance(models.Model):
+    _name = 'cowork.credits.balance'
+    _description = 'Balance de Créditos por Miembro'
+    _rec_name = 'partner_id'
+    _order = 'partner_id'
+
+    partner_id = fields.Many2one('res.partner', string='Miembro', required=True,
+                                  index=True, ondelete='cascade', readonly=True)
+    balance = fields.Integer(string='Balance', default=0, readonly=True,
+                              help='Suma de los movimientos del historial de créditos, '
+                                   'mantenida en cada alta, modificación o baja.')
+
+    _sql_constraints = [
+        ('partner_uniq', 'unique(partner_id)', 'Solo puede existir un balance por miembro.'),
+    ]
+
+    def init(self):
+        # Poblar el balance a partir del historial existente (instalaciones previas)
+        self.env.cr.execute("""
+            INSERT INTO cowork_credits_balance (partner_id, balance)
+            SELECT partner_id, SUM(credits_amount)
+              FROM cowork_credits
+             GROUP BY partner_id
+            ON CONFLICT (partner_id) DO NOTHING
+        """)
+
+    @api.model
+    def _apply_deltas(self, deltas):
+        """Sumar variaciones {partner_id: delta} al balance de cada miembro.
+
+        El UPSERT bloquea la fila del miembro hasta el fin de la transacción,
+        por lo que dos movimientos concurrentes nunca pierden actualizaciones.
+        """
+        deltas = {partner_id: delta for partner_id, delta in deltas.items() if partner_id and delta}
+        if not deltas:
+            return
+        # Orden estable de bloqueo para evitar interbloqueos entre transacciones
+        partner_ids = sorted(deltas)
+        self.env.cr.execute("""
+            INSERT INTO cowork_credits_balance
+                   (partner_id, balance, create_uid, create_date, write_uid, write_date)
+            SELECT t.partner_id, t.delta, %(uid)s, now() at time zone 'UTC',
+                   %(uid)s, now() at time zone 'UTC'
+              FROM unnest(%(partner_ids)s::int[], %(deltas)s::int[]) AS t(partner_id, delta)
+            ON CONFLICT (partner_id) DO UPDATE
+               SET balance = cowork_credits_balance.balance + EXCLUDED.balance,
+                   write_uid = EXCLUDED.write_uid,
+                   write_date = EXCLUDED.write_date
+        """, {
+            'uid': self.env.uid,
+            'partner_ids': partner_ids,
+            'deltas': [deltas[partner_id] for partner_id in partner_ids],
+        })
+        self.invalidate_model(['balance'])
+
+    @api.model
+    def _get_balances(self, partner_ids):
+        """Devolver {partner_id: balance} para los partners indicados"""
+        partner_ids = [partner_id for partner_id in partner_ids if partner_id]
+        if not partner_ids:
+            return {}
+        self.env.cr.execute("""
+            SELECT partner_id, balance
+              FROM cowork_credits_balance
+             WHERE partner_id = ANY(%s)
+        """, [partner_ids])
+        return dict(self.env.cr.fetchall())
+
+    @api.model
+    def _check_consistency(self, fix=True):
+        """Comparar el balance materializado con el historial y corregirlo.
+
+        Devuelve la lista de (partner_id, balance_guardado, balance_real)
+        de los miembros que no coinciden.
+        """
+        # Historial = último checkpoint + cola, por lo que la verificación no recorre
+        # los movimientos archivados
+        ledger = self.env['cowork.ledger.checkpoint']._get_partner_balances('credits')
+        self.env.cr.execute("SELECT partner_id, balance FROM cowork_credits_balance")
+        stored = dict(self.env.cr.fetchall())
+        mismatches = [
+            (partner_id, stored.get(partner_id, 0), ledger.get(partner_id, 0))
+            for partner_id in set(ledger) | set(stored)
+            if stored.get(partner_id, 0) != ledger.get(partner_id, 0)
+        ]
+        if mismatches:
+            _logger.warning("Balance de créditos inconsistente para %s miembros", len(mismatches))
+            if fix:
+                self._apply_deltas({
+                    partner_id: real - stored for partner_id, stored, real in mismatches
+                })
+        return mismatches
+
+    @api.model
+    def _cron_check_consistency(self):
+        self._check_consistency(fix=True)
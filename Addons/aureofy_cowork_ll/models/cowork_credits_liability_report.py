@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+
+from odoo import models, fields, tools
+
+
+class CoworkCreditsLiabilityReport(models.Model):
+    _name = 'cowork.credits.liability.report'
+    _description = 'Pasivo de Créditos por Vencimiento'
+    _auto = False
+    _order = 'date_expiration, id'
+
+    partner_id = fields.Many2one('res.partner', string='Miembro', readonly=True)
+    membership_id = fields.Many2one('cowork.membership', string='Membresía', readonly=True)
+    date = fields.Datetime(string='Fecha del Lote', readonly=True)
+    date_expiration = fields.Date(string='Fecha de Vencimiento', readonly=True)
+    channel = fields.Selection([
+        ('sale_order', 'Orden de Venta'),
+        ('purchase', 'Compra Directa'),
+        ('plan', 'Plan de Membresía'),
+        ('other', 'Bonificaciones y Reembolsos'),
+    ], string='Canal', readonly=True)
+    credits_amount = fields.Integer(string='Créditos del Lote', readonly=True)
+    remaining_credits = fields.Integer(string='Créditos Pendientes', readonly=True)
+    price_per_credit = fields.Monetary(string='Precio por Crédito', readonly=True,
+                                        group_operator='avg', currency_field='currency_id')
+    remaining_value = fields.Monetary(string='Valor Pendiente', readonly=True,
+                                       currency_field='currency_id',
+                                       help='Créditos pendientes por su precio de compra; '
+                                            'los lotes sin precio no suman valor')
+    currency_id = fields.Many2one('res.currency', string='Moneda', readonly=True)
+    company_id = fields.Many2one('res.company', string='Compañía', readonly=True)
+
+    def init(self):
+        # Saldo de cada lote: sus movimientos enlazados (ventana por lote) menos
+        # los consumos sin lote del miembro, imputados FIFO con un total acumulado.
+        # Las devoluciones toman el canal del lote del que salieron los créditos.
+        tools.drop_view_if_exists(self.env.cr, self._table)
+        self.env.cr.execute("""
+            CREATE OR REPLACE VIEW {table} AS (
+                WITH ledger AS (
+                    SELECT c.*,
+                           SUM(c.credits_amount) OVER (PARTITION BY COALESCE(c.lot_id, c.id)) AS lot_balance
+                      FROM cowork_credits c
+                ), unlinked AS (
+                    SELECT partner_id, -SUM(credits_amount) AS amount
+                      FROM cowork_credits
+                     WHERE credits_amount < 0 AND lot_id IS NULL
+                     GROUP BY partner_id
+                ), lots AS (
+                    SELECT l.*,
+                           SUM(GREATEST(l.lot_balance, 0)) OVER (
+                               PARTITION BY l.partner_id
+                               ORDER BY l.date_expiration NULLS LAST, l.date, l.id
+                           ) AS cumulative
+                      FROM ledger l
+                     WHERE l.credits_amount > 0 AND l.lot_id IS NULL
+                ), balances AS (
+                    SELECT lots.*,
+                           GREATEST(0, LEAST(GREATEST(lots.lot_balance, 0),
+                                             lots.cumulative - COALESCE(u.amount, 0))) AS remaining
+                      FROM lots
+                      LEFT JOIN unlinked u ON u.partner_id = lots.partner_id
+                )
+                SELECT b.id,
+                       b.partner_id,
+                       b.membership_id,
+                       b.date,
+                       b.date_expiration,
+                       CASE
+                           WHEN COALESCE(b.sale_id, o.sale_id) IS NOT NULL THEN 'sale_order'
+                           WHEN COALESCE(o.credits_type, b.credits_type) = 'purchased' THEN 'purchase'
+                           WHEN COALESCE(o.credits_type, b.credits_type) IN ('granted', 'renewal') THEN 'plan'
+                           ELSE 'other'
+                       END AS channel,
+                       b.credits_amount,
+                       b.remaining AS remaining_credits,
+                       b.price_per_credit,
+                       b.remaining * COALESCE(b.price_per_credit, 0) AS remaining_value,
+                       b.currency_id,
+                       b.company_id
+                  FROM balances b
+                  LEFT JOIN cowork_credits o ON o.id = b.origin_lot_id
+                 WHERE b.remaining > 0
+                   AND (b.date_expiration IS NULL OR b.date_expiration >= CURRENT_DATE)
+            )
+        """.format(table=self._table))
@@ -57,12 +57,63 @@ class CoworkDesk(models.Model):
     # Campos relacionados
     city = fields.Char(related='floor_id.city', string='Ciudad', store=True)
     
+    def init(self):
+        # Contadores de los pisos existentes (también corrige cualquier desvío)
+        self.env['cowork.floor']._rebuild_space_counters(['desk'])
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super().create(vals_list)
+        self.env['cowork.floor']._update_space_counters('desk', added=records._floor_state_keys())
+        return records
+
+    def write(self, vals):
+        if not {'floor_id', 'state', 'active'} & set(vals):
+            return super().write(vals)
+        removed = self._floor_state_keys()
+        res = super().write(vals)
+        self.env['cowork.floor']._update_space_counters('desk', removed, self._floor_state_keys())
+        return res
+
+    def unlink(self):
+        removed = self._floor_state_keys()
+        res = super().unlink()
+        self.env['cowork.floor']._update_space_counters('desk', removed)
+        return res
+
+    def _floor_state_keys(self):
+        """Pares (piso, estado) de los escritorios activos, para los contadores del piso"""
+        return [(record.floor_id.id, record.state) for record in self
+                if record.active and record.floor_id]
+
     def action_set_available(self):
         self.write({'state': 'available', 'member_id': False, 'membership_id': False})
     
     def action_set_maintenance(self):
         self.write({'state': 'maintenance'})
     
+    def _is_free_for(self, membership):
+        """Se puede asignar ya a ``membership``: sin titular vigente de otro miembro.
+
+        Un titular cuya membresía aún no empezó no bloquea el espacio.
+        """
+        self.ensure_one()
+        current = self.membership_id
+        return (not current or current.state not in ('confirmed', 'active')
+                or current.date_start > fields.Date.context_today(self)
+                or self.member_id == membership.partner_id)
+
+    @api.model
+    def search_available(self, desk_type=None, city=None, date_from=None, date_to=None):
+        """Obtener escritorios sin reservas entre ``date_from`` y ``date_to`` (sin fin si vacío)"""
+        domain = []
+        if desk_type:
+            domain.append(('desk_type', '=', desk_type))
+        if city:
+            domain.append(('city', 'ilike', city))
+        return self.env['cowork.space.reservation']._search_free_spaces(
+            self._name, domain, date_from or fields.Date.context_today(self), date_to)
+
     @api.model
     def get_available_by_type(self, desk_type, city=None):
         """Obtener escritorios disponibles filtrados por tipo y ciudad"""
@@ -1,7 +1,13 @@
 # -*- coding: utf-8 -*-
 
+from collections import Counter, defaultdict
+
 from odoo import models, fields, api
 
+# Estados de escritorios y camas con contador propio en el piso
+SPACE_STATES = ('available', 'occupied', 'reserved', 'maintenance')
+SPACE_KINDS = ('desk', 'bed')
+
 
 class CoworkFloor(models.Model):
     _name = 'cowork.floor'
@@ -18,8 +24,18 @@ class CoworkFloor(models.Model):
     desk_ids = fields.One2many('cowork.desk', 'floor_id', string='Escritorios')
     bed_ids = fields.One2many('cowork.bed', 'floor_id', string='Camas')
 
-    desk_count = fields.Integer(string='Nº Escritorios', compute='_compute_counts')
-    bed_count = fields.Integer(string='Nº Camas', compute='_compute_counts')
+    # Contadores mantenidos por escritorios y camas (ver _update_space_counters)
+    desk_count = fields.Integer(string='Nº Escritorios', readonly=True)
+    desk_available_count = fields.Integer(string='Escritorios Disponibles', readonly=True)
+    desk_occupied_count = fields.Integer(string='Escritorios Ocupados', readonly=True)
+    desk_reserved_count = fields.Integer(string='Escritorios Reservados', readonly=True)
+    desk_maintenance_count = fields.Integer(string='Escritorios en Mantenimiento', readonly=True)
+    bed_count = fields.Integer(string='Nº Camas', readonly=True)
+    bed_available_count = fields.Integer(string='Camas Disponibles', readonly=True)
+    bed_occupied_count = fields.Integer(string='Camas Ocupadas', readonly=True)
+    bed_reserved_count = fields.Integer(string='Camas Reservadas', readonly=True)
+    bed_maintenance_count = fields.Integer(string='Camas en Mantenimiento', readonly=True)
+    occupancy_rate = fields.Float(string='Ocupación (%)', compute='_compute_occupancy_rate')
     
     # Renta exclusiva
     is_exclusive = fields.Boolean(string='Es Exclusivo', default=False,
@@ -45,11 +61,91 @@ class CoworkFloor(models.Model):
     company_id = fields.Many2one('res.company', string='Compañía', 
                                   default=lambda self: self.env.company)
     
-    @api.depends('desk_ids', 'bed_ids')
-    def _compute_counts(self):
+    @api.depends('desk_count', 'bed_count', 'desk_occupied_count', 'desk_reserved_count',
+                 'bed_occupied_count', 'bed_reserved_count')
+    def _compute_occupancy_rate(self):
         for record in self:
-            record.desk_count = len(record.desk_ids)
-            record.bed_count = len(record.bed_ids)
+            total = record.desk_count + record.bed_count
+            taken = (record.desk_occupied_count + record.desk_reserved_count
+                     + record.bed_occupied_count + record.bed_reserved_count)
+            record.occupancy_rate = 100.0 * taken / total if total else 0.0
+
+    @api.model
+    def _counter_fields(self, kind):
+        return ['%s_count' % kind] + ['%s_%s_count' % (kind, state) for state in SPACE_STATES]
+
+    @api.model
+    def _update_space_counters(self, kind, removed=(), added=()):
+        """Aplicar a los contadores del piso los cambios de escritorios o camas.
+
+        ``removed`` y ``added`` son pares (piso, estado) de espacios activos que
+        dejan de contar o pasan a contar. Se suma en SQL para que las escrituras
+        concurrentes sobre un mismo piso no pierdan incrementos.
+        """
+        deltas = defaultdict(Counter)
+        for floor_id, state in removed:
+            deltas[floor_id][state] -= 1
+        for floor_id, state in added:
+            deltas[floor_id][state] += 1
+        rows = [(floor_id, counts) for floor_id, counts in deltas.items() if any(counts.values())]
+        if not rows:
+            return
+        columns = self._counter_fields(kind)
+        self.env.cr.execute("""
+            UPDATE cowork_floor f
+               SET {assignments}
+              FROM unnest(%s::int[], {arrays}) AS t(floor_id, total, {states})
+             WHERE f.id = t.floor_id
+        """.format(
+            assignments=', '.join('%s = f.%s + t.%s' % (column, column, alias)
+                                  for column, alias in zip(columns, ('total',) + SPACE_STATES)),
+            arrays=', '.join(['%s::int[]'] * (len(SPACE_STATES) + 1)),
+            states=', '.join(SPACE_STATES),
+        ), [
+            [floor_id for floor_id, counts in rows],
+            [sum(counts.values()) for floor_id, counts in rows],
+        ] + [[counts[state] for floor_id, counts in rows] for state in SPACE_STATES])
+        self.browse([floor_id for floor_id, counts in rows]).invalidate_recordset(
+            columns + ['occupancy_rate'])
+
+    @api.model
+    def _rebuild_space_counters(self, kinds=SPACE_KINDS):
+        """Recalcular los contadores con una consulta agrupada por tipo de espacio"""
+        for kind in kinds:
+            self.env['cowork.%s' % kind].flush_model(['floor_id', 'state', 'active'])
+            columns = self._counter_fields(kind)
+            self.env.cr.execute("""
+                UPDATE cowork_floor f
+                   SET {assignments}
+                  FROM cowork_floor f2
+                  LEFT JOIN (SELECT floor_id, count(*) AS total, {filters}
+                               FROM cowork_{kind}
+                              WHERE active
+                              GROUP BY floor_id) c ON c.floor_id = f2.id
+                 WHERE f.id = f2.id
+            """.format(
+                kind=kind,
+                assignments=', '.join('%s = COALESCE(c.%s, 0)' % (column, alias)
+                                      for column, alias in zip(columns, ('total',) + SPACE_STATES)),
+                filters=', '.join("count(*) FILTER (WHERE state = '%s') AS %s" % (state, state)
+                                  for state in SPACE_STATES),
+            ))
+            self.invalidate_model(columns + ['occupancy_rate'])
+
+    def action_rebuild_space_counters(self):
+        self._rebuild_space_counters()
+
+    @api.model
+    def get_building_occupancy(self):
+        """Ocupación por edificio leída de los contadores: {edificio: {campo: total}}"""
+        aggregates = ['%s:sum' % column for kind in SPACE_KINDS for column in self._counter_fields(kind)]
+        result = {}
+        for group in self._read_group([], ['building_name'], aggregates):
+            building, values = group[0], group[1:]
+            result[building or ''] = {
+                aggregate.split(':')[0]: value or 0 for aggregate, value in zip(aggregates, values)
+            }
+        return result
     
     def action_view_desks(self):
         self.ensure_one()
@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+
+import logging
+import threading
+from datetime import timedelta
+
+from odoo import models, fields, api
+
+_logger = logging.getLogger(__name__)
+
+# Movimientos de créditos que cuentan como emitidos
+ISSUED_CREDITS_TYPES = ('granted', 'purchased', 'bonus', 'renewal')
+
+
+class CoworkKpiSnapshot(models.Model):
+    _name = 'cowork.kpi.snapshot'
+    _description = 'Foto Diaria de Ocupación y KPIs'
+    _order = 'date desc, id'
+
+    date = fields.Date(string='Fecha', required=True, readonly=True, index=True)
+    company_id = fields.Many2one('res.company', string='Compañía', readonly=True)
+    floor_id = fields.Many2one('cowork.floor', string='Piso', readonly=True, ondelete='set null')
+    building_name = fields.Char(related='floor_id.building_name', string='Edificio')
+    space_type = fields.Selection([
+        ('coworking', 'Coworking'),
+        ('coliving', 'Coliving'),
+    ], string='Tipo de Espacio', readonly=True)
+    plan_id = fields.Many2one('cowork.membership.plan', string='Plan', readonly=True,
+                               ondelete='set null')
+
+    active_members = fields.Integer(string='Miembros Activos', readonly=True)
+    occupied_desks = fields.Integer(string='Escritorios Ocupados', readonly=True)
+    occupied_beds = fields.Integer(string='Camas Ocupadas', readonly=True)
+    bookings = fields.Integer(string='Reservas de Servicios', readonly=True)
+    credits_issued = fields.Integer(string='Créditos Emitidos', readonly=True)
+    credits_spent = fields.Integer(string='Créditos Gastados', readonly=True)
+    mrr = fields.Monetary(string='MRR', readonly=True, currency_field='currency_id',
+                          help='Ingreso mensual recurrente de las membresías vigentes')
+    currency_id = fields.Many2one(related='company_id.currency_id', string='Moneda')
+
+    @api.model
+    def _snapshot(self, date_from, date_to):
+        """Recalcular las fotos de los días entre ``date_from`` y ``date_to`` (incluidos).
+
+        Una sola sentencia por rango: se borran las filas de esos días y se
+        vuelven a insertar agregadas por compañía, piso, tipo de espacio y
+        plan, de modo que repetir un rango no duplica datos.
+        """
+        for model_name in ('cowork.membership', 'cowork.space.reservation',
+                           'cowork.access.request', 'cowork.credits'):
+            self.env[model_name].flush_model()
+        self.env.cr.execute("DELETE FROM cowork_kpi_snapshot WHERE date BETWEEN %s AND %s",
+                            [date_from, date_to])
+        self.env.cr.execute("""
+            WITH days AS (
+                SELECT d::date AS day
+                  FROM generate_series(%(from)s::date, %(to)s::date, interval '1 day') d
+            ),
+            membership AS (
+                SELECT m.id, m.company_id, m.plan_id, m.space_type,
+                       COALESCE(desk.floor_id, bed.floor_id, m.floor_id) AS floor_id,
+                       m.date_start, m.date_end, m.state,
+                       p.price * 30.0 / NULLIF(GREATEST(p.duration_value, 1) * CASE p.duration_type
+                            WHEN 'daily' THEN 1 WHEN 'weekly' THEN 7
+                            WHEN 'monthly' THEN 30 WHEN 'annual' THEN 365 END, 0) AS monthly_price
+                  FROM cowork_membership m
+                  JOIN cowork_membership_plan p ON p.id = m.plan_id
+                  LEFT JOIN cowork_desk desk ON desk.id = m.desk_id AND m.space_type = 'coworking'
+                  LEFT JOIN cowork_bed bed ON bed.id = m.bed_id AND m.space_type = 'coliving'
+            ),
+            facts AS (
+                -- Membresías vigentes cada día
+                SELECT days.day, m.company_id, m.floor_id, m.space_type, m.plan_id,
+                       1 AS active_members, 0 AS occupied_desks, 0 AS occupied_beds,
+                       0 AS bookings, 0 AS credits_issued, 0 AS credits_spent,
+                       m.monthly_price AS mrr
+                  FROM days
+                  JOIN membership m
+                    ON m.date_start <= days.day
+                   AND (m.date_end IS NULL OR m.date_end > days.day)
+                   AND m.state IN ('confirmed', 'active', 'expired')
+                 UNION ALL
+                -- Escritorios y camas reservados cada día
+                SELECT days.day, r.company_id, COALESCE(desk.floor_id, bed.floor_id),
+                       m.space_type, m.plan_id,
+                       0, (r.desk_id IS NOT NULL)::int, (r.bed_id IS NOT NULL)::int,
+                       0, 0, 0, 0
+                  FROM days
+                  JOIN cowork_space_reservation r
+                    ON r.date_start <= days.day
+                   AND (r.date_end IS NULL OR r.date_end > days.day)
+                   AND r.state = 'confirmed'
+                  JOIN membership m ON m.id = r.membership_id
+                  LEFT JOIN cowork_desk desk ON desk.id = r.desk_id
+                  LEFT JOIN cowork_bed bed ON bed.id = r.bed_id
+                 UNION ALL
+                -- Solicitudes de acceso aprobadas por día programado
+                SELECT a.date_scheduled::date, a.company_id, m.floor_id, m.space_type, m.plan_id,
+                       0, 0, 0, 1, 0, 0, 0
+                  FROM cowork_access_request a
+                  LEFT JOIN membership m ON m.id = a.membership_id
+                 WHERE a.state = 'approved'
+                   AND a.date_scheduled >= %(from)s::date
+                   AND a.date_scheduled < %(to)s::date + 1
+                 UNION ALL
+                -- Créditos emitidos y gastados (los reembolsos descuentan del gasto)
+                SELECT c.date::date, c.company_id, m.floor_id, m.space_type, m.plan_id,
+                       0, 0, 0, 0,
+                       CASE WHEN c.credits_type IN %(issued)s AND c.credits_amount > 0
+                            THEN c.credits_amount ELSE 0 END,
+                       CASE WHEN c.credits_type IN ('used', 'refund')
+                            THEN -c.credits_amount ELSE 0 END,
+                       0
+                  FROM cowork_credits c
+                  LEFT JOIN membership m ON m.id = c.membership_id
+                 WHERE c.credits_type IN %(movements)s
+                   AND c.date >= %(from)s::date
+                   AND c.date < %(to)s::date + 1
+            )
+            INSERT INTO cowork_kpi_snapshot
+                   (date, company_id, floor_id, space_type, plan_id,
+                    active_members, occupied_desks, occupied_beds, bookings,
+                    credits_issued, credits_spent, mrr,
+                    create_uid, create_date, write_uid, write_date)
+            SELECT day, company_id, floor_id, space_type, plan_id,
+                   SUM(active_members), SUM(occupied_desks), SUM(occupied_beds), SUM(bookings),
+                   SUM(credits_issued), SUM(credits_spent), COALESCE(SUM(mrr), 0),
+                   %(uid)s, now() at time zone 'UTC', %(uid)s, now() at time zone 'UTC'
+              FROM facts
+             GROUP BY day, company_id, floor_id, space_type, plan_id
+        """, {
+            'from': date_from,
+            'to': date_to,
+            'issued': ISSUED_CREDITS_TYPES,
+            'movements': ISSUED_CREDITS_TYPES + ('used', 'refund'),
+            'uid': self.env.uid,
+        })
+        count = self.env.cr.rowcount
+        self.invalidate_model()
+        return count
+
+    @api.model
+    def _cron_snapshot(self, refresh_days=2, backfill_days=365, chunk_days=31):
+        """Cron nocturno: completar las fotos hasta ayer de forma incremental.
+
+        Continúa desde el último día guardado y rehace los ``refresh_days``
+        más recientes por si llegaron movimientos con fecha atrasada. La
+        primera ejecución reconstruye como máximo ``backfill_days``.
+        """
+        yesterday = fields.Date.context_today(self) - timedelta(days=1)
+        self.env.cr.execute("SELECT MAX(date) FROM cowork_kpi_snapshot")
+        last = self.env.cr.fetchone()[0]
+        if last:
+            date_from = min(last + timedelta(days=1), yesterday - timedelta(days=refresh_days - 1))
+        else:
+            date_from = yesterday - timedelta(days=backfill_days - 1)
+        auto_commit = not getattr(threading.current_thread(), 'testing', False)
+        count = 0
+        while date_from <= yesterday:
+            date_to = min(date_from + timedelta(days=chunk_days - 1), yesterday)
+            count += self._snapshot(date_from, date_to)
+            if auto_commit:
+                self.env.cr.commit()
+            date_from = date_to + timedelta(days=1)
+        _logger.info("Fotos diarias de KPIs: %s filas actualizadas", count)
+        return count
@@ -0,0 +1,254 @@
+# -*- coding: utf-8 -*-
+
+import logging
+import threading
+
+from odoo import models, fields, api, _
+from odoo.exceptions import UserError
+from dateutil.relativedelta import relativedelta
+
+_logger = logging.getLogger(__name__)
+
+# Tabla y columna de importe de cada historial con checkpoints
+LEDGERS = {
+    'credits': ('cowork.credits', 'cowork_credits', 'credits_amount'),
+    'passes': ('cowork.passes', 'cowork_passes', 'amount'),
+}
+
+
+class CoworkLedgerCheckpoint(models.Model):
+    _name = 'cowork.ledger.checkpoint'
+    _description = 'Checkpoint de Historial de Créditos y Pases'
+    _order = 'last_entry_id desc, id desc'
+
+    ledger_type = fields.Selection([
+        ('credits', 'Créditos'),
+        ('passes', 'Pases'),
+    ], string='Historial', required=True, readonly=True)
+    partner_id = fields.Many2one('res.partner', string='Miembro', required=True,
+                                  readonly=True, ondelete='cascade')
+    membership_id = fields.Many2one('cowork.membership', string='Membresía', readonly=True,
+                                     ondelete='set null')
+    date = fields.Datetime(string='Fecha', default=fields.Datetime.now, readonly=True)
+    last_entry_id = fields.Integer(string='Último Movimiento Incluido', required=True,
+                                    readonly=True,
+                                    help='Los movimientos con ID mayor forman la cola del balance')
+    balance = fields.Integer(string='Balance', readonly=True)
+    company_id = fields.Many2one('res.company', string='Compañía',
+                                  default=lambda self: self.env.company)
+
+    def init(self):
+        self.env.cr.execute("""
+            CREATE INDEX IF NOT EXISTS cowork_ledger_checkpoint_mark_idx
+                ON cowork_ledger_checkpoint (ledger_type, partner_id, last_entry_id)
+        """)
+        # La cola de cada miembro se lee por rango de ID
+        for _model, table, _column in LEDGERS.values():
+            self.env.cr.execute("""
+                CREATE INDEX IF NOT EXISTS {table}_partner_entry_idx
+                    ON {table} (partner_id, id)
+            """.format(table=table))
+
+    @api.model
+    def _get_balances(self, ledger_type, partner_ids=None, membership_ids=None, up_to_id=None):
+        """Balance = último checkpoint del miembro + movimientos posteriores.
+
+        Devuelve {(partner_id, membership_id): balance}. Sin ``partner_ids``
+        se calculan todos los miembros; ``up_to_id`` limita la cola a los
+        movimientos con ID menor o igual.
+        """
+        model_name, table, column = LEDGERS[ledger_type]
+        self.env[model_name].flush_model(['partner_id', 'membership_id', column])
+        self.flush_model()
+        where_partner = where_l_partner = ""
+        if partner_ids is not None:
+            where_partner = "AND partner_id = ANY(%(partner_ids)s)"
+            where_l_partner = "AND l.partner_id = ANY(%(partner_ids)s)"
+        where_membership = "AND membership_id = ANY(%(membership_ids)s)" if membership_ids is not None else ""
+        where_up_to = "AND l.id <= %(up_to_id)s" if up_to_id else ""
+        self.env.cr.execute("""
+            WITH mark AS (
+                SELECT partner_id, MAX(last_entry_id) AS last_entry_id
+                  FROM cowork_ledger_checkpoint
+                 WHERE ledger_type = %(ledger_type)s {where_partner}
+                 GROUP BY partner_id
+            )
+            SELECT partner_id, membership_id, SUM(amount)
+              FROM (
+                    SELECT c.partner_id, c.membership_id, c.balance AS amount
+                      FROM cowork_ledger_checkpoint c
+                      JOIN mark m ON m.partner_id = c.partner_id
+                                 AND m.last_entry_id = c.last_entry_id
+                     WHERE c.ledger_type = %(ledger_type)s
+                    UNION ALL
+                    SELECT l.partner_id, l.membership_id, l.{column}
+                      FROM {table} l
+                      LEFT JOIN mark m ON m.partner_id = l.partner_id
+                     WHERE l.id > COALESCE(m.last_entry_id, 0) {where_l_partner} {where_up_to}
+                   ) t
+             WHERE TRUE {where_membership}
+             GROUP BY partner_id, membership_id
+        """.format(
+            table=table,
+            column=column,
+            where_partner=where_partner,
+            where_l_partner=where_l_partner,
+            where_membership=where_membership,
+            where_up_to=where_up_to,
+        ), {
+            'ledger_type': ledger_type,
+            'partner_ids': list(partner_ids or []),
+            'membership_ids': list(membership_ids or []),
+            'up_to_id': up_to_id,
+        })
+        return {(partner_id, membership_id): amount
+                for partner_id, membership_id, amount in self.env.cr.fetchall()}
+
+    @api.model
+    def _get_partner_balances(self, ledger_type, partner_ids=None):
+        """Devolver {partner_id: balance} sumando todas las membresías"""
+        balances = {}
+        for (partner_id, _membership_id), amount in self._get_balances(ledger_type, partner_ids).items():
+            balances[partner_id] = balances.get(partner_id, 0) + amount
+        return balances
+
+    @api.model
+    def _get_membership_balances(self, ledger_type, memberships):
+        """Devolver {membership_id: balance} de las membresías indicadas"""
+        balances = self._get_balances(ledger_type, memberships.partner_id.ids,
+                                      membership_ids=memberships.ids)
+        return {membership_id: amount for (_partner_id, membership_id), amount in balances.items()}
+
+    @api.model
+    def _create_checkpoints(self, ledger_type, batch_size=1000):
+        """Crear checkpoints para los miembros con movimientos desde el último.
+
+        Todos los grupos (miembro, membresía) de un miembro comparten el mismo
+        ``last_entry_id``, de modo que la cola se lee con un rango de ID.
+        """
+        model_name, table, _column = LEDGERS[ledger_type]
+        self.env[model_name].flush_model()
+        auto_commit = not getattr(threading.current_thread(), 'testing', False)
+        # La marca se lee con las altas detenidas: el bloqueo exclusivo espera a
+        # que terminen las transacciones que escriben en el historial, y el commit
+        # abre una instantánea nueva que ya incluye todos sus movimientos.
+        self.env.cr.execute("SELECT pg_advisory_lock(hashtext(%s))", [table])
+        try:
+            if auto_commit:
+                self.env.cr.commit()
+            self.env.cr.execute("SELECT MAX(id) FROM {table}".format(table=table))
+            watermark = self.env.cr.fetchone()[0]
+        finally:
+            self.env.cr.execute("SELECT pg_advisory_unlock(hashtext(%s))", [table])
+        if not watermark:
+            return 0
+        self.env.cr.execute("""
+            SELECT DISTINCT l.partner_id
+              FROM {table} l
+              LEFT JOIN (
+                    SELECT partner_id, MAX(last_entry_id) AS last_entry_id
+                      FROM cowork_ledger_checkpoint
+                     WHERE ledger_type = %s
+                     GROUP BY partner_id
+              ) m ON m.partner_id = l.partner_id
+             WHERE l.id > COALESCE(m.last_entry_id, 0)
+               AND l.id <= %s
+        """.format(table=table), [ledger_type, watermark])
+        partner_ids = [row[0] for row in self.env.cr.fetchall()]
+        count = 0
+        for index in range(0, len(partner_ids), batch_size):
+            chunk = partner_ids[index:index + batch_size]
+            balances = self._get_balances(ledger_type, chunk, up_to_id=watermark)
+            vals_list = [{
+                'ledger_type': ledger_type,
+                'partner_id': partner_id,
+                'membership_id': membership_id,
+                'last_entry_id': watermark,
+                'balance': amount,
+            } for (partner_id, membership_id), amount in balances.items()]
+            # Un miembro con balance cero también necesita su marca
+            covered = {vals['partner_id'] for vals in vals_list}
+            vals_list += [{
+                'ledger_type': ledger_type,
+                'partner_id': partner_id,
+                'last_entry_id': watermark,
+                'balance': 0,
+            } for partner_id in chunk if partner_id not in covered]
+            self.create(vals_list)
+            count += len(vals_list)
+            if auto_commit:
+                self.env.cr.commit()
+        _logger.info("Creados %s checkpoints de %s", count, ledger_type)
+        return count
+
+    @api.model
+    def _lock_ledger_writes(self, ledger_type):
+        """Registrar una escritura en el historial hasta el fin de la transacción.
+
+        Es un bloqueo compartido: las altas no se esperan entre sí, solo
+        mientras ``_create_checkpoints`` lee la marca. Debe tomarse antes de
+        insertar, para que ningún ID quede asignado a un movimiento sin confirmar.
+        """
+        _model_name, table, _column = LEDGERS[ledger_type]
+        self.env.cr.execute("SELECT pg_advisory_xact_lock_shared(hashtext(%s))", [table])
+
+    @api.model
+    def _archive_checkpointed_entries(self, ledger_type, older_than, partner_ids=None):
+        """Archivar los movimientos ya incluidos en un checkpoint y anteriores a la fecha.
+
+        Los lotes de créditos con saldo pendiente se mantienen visibles. Con
+        ``partner_ids`` solo se archivan los movimientos de esos miembros.
+        """
+        model_name, table, _column = LEDGERS[ledger_type]
+        self.env[model_name].flush_model()
+        extra = "AND l.remaining_amount = 0" if ledger_type == 'credits' else ""
+        if partner_ids is not None:
+            extra += " AND l.partner_id = ANY(%(partner_ids)s)"
+        self.env.cr.execute("""
+            UPDATE {table} l
+               SET active = FALSE
+              FROM (
+                    SELECT partner_id, MAX(last_entry_id) AS last_entry_id
+                      FROM cowork_ledger_checkpoint
+                     WHERE ledger_type = %(ledger_type)s
+                     GROUP BY partner_id
+              ) m
+             WHERE m.partner_id = l.partner_id
+               AND l.id <= m.last_entry_id
+               AND l.active
+               AND l.date < %(older_than)s
+               {extra}
+        """.format(table=table, extra=extra), {
+            'ledger_type': ledger_type,
+            'older_than': older_than,
+            'partner_ids': list(partner_ids or []),
+        })
+        count = self.env.cr.rowcount
+        self.env[model_name].invalidate_model(['active'])
+        return count
+
+    @api.model
+    def _check_entries_editable(self, ledger_type, entries):
+        """Impedir cambios de importe en movimientos ya incluidos en un checkpoint"""
+        if not entries:
+            return
+        self.env.cr.execute("""
+            SELECT 1
+              FROM cowork_ledger_checkpoint c
+              JOIN unnest(%s::int[], %s::int[]) AS t(entry_id, partner_id)
+                ON t.partner_id = c.partner_id AND c.last_entry_id >= t.entry_id
+             WHERE c.ledger_type = %s
+             LIMIT 1
+        """, [entries.ids, [entry.partner_id.id for entry in entries], ledger_type])
+        if self.env.cr.fetchone():
+            raise UserError(_('No se pueden modificar ni eliminar movimientos ya incluidos '
+                              'en un checkpoint de balance. Registre un movimiento de ajuste.'))
+
+    @api.model
+    def _cron_create_checkpoints(self, archive_months=12):
+        """Cron: checkpoints de créditos y pases, y archivado de movimientos antiguos"""
+        older_than = fields.Datetime.now() - relativedelta(months=archive_months)
+        for ledger_type in LEDGERS:
+            self._create_checkpoints(ledger_type)
+            if archive_months:
+                self._archive_checkpointed_entries(ledger_type, older_than)
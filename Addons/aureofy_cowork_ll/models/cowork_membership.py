@@ -1,14 +1,20 @@
 # -*- coding: utf-8 -*-
 
+import logging
+import threading
+import time
+
 from odoo import models, fields, api, _
 from odoo.exceptions import UserError, ValidationError
 from dateutil.relativedelta import relativedelta
 
+_logger = logging.getLogger(__name__)
+
 
 class CoworkMembership(models.Model):
     _name = 'cowork.membership'
     _description = 'Membresía'
-    _inherit = ['mail.thread', 'mail.activity.mixin', 'portal.mixin']
+    _inherit = ['mail.thread', 'mail.activity.mixin', 'portal.mixin', 'cowork.bulk.mixin']
     _order = 'name desc'
 
     name = fields.Char(string='Número de Membresía', readonly=True, copy=False,
@@ -26,10 +32,11 @@ class CoworkMembership(models.Model):
     space_type = fields.Selection(string='Tipo de Espacio', related='plan_id.space_type', store=True)
     
     # Asignación de espacio
+    # La disponibilidad por fechas se valida al confirmar (cowork.space.reservation)
     desk_id = fields.Many2one('cowork.desk', string='Escritorio Asignado',
-                               domain=[('state', '=', 'available')])
+                               domain=[('state', '!=', 'maintenance')])
     bed_id = fields.Many2one('cowork.bed', string='Cama Asignada',
-                              domain=[('state', '=', 'available')])
+                              domain=[('state', '!=', 'maintenance')])
     floor_id = fields.Many2one('cowork.floor', string='Piso Exclusivo',
                                 domain=[('is_exclusive', '=', True), ('state', '=', 'available')])
     allows_exclusive_floor = fields.Boolean(related='plan_id.allows_exclusive_floor', readonly=True)
@@ -44,6 +51,16 @@ class CoworkMembership(models.Model):
     date_start = fields.Date(string='Fecha de Inicio', required=True, tracking=True)
     date_end = fields.Date(string='Fecha de Fin', compute='_compute_date_end', 
                            store=True, tracking=True)
+    next_benefit_date = fields.Date(string='Próxima Renovación de Beneficios',
+                                    compute='_compute_next_benefit_date', store=True,
+                                    readonly=False, index=True, copy=False,
+                                    help='Fecha en que se renuevan créditos, pases y horas '
+                                         'de los planes recurrentes')
+    renewed_from_id = fields.Many2one('cowork.membership', string='Renovación de',
+                                      readonly=True, copy=False, index='btree_not_null',
+                                      ondelete='set null')
+    renewal_reminder_sent = fields.Boolean(string='Recordatorio Enviado', default=False,
+                                            copy=False, readonly=True)
     
     # Estado
     state = fields.Selection([
@@ -81,10 +98,14 @@ class CoworkMembership(models.Model):
     
     call_room_hours_granted = fields.Integer(string='Horas Call Room (Mes)',
                                               compute='_compute_call_room_hours', store=True)
-    # Nota: Se podría calcular dinámicamente con access_request_ids
-    call_room_hours_used = fields.Float(string='Horas Call Room Usadas (Mes)', default=0.0)
+    call_room_period_start = fields.Date(string='Inicio Periodo Call Room', readonly=True, copy=False,
+                                          help='Inicio del periodo de beneficios vigente')
+    call_room_hours_used = fields.Float(string='Horas Call Room Usadas (Mes)',
+                                         compute='_compute_call_room_remaining')
     call_room_hours_remaining = fields.Float(string='Horas Call Room Disp.',
                                               compute='_compute_call_room_remaining')
+    call_room_hours_ids = fields.One2many('cowork.call.room.hours', 'membership_id',
+                                           string='Historial de Horas Call Room')
     
     # Depósito de seguridad
     deposit_id = fields.Many2one('cowork.security.deposit', string='Depósito de Seguridad')
@@ -96,12 +117,13 @@ class CoworkMembership(models.Model):
     
     sale_order_ids = fields.One2many('sale.order', 'membership_id', string='Órdenes de Venta')
     sale_order_count = fields.Integer(compute='_compute_sale_order_count')
+    # Resumen de facturación: se recalcula solo al cambiar las facturas vinculadas
     amount_total = fields.Monetary(string='Monto Total', compute='_compute_amounts',
-                                    currency_field='currency_id')
+                                    store=True, currency_field='currency_id')
     amount_paid = fields.Monetary(string='Monto Pagado', compute='_compute_amounts',
-                                   currency_field='currency_id')
+                                   store=True, currency_field='currency_id')
     amount_due = fields.Monetary(string='Monto Pendiente', compute='_compute_amounts',
-                                  currency_field='currency_id')
+                                  store=True, currency_field='currency_id')
     
     currency_id = fields.Many2one('res.currency', string='Moneda',
                                    default=lambda self: self.env.company.currency_id)
@@ -124,16 +146,69 @@ class CoworkMembership(models.Model):
     # Campos para portal
     access_token = fields.Char(string='Token de Acceso', copy=False)
     
+    def init(self):
+        # Vencimientos y recordatorios recorren solo las membresías vigentes por fecha de fin
+        self.env.cr.execute("""
+            CREATE INDEX IF NOT EXISTS cowork_membership_open_date_end_idx
+                ON cowork_membership (date_end, id)
+             WHERE state IN ('confirmed', 'active')
+        """)
+        # Miembros con saldo pendiente
+        self.env.cr.execute("""
+            CREATE INDEX IF NOT EXISTS cowork_membership_amount_due_idx
+                ON cowork_membership (amount_due)
+             WHERE amount_due > 0
+        """)
+
     @api.model_create_multi
     def create(self, vals_list):
         for vals in vals_list:
             if vals.get('name', _('Nuevo')) == _('Nuevo'):
                 vals['name'] = self.env['ir.sequence'].next_by_code('cowork.membership') or _('Nuevo')
         records = super().create(vals_list)
-        # Marcar al contacto como miembro
-        for record in records:
-            record.partner_id.write({'is_cowork_member': True})
+        # Marcar a los contactos como miembros
+        records.partner_id.filtered(lambda p: not p.is_cowork_member).write({'is_cowork_member': True})
         return records
+
+    def write(self, vals):
+        # Cambiar espacio o fechas de una membresía vigente rehace su reserva
+        rebook = self.browse()
+        if {'desk_id', 'bed_id', 'date_start', 'date_end', 'plan_id'} & set(vals):
+            rebook = self.filtered(lambda m: m.state in ('confirmed', 'active'))
+        if not rebook:
+            return super().write(vals)
+        held_desks = rebook.desk_id.filtered(lambda desk: desk.membership_id in rebook)
+        held_beds = rebook.bed_id.filtered(lambda bed: bed.membership_id in rebook)
+        res = super().write(vals)
+        rebook._rebook_spaces(held_desks, held_beds)
+        return res
+
+    def _rebook_spaces(self, held_desks, held_beds):
+        """Sustituir las reservas de las membresías por las de su espacio y fechas actuales.
+
+        Los espacios que dejan de corresponderles se liberan y pasan a la
+        siguiente reserva en curso; los nuevos se asignan si ya están libres.
+        """
+        Reservation = self.env['cowork.space.reservation']
+        Reservation.search([('membership_id', 'in', self.ids),
+                            ('state', '=', 'confirmed')]).write({'state': 'cancelled'})
+        Reservation._reserve(self)
+        today = fields.Date.context_today(self)
+
+        def keeps(space, field_name):
+            membership = space.membership_id
+            return (membership[field_name] == space
+                    and membership.space_type == ('coworking' if field_name == 'desk_id' else 'coliving')
+                    and membership.date_start <= today
+                    and (not membership.date_end or membership.date_end > today))
+
+        desks = held_desks.filtered(lambda desk: not keeps(desk, 'desk_id'))
+        beds = held_beds.filtered(lambda bed: not keeps(bed, 'bed_id'))
+        desks.action_set_available()
+        beds.action_set_available()
+        Reservation._hand_over(desks, beds)
+        self.filtered(lambda m: m.space_type == 'coworking' and m.desk_id)._assign_spaces('desk_id')
+        self.filtered(lambda m: m.space_type == 'coliving' and m.bed_id)._assign_spaces('bed_id')
     
     @api.depends('plan_id', 'date_start')
     def _compute_date_end(self):
@@ -144,6 +219,31 @@ class CoworkMembership(models.Model):
             else:
                 record.date_end = False
     
+    @api.depends('date_start')
+    def _compute_next_benefit_date(self):
+        today = fields.Date.context_today(self)
+        for record in self:
+            if not record.date_start:
+                record.next_benefit_date = False
+            elif record.date_start < today:
+                # Membresías ya iniciadas: el aniversario de hoy aún está pendiente
+                record.next_benefit_date = record._get_next_benefit_date(today - relativedelta(days=1))
+            else:
+                record.next_benefit_date = record._get_next_benefit_date(record.date_start)
+
+    def _get_next_benefit_date(self, after):
+        """Primer aniversario mensual de la fecha de inicio posterior a ``after``.
+
+        Se calcula siempre desde la fecha de inicio, de modo que un inicio el
+        día 31 renueva el último día de los meses cortos sin desplazarse.
+        """
+        self.ensure_one()
+        months = (after.year - self.date_start.year) * 12 + after.month - self.date_start.month
+        next_date = self.date_start + relativedelta(months=months)
+        if next_date <= after:
+            next_date = self.date_start + relativedelta(months=months + 1)
+        return next_date
+
     @api.depends('plan_id.credits_included')
     def _compute_credits(self):
         for record in self:
@@ -173,8 +273,10 @@ class CoworkMembership(models.Model):
     
     @api.depends('partner_id', 'credits_granted', 'credits_used')
     def _compute_credits_remaining(self):
+        # Un solo acceso al balance materializado para todo el lote
+        balances = self.env['cowork.credits'].get_partner_balances(self.partner_id.ids)
         for record in self:
-            record.credits_remaining = self.env['cowork.credits'].get_partner_balance(record.partner_id.id)
+            record.credits_remaining = balances.get(record.partner_id.id, 0)
     
     @api.depends('plan_id.passes_included')
     def _compute_passes(self):
@@ -183,18 +285,42 @@ class CoworkMembership(models.Model):
 
     @api.depends('partner_id', 'passes_granted', 'passes_used')
     def _compute_passes_remaining(self):
+        balances = self.env['cowork.passes'].get_partner_balances(self.partner_id.ids)
         for record in self:
-             record.passes_remaining = self.env['cowork.passes'].get_partner_balance(record.partner_id.id)
+            record.passes_remaining = balances.get(record.partner_id.id, 0)
 
     @api.depends('plan_id.call_room_hours_included')
     def _compute_call_room_hours(self):
         for record in self:
             record.call_room_hours_granted = record.plan_id.call_room_hours_included if record.plan_id else 0
             
-    @api.depends('call_room_hours_granted', 'call_room_hours_used')
+    @api.depends('call_room_period_start', 'call_room_hours_ids.hours')
     def _compute_call_room_remaining(self):
+        hours = self._origin._get_call_room_hours()
         for record in self:
-            record.call_room_hours_remaining = max(0.0, record.call_room_hours_granted - record.call_room_hours_used)
+            used, remaining = hours.get(record._origin.id, (0.0, 0.0))
+            record.call_room_hours_used = used
+            record.call_room_hours_remaining = max(0.0, remaining)
+
+    def _get_call_room_period_start(self):
+        self.ensure_one()
+        return self.call_room_period_start or self.date_start
+
+    def _get_call_room_hours(self):
+        """Devolver {membership_id: (usadas, disponibles)} del periodo vigente en una consulta"""
+        if not self.ids:
+            return {}
+        self.flush_recordset(['call_room_period_start', 'date_start'])
+        self.env['cowork.call.room.hours'].flush_model()
+        self.env.cr.execute("""
+            SELECT m.id, b.hours_used, b.balance
+              FROM cowork_membership m
+              JOIN cowork_call_room_balance b
+                ON b.membership_id = m.id
+               AND b.period_start = COALESCE(m.call_room_period_start, m.date_start)
+             WHERE m.id = ANY(%s)
+        """, [self.ids])
+        return {membership_id: (used, balance) for membership_id, used, balance in self.env.cr.fetchall()}
     
     @api.depends('access_request_ids')
     def _compute_access_request_count(self):
@@ -220,7 +346,7 @@ class CoworkMembership(models.Model):
             record.amount_paid = record.amount_total - record.amount_due
     
     def action_confirm(self):
-        """Confirmar la membresía"""
+        """Confirmar las membresías en bloque"""
         for record in self:
             if record.state != 'draft':
                 raise UserError(_('Solo se pueden confirmar membresías en estado borrador.'))
@@ -228,54 +354,89 @@ class CoworkMembership(models.Model):
             # Verificar políticas
             if record.plan_id.policy_ids and not record.policies_accepted:
                 raise UserError(_('El miembro debe aceptar las políticas antes de confirmar.'))
-            
-            # Asignar espacio
-            if record.space_type == 'coworking' and record.desk_id:
-                record.desk_id.write({
-                    'state': 'reserved',
-                    'member_id': record.partner_id.id,
-                    'membership_id': record.id,
-                })
-            elif record.space_type == 'coliving' and record.bed_id:
-                record.bed_id.write({
-                    'state': 'reserved',
-                    'member_id': record.partner_id.id,
-                    'membership_id': record.id,
-                })
-            
-            # Asignar Piso Exclusivo
-            if record.plan_id.allows_exclusive_floor and record.floor_id:
-                if record.floor_id.state != 'available':
-                     raise UserError(_('El piso seleccionado ya no está disponible.'))
-                
-                record.floor_id.write({
-                    'state': 'rented',
-                    'member_id': record.partner_id.id,
-                    'date_start': record.date_start,
-                    'date_end': record.date_end,
-                })
-            
-            record.write({'state': 'confirmed'})
-            
-            # Registrar créditos otorgados
-            if record.credits_granted > 0:
-                self.env['cowork.credits'].create({
-                    'partner_id': record.partner_id.id,
-                    'membership_id': record.id,
-                    'credits_type': 'granted',
-                    'credits_amount': record.credits_granted,
-                    'description': _('Créditos del plan %s') % record.plan_id.name,
-                })
-            
-            # Registrar pases otorgados
-            if record.passes_granted > 0:
-                self.env['cowork.passes'].create({
-                    'partner_id': record.partner_id.id,
-                    'membership_id': record.id,
-                    'pass_type': 'granted',
-                    'amount': record.passes_granted,
-                    'description': _('Pases del plan %s') % record.plan_id.name,
-                })
+
+        # Asignar Piso Exclusivo
+        with_floor = self.filtered(lambda m: m.plan_id.allows_exclusive_floor and m.floor_id)
+        taken = with_floor.filtered(
+            lambda m: m.floor_id.state != 'available' and m.floor_id.member_id != m.partner_id)
+        if taken or len(with_floor.floor_id) != len(with_floor):
+            raise UserError(_('El piso seleccionado ya no está disponible.'))
+        for membership in with_floor:
+            membership.floor_id.write({
+                'state': 'rented',
+                'member_id': membership.partner_id.id,
+                'date_start': membership.date_start,
+                'date_end': membership.date_end,
+            })
+
+        # Reservar el espacio por fechas y asignarlo si ya está libre
+        self.env['cowork.space.reservation']._reserve(self)
+        self.filtered(lambda m: m.space_type == 'coworking' and m.desk_id)._assign_spaces('desk_id')
+        self.filtered(lambda m: m.space_type == 'coliving' and m.bed_id)._assign_spaces('bed_id')
+
+        self.write({'state': 'confirmed'})
+
+        # Registrar créditos, pases y horas otorgados con una sola alta por historial
+        self.env['cowork.credits'].create([{
+            'partner_id': record.partner_id.id,
+            'membership_id': record.id,
+            'credits_type': 'granted',
+            'credits_amount': record.credits_granted,
+            'date_expiration': record._get_credits_expiration(record.next_benefit_date),
+            'description': _('Créditos del plan %s') % record.plan_id.name,
+        } for record in self if record.credits_granted > 0])
+        self.env['cowork.passes'].create([{
+            'partner_id': record.partner_id.id,
+            'membership_id': record.id,
+            'pass_type': 'granted',
+            'amount': record.passes_granted,
+            'description': _('Pases del plan %s') % record.plan_id.name,
+        } for record in self if record.passes_granted > 0])
+
+        # Abrir el primer periodo de horas de Call Room
+        self._grant_call_room_hours('granted')
+
+    def _assign_spaces(self, field_name):
+        """Asignar el escritorio o cama a las membresías que ya empezaron.
+
+        Miembro y membresía se asignan con una sola sentencia; el cambio de
+        estado pasa por el ORM para conservar el seguimiento. Las membresías
+        futuras y los espacios que siguen ocupados por otro miembro se
+        asignan al llegar su fecha o al liberarse (ver
+        ``cowork.space.reservation._hand_over``).
+        """
+        today = fields.Date.context_today(self)
+        # Si varias membresías del lote comparten espacio, lo recibe la que empieza antes
+        assign_ids = []
+        seen = set()
+        for membership in self.filtered(lambda m: m.date_start <= today).sorted('date_start'):
+            space = membership[field_name]
+            if space.id not in seen and space._is_free_for(membership):
+                assign_ids.append(membership.id)
+            seen.add(space.id)
+        memberships = self.browse(assign_ids)
+        if not memberships:
+            return
+        spaces = memberships[field_name]
+        spaces.flush_recordset()
+        self.env.cr.execute("""
+            UPDATE {table} s
+               SET member_id = t.partner_id,
+                   membership_id = t.membership_id,
+                   write_uid = %s,
+                   write_date = now() at time zone 'UTC'
+              FROM unnest(%s::int[], %s::int[], %s::int[]) AS t(space_id, partner_id, membership_id)
+             WHERE s.id = t.space_id
+        """.format(table=spaces._table), [
+            self.env.uid,
+            [record[field_name].id for record in memberships],
+            [record.partner_id.id for record in memberships],
+            memberships.ids,
+        ])
+        spaces.invalidate_recordset(['member_id', 'membership_id', 'write_uid', 'write_date'])
+        spaces.filtered(lambda space: space.membership_id.state == 'active').write({'state': 'occupied'})
+        # Un espacio ocupado por la membresía anterior del mismo miembro sigue ocupado
+        spaces.filtered(lambda space: space.state != 'occupied').write({'state': 'reserved'})
     
     def action_create_invoice(self):
         """Crear factura para la membresía"""
@@ -331,11 +492,137 @@ class CoworkMembership(models.Model):
         """Crear presupuesto/suscripción de venta"""
         self.ensure_one()
         
-        if not self.plan_id.product_id:
-            self.plan_id._create_or_update_product()
-            if not self.plan_id.product_id:
-                raise UserError(_('El plan no tiene un producto configurado.'))
-            
+        # Integración opcional con sale_subscription si existe el campo
+        # Nota: la implementación de suscripciones varía según la versión y módulos instalados
+        sale_order = self._create_sale_orders()
+        
+        return {
+            'type': 'ir.actions.act_window',
+            'name': 'Presupuesto',
+            'res_model': 'sale.order',
+            'res_id': sale_order.id,
+            'view_mode': 'form',
+        }
+    
+    def action_activate(self):
+        """Activar las membresías tras el pago"""
+        if self.filtered(lambda m: m.state != 'confirmed'):
+            raise UserError(_('Solo se pueden activar membresías confirmadas.'))
+
+        # El piso exclusivo ya queda como 'rented' al confirmar
+        self.write({'state': 'active'})
+
+        # Ocupar el espacio si ya está asignado a la membresía o quedó libre;
+        # si no, se ocupa al traspasarse (ver ``_hand_over``)
+        self.filtered(lambda m: m.space_type == 'coworking' and m.desk_id)._assign_spaces('desk_id')
+        self.filtered(lambda m: m.space_type == 'coliving' and m.bed_id)._assign_spaces('bed_id')
+        self.desk_id.filtered(lambda desk: desk.membership_id in self).write({'state': 'occupied'})
+        self.filtered(lambda m: not m.desk_id).bed_id.filtered(
+            lambda bed: bed.membership_id in self).write({'state': 'occupied'})
+
+    def _release_spaces(self):
+        """Liberar escritorios, camas y pisos de las membresías.
+
+        Los espacios ya traspasados a una renovación no se liberan, y los
+        liberados pasan a la siguiente membresía que los tenga reservados.
+        """
+        Reservation = self.env['cowork.space.reservation']
+        Reservation._release(self)
+        desks = self.desk_id.filtered(lambda desk: desk.membership_id in self)
+        beds = self.filtered(lambda m: not m.desk_id).bed_id.filtered(
+            lambda bed: bed.membership_id in self)
+        desks.action_set_available()
+        beds.action_set_available()
+        Reservation._hand_over(desks, beds, exclude=self)
+        self.filtered(
+            lambda m: not m.floor_id.date_end or not m.date_end or m.floor_id.date_end <= m.date_end
+        ).floor_id.write({
+            'state': 'available',
+            'member_id': False,
+            'date_start': False,
+            'date_end': False,
+        })
+
+    def action_expire(self):
+        """Marcar membresías como expiradas"""
+        # Liberar espacio y expirar créditos, pases y horas restantes
+        self._release_spaces()
+        self._expire_remaining_credits()
+        self._expire_remaining_passes()
+        self._expire_remaining_call_room_hours()
+        self.write({'state': 'expired'})
+    
+    def action_cancel(self):
+        """Cancelar membresías"""
+        self._release_spaces()
+        self._expire_remaining_credits()
+        self._expire_remaining_passes()
+        self._expire_remaining_call_room_hours()
+        self.write({'state': 'cancelled'})
+    
+    def action_bulk_transition(self, method):
+        """Acción masiva: aplicar una transición de estado en modo silencioso"""
+        if method not in ('action_confirm', 'action_activate', 'action_expire', 'action_cancel'):
+            raise UserError(_('Transición no permitida: %s') % method)
+        getattr(self._bulk(), method)()
+        self._post_bulk_summary(_('%s aplicada a %s membresías') % (method, len(self)))
+        return True
+
+    def action_renew(self):
+        """Renovar membresía"""
+        self.ensure_one()
+        new_membership = self._renew_batch()
+        
+        return {
+            'type': 'ir.actions.act_window',
+            'name': 'Nueva Membresía',
+            'res_model': 'cowork.membership',
+            'res_id': new_membership.id,
+            'view_mode': 'form',
+        }
+
+    def _prepare_renewal_vals(self):
+        """Valores de la membresía sucesora: mismo plan y espacios, inicia al terminar esta"""
+        self.ensure_one()
+        return {
+            'partner_id': self.partner_id.id,
+            'plan_id': self.plan_id.id,
+            'date_start': self.date_end or fields.Date.context_today(self),
+            'desk_id': self.desk_id.id,
+            'bed_id': self.bed_id.id,
+            'floor_id': self.floor_id.id,
+            'service_ids': [(6, 0, self.service_ids.ids)],
+            'policy_ids': [(6, 0, self.policy_ids.ids)],
+            'policies_accepted': self.policies_accepted,
+            'requirements': self.requirements,
+            'user_id': self.user_id.id,
+            'company_id': self.company_id.id,
+            'currency_id': self.currency_id.id,
+            'renewed_from_id': self.id,
+        }
+
+    def _renew_batch(self, confirm=False, create_sale_orders=False):
+        """Crear las membresías sucesoras de todo el recordset en una sola alta.
+
+        Opcionalmente las confirma y crea sus órdenes de venta en bloque.
+        Devuelve las nuevas membresías.
+        """
+        if self.filtered(lambda m: m.state in ('draft', 'cancelled')):
+            raise UserError(_('Solo se pueden renovar membresías confirmadas, activas o expiradas.'))
+        already = self.search([('renewed_from_id', 'in', self.ids), ('state', '!=', 'cancelled')])
+        if already:
+            raise UserError(_('Ya existe una renovación para: %s')
+                            % ', '.join(already.renewed_from_id.mapped('name')))
+        renewals = self.create([record._prepare_renewal_vals() for record in self])
+        if confirm:
+            renewals.action_confirm()
+        if create_sale_orders:
+            renewals._create_sale_orders()
+        return renewals
+
+    def _prepare_sale_order_vals(self):
+        """Valores de la orden de venta de la membresía"""
+        self.ensure_one()
         order_line = [(0, 0, {
             'product_id': self.plan_id.product_id.id,
             'name': _('Membresía %s - %s') % (self.name, self.plan_id.name),
@@ -358,111 +645,20 @@ class CoworkMembership(models.Model):
                 'price_unit': price_floor,
             }))
             
-        sale_order_vals = {
+        return {
             'partner_id': self.partner_id.id,
             'membership_id': self.id,
             'date_order': fields.Datetime.now(),
             'order_line': order_line,
         }
-        
-        # Integración opcional con sale_subscription si existe el campo
-        if self.plan_id.duration_type in ['monthly', 'annual']:
-            # Nota: Esto es genérico, la implementación de suscripciones
-            # varía según la versión y módulos instalados
-            pass
-            
-        sale_order = self.env['sale.order'].create(sale_order_vals)
-        
-        return {
-            'type': 'ir.actions.act_window',
-            'name': 'Presupuesto',
-            'res_model': 'sale.order',
-            'res_id': sale_order.id,
-            'view_mode': 'form',
-        }
-    
-    def action_activate(self):
-        """Activar la membresía tras el pago"""
-        for record in self:
-            if record.state != 'confirmed':
-                raise UserError(_('Solo se pueden activar membresías confirmadas.'))
-            
-            # Cambiar estado del espacio a ocupado
-            if record.desk_id:
-                record.desk_id.write({'state': 'occupied'})
-            elif record.bed_id:
-                record.bed_id.write({'state': 'occupied'})
-            
-            # Piso exclusivo ya se marca como 'rented' en confirm, no cambia estado extra en active?
-            # En cowork_floor definimos state: available, rented, maintenance. 'rented' es correcto.
-            
-            record.write({'state': 'active'})
-    
-    def action_expire(self):
-        """Marcar membresía como expirada"""
-        for record in self:
-            # Liberar espacio y expirar créditos
-            if record.desk_id:
-                record.desk_id.action_set_available()
-            elif record.bed_id:
-                record.bed_id.action_set_available()
-            
-            if record.floor_id:
-                record.floor_id.write({
-                    'state': 'available',
-                    'member_id': False,
-                    'date_start': False,
-                    'date_end': False,
-                })
-            
-            # Expirar créditos y pases restantes de esta membresía
-            record._expire_remaining_credits()
-            record._expire_remaining_passes()
-            
-            record.write({'state': 'expired'})
-    
-    def action_cancel(self):
-        """Cancelar membresía"""
-        for record in self:
-            # Liberar espacio y expirar créditos
-            if record.desk_id:
-                record.desk_id.action_set_available()
-            elif record.bed_id:
-                record.bed_id.action_set_available()
-            
-            if record.floor_id:
-                record.floor_id.write({
-                    'state': 'available',
-                    'member_id': False,
-                    'date_start': False,
-                    'date_end': False,
-                })
-            
-            # Expirar créditos y pases restantes de esta membresía
-            record._expire_remaining_credits()
-            record._expire_remaining_passes()
-            
-            record.write({'state': 'cancelled'})
-    
-    def action_renew(self):
-        """Renovar membresía"""
-        self.ensure_one()
-        
-        new_membership = self.copy({
-            'date_start': self.date_end,
-            'state': 'draft',
-            'invoice_ids': False,
-            'access_request_ids': False,
-            'rating_id': False,
-        })
-        
-        return {
-            'type': 'ir.actions.act_window',
-            'name': 'Nueva Membresía',
-            'res_model': 'cowork.membership',
-            'res_id': new_membership.id,
-            'view_mode': 'form',
-        }
+
+    def _create_sale_orders(self):
+        """Crear las órdenes de venta de todas las membresías en una sola alta"""
+        for plan in self.plan_id.filtered(lambda p: not p.product_id):
+            plan._create_or_update_product()
+        if self.plan_id.filtered(lambda p: not p.product_id):
+            raise UserError(_('El plan no tiene un producto configurado.'))
+        return self.env['sale.order'].create([record._prepare_sale_order_vals() for record in self])
     
     def action_send_email(self):
         """Enviar detalles de membresía por email"""
@@ -516,63 +712,211 @@ class CoworkMembership(models.Model):
             'domain': [('membership_id', '=', self.id)],
             'context': {'default_membership_id': self.id},
         }
-    
-        for membership in to_remind:
-            membership.action_send_renewal_reminder()
-            
+
     @api.model
-    def _cron_monthly_renewal_benefits(self):
-        """Cron job para renovar créditos y pases mensualmente en membresías recurrentes"""
-        today = fields.Date.today()
-        # Buscar membresías activas y recurrentes
-        active_recurring = self.search([
-            ('state', '=', 'active'),
-            ('plan_id.is_recurring', '=', True),
-        ])
-        
-        for membership in active_recurring:
-            # Verificar si hoy es el día de renovación (mismo día del mes que start_date)
-            # Simplificación: si el día coincide.
-            if membership.date_start.day == today.day:
-                membership.action_renew_monthly_benefits()
+    def _cron_check_expiry(self, batch_size=500):
+        """Cron: expirar membresías vencidas y enviar recordatorios de renovación.
+
+        Procesa bloques de tamaño fijo con un commit por bloque. Las membresías
+        ya expiradas o recordadas dejan de cumplir el filtro, por lo que una
+        ejecución interrumpida continúa donde quedó.
+        """
+        auto_commit = not getattr(threading.current_thread(), 'testing', False)
+        today = fields.Date.context_today(self)
+        expired, expiry_failed = self._process_in_chunks(
+            self._get_expired_ids, lambda records: records.action_expire(),
+            today, batch_size, auto_commit)
+        reminded, reminder_failed = self._process_in_chunks(
+            self._get_reminder_ids, lambda records: records._send_renewal_reminders(),
+            today, batch_size, auto_commit)
+        summary = _("Vencimientos: %s membresías expiradas, %s recordatorios enviados") % (expired, reminded)
+        if expiry_failed or reminder_failed:
+            summary += _(" (%s con errores, ver el log del servidor)") % len(expiry_failed | reminder_failed)
+        self._post_bulk_summary(summary)
+
+    @api.model
+    def _process_in_chunks(self, get_ids, process, today, batch_size, auto_commit):
+        """Aplicar ``process`` por bloques hasta agotar ``get_ids``.
+
+        Las membresías que fallan se saltan en el resto de la ejecución, de
+        modo que un registro defectuoso no detiene a los siguientes.
+        Devuelve (procesadas, membresías con error).
+        """
+        total = 0
+        failed = self.browse()
+        while True:
+            self.flush_model()
+            ids = get_ids(today, batch_size, exclude=failed.ids)
+            if not ids:
+                return total, failed
+            chunk_failed = self._process_chunk(self.browse(ids)._bulk(), process)
+            failed |= chunk_failed
+            total += len(ids) - len(chunk_failed)
+            if auto_commit:
+                self.env.cr.commit()
+            # Liberar la caché entre bloques para acotar la memoria
+            self.env.invalidate_all()
+            if len(ids) < batch_size:
+                return total, failed
+
+    @api.model
+    def _process_chunk(self, records, process):
+        """Aplicar ``process`` al bloque; si falla, reintentar registro por registro.
+
+        Cada intento corre en un savepoint, así un error solo descarta su
+        propio trabajo. Devuelve las membresías que fallaron por separado.
+        """
+        try:
+            with self.env.cr.savepoint():
+                process(records)
+            return self.browse()
+        except Exception:
+            _logger.warning("Error en el bloque de membresías %s, se procesan una a una",
+                            records.ids, exc_info=True)
+            self.env.invalidate_all()
+        failed = self.browse()
+        for record in records:
+            try:
+                with self.env.cr.savepoint():
+                    process(record)
+            except Exception:
+                _logger.exception("Error al procesar la membresía %s, se omite", record.id)
+                self.env.invalidate_all()
+                failed |= record
+        return failed
+
+    @api.model
+    def _get_expired_ids(self, today, limit, exclude=()):
+        self.env.cr.execute("""
+            SELECT id FROM cowork_membership
+             WHERE state IN ('confirmed', 'active')
+               AND date_end < %s
+               AND id != ALL(%s)
+             ORDER BY date_end, id
+             LIMIT %s
+        """, [today, list(exclude), limit])
+        return [row[0] for row in self.env.cr.fetchall()]
+
+    @api.model
+    def _get_reminder_ids(self, today, limit, exclude=()):
+        self.env.cr.execute("SELECT COALESCE(MAX(renewal_reminder_days), 0) FROM cowork_membership_plan")
+        max_days = self.env.cr.fetchone()[0]
+        # El rango con el máximo de días usa el índice; el plan afina la ventana
+        self.env.cr.execute("""
+            SELECT m.id
+              FROM cowork_membership m
+              JOIN cowork_membership_plan p ON p.id = m.plan_id
+             WHERE m.state IN ('confirmed', 'active')
+               AND m.date_end >= %(today)s
+               AND m.date_end <= %(today)s + %(max_days)s
+               AND m.date_end <= %(today)s + p.renewal_reminder_days
+               AND p.renewal_reminder_days > 0
+               AND NOT COALESCE(m.renewal_reminder_sent, FALSE)
+               AND m.id != ALL(%(exclude)s)
+             ORDER BY m.date_end, m.id
+             LIMIT %(limit)s
+        """, {'today': today, 'max_days': max_days, 'limit': limit, 'exclude': list(exclude)})
+        return [row[0] for row in self.env.cr.fetchall()]
+
+    def _send_renewal_reminders(self):
+        """Encolar los recordatorios de renovación y marcarlos como enviados"""
+        self._bulk()._send_template('aureofy_cowork_ll.email_template_renewal_reminder')
+        self.write({'renewal_reminder_sent': True})
+
+    @api.model
+    def _cron_monthly_renewal_benefits(self, batch_size=200):
+        """Cron job para renovar créditos y pases mensualmente en membresías recurrentes.
+
+        Reclama bloques con ``FOR UPDATE SKIP LOCKED`` y confirma cada bloque
+        por separado, de modo que varios crons pueden repartirse la renovación.
+        Si un bloque falla se renueva membresía por membresía; las que siguen
+        fallando se registran en el log y se saltan en el resto de la ejecución.
+        """
+        auto_commit = not getattr(threading.current_thread(), 'testing', False)
+        today = fields.Date.context_today(self)
+        total = 0
+        failed = self.browse()
+        while True:
+            start = time.time()
+            memberships = self._claim_due_renewals(today, batch_size, exclude=failed.ids)
+            if not memberships:
+                break
+            chunk_failed = self._process_chunk(
+                memberships._bulk(), lambda records: records.action_renew_monthly_benefits())
+            failed |= chunk_failed
+            if auto_commit:
+                self.env.cr.commit()
+            total += len(memberships) - len(chunk_failed)
+            _logger.info("Renovados %s beneficios mensuales en %.2fs",
+                         len(memberships) - len(chunk_failed), time.time() - start)
+            self.env.invalidate_all()
+        if failed:
+            _logger.warning("Renovación mensual: %s membresías con errores: %s", len(failed), failed.ids)
+        _logger.info("Renovación mensual terminada: %s membresías", total)
+        return total
+
+    @api.model
+    def _claim_due_renewals(self, today, limit, exclude=()):
+        """Bloquear un bloque de membresías con renovación vencida.
+
+        Las filas ya bloqueadas por otro cron se saltan; al renovar avanza
+        ``next_benefit_date`` y la membresía deja de cumplir el filtro.
+        """
+        self.flush_model(['next_benefit_date', 'state', 'plan_id'])
+        self.env.cr.execute("""
+            SELECT m.id
+              FROM cowork_membership m
+              JOIN cowork_membership_plan p ON p.id = m.plan_id
+             WHERE m.next_benefit_date <= %s
+               AND m.state = 'active'
+               AND p.is_recurring
+               AND m.id != ALL(%s)
+             ORDER BY m.next_benefit_date, m.id
+             LIMIT %s
+               FOR UPDATE OF m SKIP LOCKED
+        """, [today, list(exclude), limit])
+        return self.browse([row[0] for row in self.env.cr.fetchall()])
                 
     def action_renew_monthly_benefits(self):
-        """Renovar beneficios mensuales (Créditos, Pases)"""
-        for record in self:
-            # 1. Expirar créditos restantes de la membresía (Non-cumulative)
-            record._expire_remaining_credits()
+        """Renovar beneficios mensuales (Créditos, Pases y Horas) en bloque"""
+        today = fields.Date.context_today(self)
+        next_dates = {record.id: record._get_next_benefit_date(today) for record in self}
 
-            # 2. Renovar Créditos: Agregar créditos del plan nuevamente
-            if record.plan_id.credits_included > 0:
-                self.env['cowork.credits'].create({
-                    'partner_id': record.partner_id.id,
-                    'membership_id': record.id,
-                    'credits_type': 'renewal',
-                    'credits_amount': record.plan_id.credits_included,
-                    'description': _('Renovación mensual de créditos plan %s') % record.plan_id.name,
-                })
-                # Actualizar el campo computado o store si es necesario. 
-                # credits_granted en este modelo es un compute store del plan, asi que quizás
-                # debamos ajustar la lógica de credits_remaining para que tome TODOS los grants
-                # vinculados a la membresía, no solo el static del plan.
-                
-            # 2. Renovar Pases: Expirar viejos y otorgar nuevos
-            record._expire_remaining_passes()
-            if record.plan_id.passes_included > 0:
-                self.env['cowork.passes'].create({
-                    'partner_id': record.partner_id.id,
-                    'membership_id': record.id,
-                    'pass_type': 'renewal',
-                    'amount': record.plan_id.passes_included,
-                    'description': _('Renovación mensual de pases plan %s') % record.plan_id.name,
-                })
-            
+        # 1. Créditos no acumulables: expirar los restantes y otorgar los del plan
+        self._expire_remaining_credits()
+        self.env['cowork.credits'].create([{
+            'partner_id': record.partner_id.id,
+            'membership_id': record.id,
+            'credits_type': 'renewal',
+            'credits_amount': record.plan_id.credits_included,
+            'date_expiration': record._get_credits_expiration(next_dates[record.id]),
+            'description': _('Renovación mensual de créditos plan %s') % record.plan_id.name,
+        } for record in self if record.plan_id.credits_included > 0])
+
+        # 2. Pases: expirar viejos y otorgar nuevos
+        self._expire_remaining_passes()
+        self.env['cowork.passes'].create([{
+            'partner_id': record.partner_id.id,
+            'membership_id': record.id,
+            'pass_type': 'renewal',
+            'amount': record.plan_id.passes_included,
+            'description': _('Renovación mensual de pases plan %s') % record.plan_id.name,
+        } for record in self if record.plan_id.passes_included > 0])
+
+        # 3. Horas de Call Room: cerrar el periodo anterior y abrir uno nuevo
+        self._expire_remaining_call_room_hours()
+        self._grant_call_room_hours('renewal', today)
+
+        for record in self:
             record.write({
                 'passes_used': 0, # Resetear consumo del mes (legacy field)
-                'call_room_hours_used': 0.0 # Resetear consumo
+                'next_benefit_date': next_dates[record.id],
             })
-            
-            record.message_post(body=_("Beneficios mensuales renovados (Pases y Horas reseteados, Créditos otorgados)."))
+        if self._is_bulk():
+            self._post_bulk_summary(_("Beneficios mensuales renovados en %s membresías") % len(self))
+        else:
+            for record in self:
+                record.message_post(body=_("Beneficios mensuales renovados (Pases y Horas reseteados, Créditos otorgados)."))
     
     def action_send_renewal_reminder(self):
         """Enviar recordatorio de renovación"""
@@ -583,37 +927,67 @@ class CoworkMembership(models.Model):
             template.send_mail(self.id, force_send=True)
         return True
     
-    def _expire_remaining_credits(self):
-        """Expirar créditos restantes vinculados a la membresía"""
+    def _grant_call_room_hours(self, entry_type, period_start=False):
+        """Abrir un periodo de horas de Call Room con las horas del plan.
+
+        Sin ``period_start`` cada membresía abre su periodo en su fecha de inicio.
+        """
+        vals_list = []
+        for record in self:
+            record.call_room_period_start = period_start or record.date_start
+            if record.call_room_hours_granted > 0:
+                vals_list.append({
+                    'partner_id': record.partner_id.id,
+                    'membership_id': record.id,
+                    'period_start': record.call_room_period_start,
+                    'entry_type': entry_type,
+                    'hours': record.call_room_hours_granted,
+                    'description': _('Horas de Call Room del plan %s') % record.plan_id.name,
+                })
+        return self.env['cowork.call.room.hours'].create(vals_list)
+
+    def _expire_remaining_call_room_hours(self):
+        """Expirar las horas de Call Room no usadas del periodo vigente"""
+        hours = self._get_call_room_hours()
+        return self.env['cowork.call.room.hours'].create([{
+            'partner_id': record.partner_id.id,
+            'membership_id': record.id,
+            'period_start': record._get_call_room_period_start(),
+            'entry_type': 'expired',
+            'hours': -hours[record.id][1],
+            'description': _('Vencimiento de horas no acumulables (Membresía %s)') % record.name,
+        } for record in self if hours.get(record.id, (0.0, 0.0))[1] > 0])
+
+    def _get_credits_expiration(self, next_benefit_date):
+        """Último día de validez de los créditos del plan otorgados en este periodo.
+
+        Vencen antes que los créditos comprados, de modo que el consumo FIFO
+        los gasta primero y la renovación no se lleva saldo pagado.
+        """
         self.ensure_one()
-        membership_credits = self.env['cowork.credits'].search([
-            ('membership_id', '=', self.id)
+        dates = [self.date_end]
+        if self.plan_id.is_recurring and next_benefit_date:
+            dates.append(next_benefit_date - relativedelta(days=1))
+        return min([d for d in dates if d], default=False)
+
+    def _expire_remaining_credits(self):
+        """Expirar créditos restantes vinculados a las membresías"""
+        open_lots = self.env['cowork.credits'].search([
+            ('membership_id', 'in', self.ids),
+            ('remaining_amount', '>', 0),
         ])
-        balance = sum(membership_credits.mapped('credits_amount'))
-        if balance > 0:
-            self.env['cowork.credits'].create({
-                'partner_id': self.partner_id.id,
-                'membership_id': self.id,
-                'credits_type': 'expired',
-                'credits_amount': -balance,
-                'description': _('Vencimiento de créditos no acumulables (Membresía %s)') % self.name,
-            })
+        open_lots._expire_lots(_('Vencimiento de créditos no acumulables'))
 
     def _expire_remaining_passes(self):
-        """Expirar pases restantes vinculados a la membresía"""
-        self.ensure_one()
-        membership_passes = self.env['cowork.passes'].search([
-            ('membership_id', '=', self.id)
-        ])
-        balance = sum(membership_passes.mapped('amount'))
-        if balance > 0:
-            self.env['cowork.passes'].create({
-                'partner_id': self.partner_id.id,
-                'membership_id': self.id,
-                'pass_type': 'expired',
-                'amount': -balance,
-                'description': _('Vencimiento de pases no acumulables (Membresía %s)') % self.name,
-            })
+        """Expirar pases restantes vinculados a las membresías"""
+        balances = self.env['cowork.ledger.checkpoint']._get_membership_balances('passes', self)
+        return self.env['cowork.passes'].create([{
+            'partner_id': record.partner_id.id,
+            'membership_id': record.id,
+            'pass_type': 'expired',
+            'amount': -balances[record.id],
+            'description': _('Vencimiento de pases no acumulables (Membresía %s)') % record.name,
+        } for record in self if balances.get(record.id, 0) > 0])
 
     def action_view_pass_history(self):
         """Ver historial de pases"""
@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+
+import logging
+import threading
+
+from markupsafe import Markup
+
+from odoo import models, fields, api, _
+
+_logger = logging.getLogger(__name__)
+
+
+class CoworkNotificationOutbox(models.Model):
+    _name = 'cowork.notification.outbox'
+    _description = 'Cola de Notificaciones'
+    _order = 'id'
+
+    template_id = fields.Many2one('mail.template', string='Plantilla', required=True,
+                                   ondelete='cascade')
+    model = fields.Char(string='Modelo', required=True)
+    res_id = fields.Many2oneReference(string='Registro', model_field='model', required=True)
+    partner_id = fields.Many2one('res.partner', string='Destinatario', ondelete='cascade',
+                                  help='Miembro destinatario, para agrupar en resúmenes')
+    digest = fields.Boolean(string='En Resumen', default=False,
+                            help='Se envía agrupado con el resto de notificaciones del destinatario')
+    state = fields.Selection([
+        ('pending', 'Pendiente'),
+        ('sent', 'Enviada'),
+        ('failed', 'Fallida'),
+    ], string='Estado', default='pending', required=True, index=True)
+    date_sent = fields.Datetime(string='Fecha de Envío', readonly=True)
+    error = fields.Text(string='Error', readonly=True)
+    company_id = fields.Many2one('res.company', string='Compañía',
+                                  default=lambda self: self.env.company)
+
+    @api.model
+    def _enqueue(self, template, records, recipient_field=None):
+        """Encolar una notificación por registro y programar el envío.
+
+        Con ``recipient_field`` (campo Many2one a res.partner) las notificaciones
+        de los miembros que prefieren resumen se agrupan al enviarlas.
+        """
+        vals_list = []
+        for record in records:
+            partner = record[recipient_field] if recipient_field else self.env['res.partner']
+            vals_list.append({
+                'template_id': template.id,
+                'model': records._name,
+                'res_id': record.id,
+                'partner_id': partner.id,
+                'digest': partner.cowork_notification_digest,
+            })
+        entries = self.sudo().create(vals_list)
+        cron = self.env.ref('aureofy_cowork_ll.cron_flush_notification_outbox', raise_if_not_found=False)
+        if cron:
+            cron.sudo()._trigger()
+        return entries
+
+    @api.model
+    def _cron_flush(self, batch_size=500):
+        """Enviar las notificaciones pendientes por bloques"""
+        auto_commit = not getattr(threading.current_thread(), 'testing', False)
+        total = 0
+        while True:
+            entries = self._claim_pending(batch_size)
+            if not entries:
+                break
+            entries._flush()
+            total += len(entries)
+            if auto_commit:
+                self.env.cr.commit()
+            if len(entries) < batch_size:
+                break
+        if total:
+            _logger.info("Cola de notificaciones: %s procesadas", total)
+            # Las entregas SMTP quedan en la cola estándar de mail.mail
+            self.env.ref('mail.ir_cron_mail_scheduler_action')._trigger()
+        return total
+
+    @api.model
+    def _claim_pending(self, limit):
+        self.flush_model(['state'])
+        self.env.cr.execute("""
+            SELECT id
+              FROM cowork_notification_outbox
+             WHERE state = 'pending'
+             ORDER BY id
+             LIMIT %s
+               FOR UPDATE SKIP LOCKED
+        """, [limit])
+        return self.browse([row[0] for row in self.env.cr.fetchall()])
+
+    def _flush(self):
+        """Renderizar por plantilla en lote y crear los emails de la cola de salida"""
+        digest = self.filtered('digest')
+        for template, entries in (self - digest).grouped('template_id').items():
+            entries._run_safely(lambda entries=entries, template=template: template.send_mail_batch(
+                entries._existing_res_ids()))
+        for partner, entries in digest.grouped('partner_id').items():
+            entries._run_safely(lambda entries=entries, partner=partner: entries._send_digest(partner))
+
+    def _run_safely(self, send):
+        try:
+            with self.env.cr.savepoint():
+                send()
+        except Exception as e:
+            _logger.exception("Error al enviar %s notificaciones", len(self))
+            self.write({'state': 'failed', 'error': str(e)})
+        else:
+            self.write({'state': 'sent', 'date_sent': fields.Datetime.now()})
+
+    def _existing_res_ids(self):
+        """Identificadores de los registros que siguen existiendo (un solo modelo)"""
+        return self.env[self[:1].model].browse(self.mapped('res_id')).exists().ids
+
+    def _send_digest(self, partner):
+        """Agrupar las notificaciones de un destinatario en un solo email"""
+        parts = []
+        for template, entries in self.grouped('template_id').items():
+            res_ids = entries._existing_res_ids()
+            if not res_ids:
+                continue
+            subjects = template._render_field('subject', res_ids)
+            bodies = template._render_field('body_html', res_ids, compute_lang=True)
+            parts += [(subjects[res_id], bodies[res_id]) for res_id in res_ids]
+        if not parts:
+            return
+        company = self[:1].company_id or self.env.company
+        self.env['mail.mail'].sudo().create({
+            'subject': _('Resumen de notificaciones (%s)') % len(parts),
+            'body_html': Markup('<hr/>').join(
+                Markup('<h3>%s</h3>%s') % (subject, body) for subject, body in parts),
+            'email_from': company.email_formatted or self.env.user.email_formatted,
+            'recipient_ids': [(4, partner.id)],
+            'auto_delete': True,
+        })
+
+    def action_retry(self):
+        """Volver a encolar las notificaciones fallidas"""
+        self.filtered(lambda e: e.state == 'failed').write({'state': 'pending', 'error': False})
+        self.env.ref('aureofy_cowork_ll.cron_flush_notification_outbox')._trigger()
@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
 
 from odoo import models, fields, api, _
+from odoo.exceptions import UserError
 
 class CoworkPasses(models.Model):
     _name = 'cowork.passes'
@@ -29,9 +30,54 @@ class CoworkPasses(models.Model):
     
     company_id = fields.Many2one('res.company', string='Compañía',
                                   default=lambda self: self.env.company)
+    
+    active = fields.Boolean(string='Activo', default=True,
+                             help='Los movimientos incluidos en un checkpoint pueden archivarse '
+                                  'sin alterar el balance')
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        self.env['cowork.ledger.checkpoint']._lock_ledger_writes('passes')
+        return super().create(vals_list)
+
+    def write(self, vals):
+        if any(f in vals for f in ['amount', 'partner_id', 'membership_id']):
+            self.env['cowork.ledger.checkpoint']._check_entries_editable('passes', self)
+        return super().write(vals)
+
+    def unlink(self):
+        self.env['cowork.ledger.checkpoint']._check_entries_editable('passes', self)
+        return super().unlink()
+
+    @api.model
+    def grant_bulk(self, partner_ids, amount, pass_type='bonus', description=False):
+        """Otorgar la misma cantidad de pases a muchos miembros en una sola alta"""
+        description = description or _('Otorgamiento de %s pases') % amount
+        return self.create([{
+            'partner_id': partner_id,
+            'pass_type': pass_type,
+            'amount': amount,
+            'description': description,
+        } for partner_id in dict.fromkeys(partner_ids)])
+
+    @api.model
+    def debit(self, partner_id, amount, vals=None):
+        """Consumir pases de forma atómica sin dejar el balance en negativo"""
+        self.env['cowork.spending.lock']._acquire([partner_id])
+        balance = self.get_partner_balance(partner_id)
+        if balance < amount:
+            raise UserError(_('No tiene pases disponibles. '
+                              'Disponible: %s, Requerido: %s') % (balance, amount))
+        vals = dict(vals or {}, partner_id=partner_id, amount=-amount)
+        vals.setdefault('pass_type', 'used')
+        return self.create(vals)
 
     @api.model
     def get_partner_balance(self, partner_id):
         """Obtener balance de pases de un partner"""
-        passes = self.search([('partner_id', '=', partner_id)])
-        return sum(passes.mapped('amount')) or 0
+        return self.get_partner_balances([partner_id]).get(partner_id, 0)
+
+    @api.model
+    def get_partner_balances(self, partner_ids):
+        """Obtener balances de varios partners: último checkpoint más movimientos posteriores"""
+        return self.env['cowork.ledger.checkpoint']._get_partner_balances('passes', partner_ids)
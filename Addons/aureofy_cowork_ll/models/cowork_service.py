@@ -1,5 +1,7 @@
 # -*- coding: utf-8 -*-
 
+from datetime import datetime, timedelta
+
 from odoo import models, fields, api
 
 
@@ -47,6 +49,8 @@ class CoworkService(models.Model):
     access_rules = fields.Text(string='Reglas de Acceso')
     
     requires_approval = fields.Boolean(string='Requiere Aprobación', default=True)
+    capacity = fields.Integer(string='Capacidad', default=1,
+                               help='Reservas simultáneas admitidas (1 = uso exclusivo)')
     
     image = fields.Image(string='Imagen', max_width=512, max_height=512)
     
@@ -57,8 +61,109 @@ class CoworkService(models.Model):
     product_id = fields.Many2one('product.product', string='Producto',
                                   help='Producto para facturación')
     
+    _sql_constraints = [
+        ('capacity_positive', 'CHECK(capacity > 0)', 'La capacidad debe ser al menos 1.'),
+    ]
+
     @api.onchange('is_paid')
     def _onchange_is_paid(self):
         if not self.is_paid:
             self.price = 0
             self.credits_cost = 0
+
+    @api.model
+    def available_slots(self, service_ids, start, end, granularity=None):
+        """Devolver los intervalos libres de varios servicios en una ventana.
+
+        Lee las reservas vigentes de todos los servicios con una sola consulta
+        y las recorre con una línea de barrido por servicio; un tramo está libre
+        mientras quede capacidad para una reserva más. Las fechas son
+        UTC sin zona horaria, como en el ORM. Con ``granularity`` (minutos) los
+        intervalos se ajustan a esa rejilla y se descartan los más cortos.
+
+        :return: {service_id: [(inicio, fin), ...]}
+        """
+        start = fields.Datetime.to_datetime(start)
+        end = fields.Datetime.to_datetime(end)
+        service_ids = list(service_ids)
+        slots = {service_id: [] for service_id in service_ids}
+        if not service_ids or not start or not end or start >= end:
+            return slots
+        busy = self._get_busy_intervals(service_ids, start, end)
+        capacities = {service.id: service.capacity for service in self.browse(service_ids)}
+        for service_id in service_ids:
+            free = self._sweep_free_intervals(
+                busy.get(service_id, []), start, end, capacities[service_id] or 1)
+            if granularity:
+                free = self._align_intervals(free, timedelta(minutes=granularity))
+            slots[service_id] = free
+        return slots
+
+    @api.model
+    def _get_busy_intervals(self, service_ids, start, end):
+        """Reservas vigentes que tocan la ventana: {service_id: [(inicio, fin), ...]}"""
+        self.env['cowork.access.request'].flush_model(
+            ['service_id', 'date_scheduled', 'date_end', 'state'])
+        self.env.cr.execute("""
+            SELECT service_id, date_scheduled, date_end
+              FROM cowork_access_request
+             WHERE tsrange(date_scheduled, date_end) && tsrange(%s, %s)
+               AND state NOT IN ('rejected', 'cancelled')
+               AND service_id = ANY(%s)
+        """, [start, end, service_ids])
+        busy = {}
+        for service_id, date_start, date_end in self.env.cr.fetchall():
+            busy.setdefault(service_id, []).append((date_start, date_end))
+        return busy
+
+    @api.model
+    def _sweep_free_intervals(self, intervals, start, end, capacity=1):
+        """Línea de barrido: tramos de la ventana con menos de ``capacity`` reservas"""
+        events = []
+        for date_start, date_end in intervals:
+            events.append((max(date_start, start), 1))
+            events.append((min(date_end, end), -1))
+        # En un mismo instante las salidas se procesan antes que las entradas
+        events.sort(key=lambda event: (event[0], event[1]))
+        free = []
+        occupancy = 0
+        free_since = start
+        for moment, delta in events:
+            was_free = occupancy < capacity
+            occupancy += delta
+            if was_free and occupancy >= capacity:
+                if moment > free_since:
+                    free.append((free_since, moment))
+            elif not was_free and occupancy < capacity:
+                free_since = moment
+        if occupancy < capacity and end > free_since:
+            free.append((free_since, end))
+        return free
+
+    @api.model
+    def _peak_occupancy(self, intervals, start, end):
+        """Línea de barrido: máximo de reservas simultáneas dentro de la ventana"""
+        events = []
+        for date_start, date_end in intervals:
+            date_start, date_end = max(date_start, start), min(date_end, end)
+            if date_start < date_end:
+                events.append((date_start, 1))
+                events.append((date_end, -1))
+        events.sort(key=lambda event: (event[0], event[1]))
+        peak = occupancy = 0
+        for moment, delta in events:
+            occupancy += delta
+            peak = max(peak, occupancy)
+        return peak
+
+    @api.model
+    def _align_intervals(self, intervals, step):
+        """Ajustar los intervalos a una rejilla de ``step`` desde la medianoche"""
+        aligned = []
+        for date_start, date_end in intervals:
+            midnight = datetime.combine(date_start.date(), datetime.min.time())
+            slot_start = midnight + step * -(-(date_start - midnight) // step)
+            slot_end = slot_start + step * ((date_end - slot_start) // step)
+            if slot_end > slot_start:
+                aligned.append((slot_start, slot_end))
+        return aligned
@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+
+import logging
+from collections import defaultdict
+
+from odoo import models, api, _
+from odoo.exceptions import UserError
+
+_logger = logging.getLogger(__name__)
+
+# Por tipo de espacio de la membresía: modelo, campo de la membresía, tipo y preferencia del lead
+SPACE_KINDS = {
+    'coworking': ('cowork.desk', 'desk_id', 'desk_type', 'preferred_desk_type'),
+    'coliving': ('cowork.bed', 'bed_id', 'bed_type', 'preferred_bed_type'),
+}
+
+
+class CoworkSpaceAllocator(models.AbstractModel):
+    _name = 'cowork.space.allocator'
+    _description = 'Asignación Automática de Escritorios y Camas'
+
+    @api.model
+    def allocate(self, memberships):
+        """Asignar escritorio o cama a un lote de membresías en una sola pasada.
+
+        Carga el inventario libre y sus reservas una vez por tipo de espacio y
+        trabaja sobre índices en memoria (piso y tipo -> espacios; espacio ->
+        intervalos ocupados). Respeta el tipo y la ciudad preferidos del lead,
+        los pisos exclusivos y coloca a los equipos (misma empresa) en un mismo
+        piso cuando caben.
+
+        :return: (membresías asignadas, {membresía: motivo} de las no asignadas)
+        """
+        if memberships.filtered(lambda m: m.state not in ('draft', 'confirmed')):
+            raise UserError(_('Solo se asignan espacios a membresías en borrador o confirmadas.'))
+        assigned = self.env['cowork.membership']
+        unplaced = {}
+        preferences = self._get_preferences(memberships)
+        for space_type, (model, field_name, type_field, pref_field) in SPACE_KINDS.items():
+            pending = memberships.filtered(lambda m: m.space_type == space_type and not m[field_name])
+            if not pending:
+                continue
+            inventory = self._load_inventory(model, type_field, field_name, pending)
+            placements, reasons = self._place(pending, inventory, preferences, pref_field)
+            self._write_placements(pending, field_name, placements)
+            assigned |= pending.browse(list(placements))
+            unplaced.update(reasons)
+        for membership in memberships.filtered(lambda m: m.space_type not in SPACE_KINDS):
+            unplaced[membership] = _('La membresía no tiene tipo de espacio.')
+        _logger.info("Asignación de espacios: %s asignadas, %s sin asignar", len(assigned), len(unplaced))
+        return assigned, unplaced
+
+    @api.model
+    def _get_preferences(self, memberships):
+        """Preferencias del lead de cada membresía: {membership_id: lead}"""
+        leads = self.env['crm.lead'].with_context(active_test=False).search(
+            [('membership_id', 'in', memberships.ids)])
+        return {lead.membership_id.id: lead for lead in leads}
+
+    @api.model
+    def _load_inventory(self, model, type_field, field_name, pending):
+        """Índices en memoria del inventario para el periodo del lote"""
+        Space = self.env[model]
+        spaces = Space.search_fetch([('state', '!=', 'maintenance')], ['floor_id', type_field])
+        by_floor = defaultdict(lambda: defaultdict(list))
+        for space in spaces:
+            by_floor[space.floor_id.id][space[type_field]].append(space.id)
+
+        # Ocupación: reservas confirmadas y espacios ya elegidos en membresías en borrador
+        date_from = min(pending.mapped('date_start'))
+        date_to = max(pending.mapped('date_end'), default=False) \
+            if all(pending.mapped('date_end')) else None
+        self.env['cowork.space.reservation'].flush_model()
+        pending.flush_model([field_name, 'date_start', 'date_end', 'state'])
+        self.env.cr.execute("""
+            SELECT {field}, date_start, date_end
+              FROM cowork_space_reservation
+             WHERE {field} IS NOT NULL
+               AND state = 'confirmed'
+               AND daterange(date_start, date_end) && daterange(%(from)s, %(to)s)
+             UNION ALL
+            SELECT {field}, date_start, date_end
+              FROM cowork_membership
+             WHERE {field} IS NOT NULL
+               AND state = 'draft'
+               AND id != ALL(%(pending)s)
+               AND daterange(date_start, date_end) && daterange(%(from)s, %(to)s)
+        """.format(field=field_name), {'from': date_from, 'to': date_to, 'pending': pending.ids})
+        busy = defaultdict(list)
+        for space_id, date_start, date_end in self.env.cr.fetchall():
+            busy[space_id].append((date_start, date_end))
+        # Pisos con más inventario primero
+        floors = spaces.floor_id.sorted(
+            lambda floor: (-sum(len(ids) for ids in by_floor[floor.id].values()), floor.id))
+        return {'floors': floors, 'by_floor': by_floor, 'busy': busy}
+
+    @api.model
+    def _place(self, pending, inventory, preferences, pref_field):
+        """Elegir un espacio para cada membresía; primero los equipos más grandes"""
+        teams = defaultdict(list)
+        for membership in pending.sorted(lambda m: (m.date_start, m.id)):
+            teams[membership.partner_id.commercial_partner_id].append(membership)
+        placements = {}
+        reasons = {}
+        for company, team in sorted(teams.items(), key=lambda item: (-len(item[1]), item[0].id)):
+            floors = self._candidate_floors(team, company, inventory, preferences)
+            for membership in team:
+                if membership.id not in floors:
+                    reasons[membership] = _('Ningún piso disponible cumple la ciudad o la regla de piso exclusivo.')
+            team = [m for m in team if m.id in floors]
+            if not team:
+                continue
+            # Un solo piso para todo el equipo si hay alguno que lo admita
+            shared = []
+            if len(team) > 1:
+                shared = [floor for floor in floors[team[0].id]
+                          if all(floor in floors[m.id] for m in team)
+                          and self._fits(team, floor, inventory, preferences, pref_field)][:1]
+            for membership in team:
+                floor_order = shared or floors[membership.id]
+                space_id = self._pick_space(membership, floor_order, inventory, preferences, pref_field)
+                if space_id:
+                    placements[membership.id] = space_id
+                    inventory['busy'][space_id].append((membership.date_start, membership.date_end))
+                else:
+                    reasons[membership] = _('No hay espacios libres del tipo solicitado en esas fechas.')
+        return placements, reasons
+
+    @api.model
+    def _candidate_floors(self, team, company, inventory, preferences):
+        """Pisos admitidos por membresía: {membership_id: [pisos]}"""
+        floors = inventory['floors']
+        result = {}
+        for membership in team:
+            city = preferences.get(membership.id) and preferences[membership.id].city_preference
+            allowed = [
+                floor for floor in floors
+                if (not city or (floor.city or '').lower() == city.strip().lower())
+                and (floor == membership.floor_id if membership.floor_id
+                     else not floor.is_exclusive or floor.member_id.commercial_partner_id == company)
+            ]
+            if allowed:
+                result[membership.id] = allowed
+        return result
+
+    @api.model
+    def _fits(self, team, floor, inventory, preferences, pref_field):
+        """El piso tiene espacio libre para todo el equipo (simulación sin reservar)"""
+        taken = []
+        for membership in team:
+            space_id = self._pick_space(membership, [floor], inventory, preferences, pref_field,
+                                        exclude=taken)
+            if not space_id:
+                return False
+            taken.append(space_id)
+        return True
+
+    @api.model
+    def _pick_space(self, membership, floors, inventory, preferences, pref_field, exclude=()):
+        """Primer espacio libre del tipo preferido en los pisos dados"""
+        lead = preferences.get(membership.id)
+        preferred = lead and lead[pref_field]
+        for floor in floors:
+            for space_type, space_ids in inventory['by_floor'][floor.id].items():
+                if preferred and space_type != preferred:
+                    continue
+                for space_id in space_ids:
+                    if space_id not in exclude and self._is_free(
+                            inventory['busy'][space_id], membership.date_start, membership.date_end):
+                        return space_id
+        return False
+
+    @api.model
+    def _is_free(self, intervals, date_start, date_end):
+        return not any(
+            (not other_end or date_start < other_end) and (not date_end or other_start < date_end)
+            for other_start, other_end in intervals
+        )
+
+    @api.model
+    def _write_placements(self, pending, field_name, placements):
+        """Guardar las asignaciones en una sentencia y reservar las confirmadas"""
+        if not placements:
+            return
+        memberships = pending.browse(list(placements))
+        memberships.flush_recordset([field_name])
+        self.env.cr.execute("""
+            UPDATE cowork_membership m
+               SET {field} = t.space_id,
+                   write_uid = %s,
+                   write_date = now() at time zone 'UTC'
+              FROM unnest(%s::int[], %s::int[]) AS t(membership_id, space_id)
+             WHERE m.id = t.membership_id
+        """.format(field=field_name), [self.env.uid, list(placements), list(placements.values())])
+        memberships.invalidate_recordset([field_name, 'write_uid', 'write_date'])
+        confirmed = memberships.filtered(lambda m: m.state == 'confirmed')
+        self.env['cowork.space.reservation']._reserve(confirmed)
+        confirmed._assign_spaces(field_name)
@@ -0,0 +1,217 @@
+# -*- coding: utf-8 -*-
+
+from psycopg2 import errors
+
+from odoo import models, fields, api, _
+from odoo.exceptions import ValidationError
+
+# Campo de la membresía con el espacio que reserva, según el tipo de espacio
+SPACE_FIELDS = {'coworking': 'desk_id', 'coliving': 'bed_id'}
+
+
+class CoworkSpaceReservation(models.Model):
+    _name = 'cowork.space.reservation'
+    _description = 'Reserva de Escritorio o Cama'
+    _order = 'date_start, id'
+
+    membership_id = fields.Many2one('cowork.membership', string='Membresía', required=True,
+                                     index=True, ondelete='cascade')
+    partner_id = fields.Many2one('res.partner', string='Miembro',
+                                  related='membership_id.partner_id', store=True)
+    desk_id = fields.Many2one('cowork.desk', string='Escritorio', index='btree_not_null',
+                               ondelete='cascade')
+    bed_id = fields.Many2one('cowork.bed', string='Cama', index='btree_not_null',
+                              ondelete='cascade')
+    date_start = fields.Date(string='Desde', required=True)
+    date_end = fields.Date(string='Hasta', help='Día en que el espacio vuelve a quedar libre; '
+                                                'vacío si la reserva no tiene fin')
+    state = fields.Selection([
+        ('confirmed', 'Confirmada'),
+        ('cancelled', 'Cancelada'),
+    ], string='Estado', default='confirmed', required=True)
+    company_id = fields.Many2one('res.company', string='Compañía',
+                                  default=lambda self: self.env.company)
+
+    _sql_constraints = [
+        ('one_space', 'CHECK((desk_id IS NULL) != (bed_id IS NULL))',
+         'Cada reserva corresponde a un escritorio o a una cama.'),
+        ('date_check', 'CHECK(date_end IS NULL OR date_end > date_start)',
+         'La fecha de fin debe ser posterior a la de inicio.'),
+        # Sin solapes aunque dos confirmaciones lleguen a la vez; su índice GiST
+        # también sirve a las búsquedas de disponibilidad por espacio y fechas
+        ('desk_overlap', "EXCLUDE USING gist (desk_id WITH =, daterange(date_start, date_end) WITH &&) "
+                         "WHERE (state = 'confirmed')",
+         'El escritorio ya está reservado en esas fechas.'),
+        ('bed_overlap', "EXCLUDE USING gist (bed_id WITH =, daterange(date_start, date_end) WITH &&) "
+                        "WHERE (state = 'confirmed')",
+         'La cama ya está reservada en esas fechas.'),
+    ]
+
+    def _auto_init(self):
+        # Las restricciones de exclusión comparan los IDs con = dentro del índice GiST
+        self.env.cr.execute("CREATE EXTENSION IF NOT EXISTS btree_gist")
+        return super()._auto_init()
+
+    def init(self):
+        for column in ('desk_id', 'bed_id'):
+            self.env.cr.execute("DROP INDEX IF EXISTS cowork_space_reservation_{column}_range_idx"
+                                .format(column=column))
+        # Membresías vigentes anteriores a este modelo
+        self.env.cr.execute("""
+            INSERT INTO cowork_space_reservation
+                   (membership_id, partner_id, desk_id, bed_id, date_start, date_end, state,
+                    company_id, create_uid, create_date, write_uid, write_date)
+            SELECT m.id, m.partner_id,
+                   CASE WHEN m.space_type = 'coworking' THEN m.desk_id END,
+                   CASE WHEN m.space_type = 'coliving' THEN m.bed_id END,
+                   m.date_start, m.date_end, 'confirmed', m.company_id,
+                   1, now() at time zone 'UTC', 1, now() at time zone 'UTC'
+              FROM cowork_membership m
+             WHERE m.state IN ('confirmed', 'active')
+               AND ((m.space_type = 'coworking' AND m.desk_id IS NOT NULL)
+                    OR (m.space_type = 'coliving' AND m.bed_id IS NOT NULL))
+               AND (m.date_end IS NULL OR m.date_end > m.date_start)
+               AND NOT EXISTS (SELECT 1 FROM cowork_space_reservation r WHERE r.membership_id = m.id)
+            ON CONFLICT DO NOTHING
+        """)
+
+    @api.model
+    def _reserve(self, memberships):
+        """Reservar el escritorio o cama de cada membresía durante su vigencia"""
+        vals_list = []
+        for membership in memberships:
+            field_name = SPACE_FIELDS.get(membership.space_type)
+            if field_name and membership[field_name]:
+                vals_list.append({
+                    'membership_id': membership.id,
+                    field_name: membership[field_name].id,
+                    'date_start': membership.date_start,
+                    'date_end': membership.date_end,
+                    'company_id': membership.company_id.id,
+                })
+        self._check_free(vals_list)
+        # La restricción de exclusión cubre las confirmaciones simultáneas
+        try:
+            with self.env.cr.savepoint():
+                return self.create(vals_list)
+        except errors.ExclusionViolation:
+            raise ValidationError(_('El escritorio o cama ya fue reservado en esas fechas '
+                                    'por otra operación. Vuelva a intentarlo.'))
+
+    @api.model
+    def _check_free(self, vals_list):
+        """Avisar con el nombre del espacio si alguna reserva nueva se solapa con otra"""
+        if not vals_list:
+            return
+        self.flush_model(['desk_id', 'bed_id', 'date_start', 'date_end', 'state'])
+        self.env.cr.execute("""
+            SELECT r.desk_id, r.bed_id
+              FROM unnest(%s::int[], %s::int[], %s::date[], %s::date[])
+                   AS t(desk_id, bed_id, date_start, date_end)
+              JOIN cowork_space_reservation r
+                ON (r.desk_id = t.desk_id OR r.bed_id = t.bed_id)
+               AND r.state = 'confirmed'
+               AND daterange(r.date_start, r.date_end) && daterange(t.date_start, t.date_end)
+             LIMIT 1
+        """, [[vals.get('desk_id') for vals in vals_list],
+              [vals.get('bed_id') for vals in vals_list],
+              [vals['date_start'] for vals in vals_list],
+              [vals['date_end'] or None for vals in vals_list]])
+        row = self.env.cr.fetchone()
+        if row:
+            space = self.env['cowork.desk'].browse(row[0]) if row[0] else self.env['cowork.bed'].browse(row[1])
+            raise ValidationError(_('%(space)s ya está reservado en esas fechas.',
+                                    space=space.display_name))
+
+    @api.model
+    def _release(self, memberships, date=None):
+        """Liberar los espacios de las membresías a partir de ``date`` (por defecto, hoy).
+
+        Las reservas que aún no han empezado se cancelan y las demás se acortan.
+        """
+        date = date or fields.Date.context_today(self)
+        reservations = self.search([('membership_id', 'in', memberships.ids),
+                                    ('state', '=', 'confirmed')])
+        reservations.filtered(lambda r: r.date_start >= date).write({'state': 'cancelled'})
+        reservations.filtered(
+            lambda r: r.date_start < date and (not r.date_end or r.date_end > date)
+        ).write({'date_end': date})
+
+    @api.model
+    def _hand_over(self, desks, beds, exclude=None, date=None):
+        """Asignar los espacios a la membresía cuya reserva está en curso en ``date``.
+
+        Las reservas que aún no empiezan no reciben el espacio; el cron diario
+        se lo traspasa al llegar su fecha de inicio.
+        """
+        if not desks and not beds:
+            return
+        date = date or fields.Date.context_today(self)
+        self.flush_model()
+        self.env['cowork.membership'].flush_model(['state'])
+        self.env.cr.execute("""
+            SELECT DISTINCT ON (r.desk_id, r.bed_id) r.desk_id, r.bed_id, m.id, m.partner_id, m.state
+              FROM cowork_space_reservation r
+              JOIN cowork_membership m ON m.id = r.membership_id
+             WHERE r.state = 'confirmed'
+               AND (r.desk_id = ANY(%s) OR r.bed_id = ANY(%s))
+               AND r.date_start <= %s
+               AND (r.date_end IS NULL OR r.date_end > %s)
+               AND m.state IN ('confirmed', 'active')
+               AND m.id != ALL(%s)
+             ORDER BY r.desk_id, r.bed_id, r.date_start
+        """, [desks.ids, beds.ids, date, date,
+              (exclude or self.env['cowork.membership']).ids])
+        for desk_id, bed_id, membership_id, partner_id, state in self.env.cr.fetchall():
+            space = self.env['cowork.desk'].browse(desk_id) if desk_id \
+                else self.env['cowork.bed'].browse(bed_id)
+            space.write({
+                'state': 'occupied' if state == 'active' else 'reserved',
+                'member_id': partner_id,
+                'membership_id': membership_id,
+            })
+
+    @api.model
+    def _cron_hand_over(self, date=None):
+        """Cron diario: traspasar los espacios cuya reserva en curso no es del titular actual"""
+        date = date or fields.Date.context_today(self)
+        self.flush_model()
+        self.env['cowork.desk'].flush_model(['membership_id'])
+        self.env['cowork.bed'].flush_model(['membership_id'])
+        self.env.cr.execute("""
+            SELECT r.desk_id, r.bed_id
+              FROM cowork_space_reservation r
+              JOIN cowork_membership m ON m.id = r.membership_id
+              LEFT JOIN cowork_desk desk ON desk.id = r.desk_id
+              LEFT JOIN cowork_bed bed ON bed.id = r.bed_id
+             WHERE r.state = 'confirmed'
+               AND r.date_start <= %s
+               AND (r.date_end IS NULL OR r.date_end > %s)
+               AND m.state IN ('confirmed', 'active')
+               AND COALESCE(desk.membership_id, bed.membership_id) IS DISTINCT FROM r.membership_id
+        """, [date, date])
+        rows = self.env.cr.fetchall()
+        desks = self.env['cowork.desk'].browse({desk_id for desk_id, _bed_id in rows if desk_id})
+        beds = self.env['cowork.bed'].browse({bed_id for _desk_id, bed_id in rows if bed_id})
+        self._hand_over(desks, beds, date=date)
+        return len(desks) + len(beds)
+
+    @api.model
+    def _search_free_spaces(self, model, domain, date_from, date_to=None):
+        """Espacios de ``model`` que cumplen ``domain`` sin reservas entre las fechas.
+
+        Una sola consulta: el dominio del ORM (reglas de acceso incluidas) con un
+        anti-join sobre el índice de rangos de las reservas.
+        """
+        Space = self.env[model]
+        column = 'desk_id' if model == 'cowork.desk' else 'bed_id'
+        self.flush_model(['desk_id', 'bed_id', 'date_start', 'date_end', 'state'])
+        query = Space._search(domain + [('state', '!=', 'maintenance')])
+        query.add_where("""NOT EXISTS (
+            SELECT 1
+              FROM cowork_space_reservation r
+             WHERE r.{column} = "{table}".id
+               AND r.state = 'confirmed'
+               AND daterange(r.date_start, r.date_end) && daterange(%s, %s)
+        )""".format(column=column, table=Space._table), [date_from, date_to or None])
+        return Space.browse(query)
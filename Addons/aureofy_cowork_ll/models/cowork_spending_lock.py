@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+
+import logging
+import random
+import time
+
+from psycopg2 import errorcodes
+
+from odoo import models, fields, api, SUPERUSER_ID
+
+_logger = logging.getLogger(__name__)
+
+# Errores de concurrencia tras los cuales la transacción completa puede reintentarse
+RETRYABLE_ERRORS = (
+    errorcodes.SERIALIZATION_FAILURE,
+    errorcodes.DEADLOCK_DETECTED,
+    errorcodes.LOCK_NOT_AVAILABLE,
+)
+
+
+class CoworkSpendingLock(models.Model):
+    _name = 'cowork.spending.lock'
+    _description = 'Bloqueo de Consumo por Miembro'
+    _rec_name = 'partner_id'
+
+    partner_id = fields.Many2one('res.partner', string='Miembro', required=True,
+                                  readonly=True, ondelete='cascade')
+    version = fields.Integer(string='Versión', default=0, readonly=True,
+                              help='Se incrementa en cada consumo del miembro')
+
+    _sql_constraints = [
+        ('partner_uniq', 'unique(partner_id)', 'Solo puede existir un bloqueo por miembro.'),
+    ]
+
+    @api.model
+    def _acquire(self, partner_ids):
+        """Serializar los consumos de los miembros hasta el fin de la transacción.
+
+        Actualiza la fila del miembro en lugar de solo bloquearla: con el
+        aislamiento REPEATABLE READ de Odoo, una transacción cuya instantánea
+        no incluye un consumo concurrente ya confirmado falla con un error
+        de serialización en vez de leer un balance obsoleto.
+        """
+        partner_ids = sorted(set(partner_id for partner_id in partner_ids if partner_id))
+        if not partner_ids:
+            return
+        self.env.cr.execute("""
+            INSERT INTO cowork_spending_lock (partner_id, version)
+            SELECT unnest(%s::int[]), 1
+            ON CONFLICT (partner_id) DO UPDATE
+               SET version = cowork_spending_lock.version + 1
+        """, [partner_ids])
+        self.invalidate_model(['version'])
+
+    @api.model
+    def _run_with_retry(self, func, max_tries=5):
+        """Ejecutar ``func(env)`` en una transacción propia, reintentando ante conflictos.
+
+        Para crons y procesos por lotes que gestionan su propio cursor; las
+        llamadas RPC ya son reintentadas por el servidor ante estos errores.
+        """
+        for attempt in range(1, max_tries + 1):
+            with self.pool.cursor() as cr:
+                env = api.Environment(cr, self.env.uid or SUPERUSER_ID, self.env.context)
+                try:
+                    result = func(env)
+                    cr.commit()
+                    return result
+                except Exception as e:
+                    cr.rollback()
+                    if getattr(e, 'pgcode', None) not in RETRYABLE_ERRORS or attempt == max_tries:
+                        raise
+                    _logger.info("Conflicto de concurrencia al consumir, reintento %s", attempt)
+            time.sleep(random.uniform(0.0, min(1.0, 0.05 * 2 ** attempt)))
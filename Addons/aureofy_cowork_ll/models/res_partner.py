@@ -12,7 +12,8 @@ class ResPartner(models.Model):
     membership_count = fields.Integer(string='Nº Membresías', compute='_compute_membership_count')
     
     active_membership_id = fields.Many2one('cowork.membership', string='Membresía Activa',
-                                            compute='_compute_active_membership')
+                                            compute='_compute_active_membership',
+                                            store=True, index='btree_not_null')
     
     # Créditos
     total_credits = fields.Integer(string='Créditos Disponibles', compute='_compute_total_credits')
@@ -24,25 +25,37 @@ class ResPartner(models.Model):
         ('coworking', 'Coworking'),
         ('coliving', 'Coliving'),
     ], string='Tipo de Espacio Preferido')
+    cowork_notification_digest = fields.Boolean(
+        string='Notificaciones en Resumen', default=False,
+        help='Agrupar los avisos de solicitudes de acceso en un único email por envío')
     
     emergency_contact = fields.Char(string='Contacto de Emergencia')
     emergency_phone = fields.Char(string='Teléfono de Emergencia')
     
     @api.depends('membership_ids')
     def _compute_membership_count(self):
+        counts = dict(self.env['cowork.membership']._read_group(
+            [('partner_id', 'in', self._origin.ids)], ['partner_id'], ['__count']))
         for record in self:
-            record.membership_count = len(record.membership_ids)
+            record.membership_count = counts.get(record._origin, 0)
     
     @api.depends('membership_ids.state')
     def _compute_active_membership(self):
+        active_by_partner = {}
+        # Una sola búsqueda para todo el lote; se conserva la primera según el orden del modelo
+        for membership in self.env['cowork.membership'].search([
+            ('partner_id', 'in', self._origin.ids),
+            ('state', '=', 'active'),
+        ]):
+            active_by_partner.setdefault(membership.partner_id.id, membership)
         for record in self:
-            active = record.membership_ids.filtered(lambda m: m.state == 'active')
-            record.active_membership_id = active[0] if active else False
+            record.active_membership_id = active_by_partner.get(record._origin.id, False)
     
     @api.depends('credit_ids.credits_amount')
     def _compute_total_credits(self):
+        balances = self.env['cowork.credits'].get_partner_balances(self._origin.ids)
         for record in self:
-            record.total_credits = sum(record.credit_ids.mapped('credits_amount'))
+            record.total_credits = balances.get(record._origin.id, 0)
     
     def action_view_memberships(self):
         """Ver membresías del contacto"""
@@ -1,2 +1,21 @@
 from . import test_access_request
+from . import test_access_request_series
 from . import test_credits_purchase
+from . import test_credits_balance
+from . import test_credits_lots
+from . import test_credits_liability
+from . import test_partner_performance
+from . import test_membership_performance
+from . import test_membership_lifecycle
+from . import test_space_reservation
+from . import test_space_allocation
+from . import test_floor_counters
+from . import test_membership_expiry
+from . import test_membership_renewal
+from . import test_membership_billing
+from . import test_service_availability
+from . import test_ledger_checkpoint
+from . import test_call_room_hours
+from . import test_concurrent_spending
+from . import test_notification_outbox
+from . import test_kpi_snapshot
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+
+import logging
+import time
+
+from odoo import fields
+from odoo.tests.common import TransactionCase
+
+_logger = logging.getLogger(__name__)
+
+
+class CoworkQueryCountCase(TransactionCase):
+    """Base de las pruebas que comparan el número de consultas de las listas"""
+
+    def setUp(self):
+        super(CoworkQueryCountCase, self).setUp()
+        self.plan = self.env['cowork.membership.plan'].create({
+            'name': 'Benchmark Plan',
+            'price': 100.0,
+        })
+
+    def _create_memberships(self, count, credits=(), passes=()):
+        """Crear ``count`` miembros con una membresía activa.
+
+        ``credits`` y ``passes`` son los importes de los movimientos de
+        bonificación que recibe cada miembro.
+        """
+        partners = self.env['res.partner'].create([
+            {'name': 'Benchmark Member %s' % i} for i in range(count)
+        ])
+        memberships = self.env['cowork.membership'].create([{
+            'partner_id': partner.id,
+            'plan_id': self.plan.id,
+            'date_start': fields.Date.today(),
+            'state': 'active',
+        } for partner in partners])
+        self.env['cowork.credits'].create([{
+            'partner_id': partner.id,
+            'credits_type': 'bonus',
+            'credits_amount': amount,
+        } for partner in partners for amount in credits])
+        self.env['cowork.passes'].create([{
+            'partner_id': partner.id,
+            'pass_type': 'bonus',
+            'amount': amount,
+        } for partner in partners for amount in passes])
+        return memberships
+
+    def _read_counting_queries(self, records, field_names):
+        """Leer los campos en frío y devolver (resultado, consultas ejecutadas)"""
+        self.env.invalidate_all()
+        start_queries = self.env.cr.sql_log_count
+        start_time = time.time()
+        result = records.read(field_names)
+        queries = self.env.cr.sql_log_count - start_queries
+        _logger.info("Lectura de %s %s: %s consultas, %.3fs", len(records), records._name,
+                     queries, time.time() - start_time)
+        return result, queries
@@ -119,3 +119,36 @@ class TestAccessRequest(TransactionCase):
             'duration_hours': 1.0,
         })
         self.assertTrue(request2, "Should allow booking immediately after")
+
+    def test_overlap_within_batch(self):
+        """Dos reservas solapadas creadas en el mismo lote también se rechazan"""
+        start_time = datetime.now().replace(microsecond=0)
+        request = self.AccessRequest.create({
+            'membership_id': self.membership.id,
+            'service_id': self.service.id,
+            'date_scheduled': start_time,
+            'duration_hours': 1.5,
+        })
+        self.assertEqual(request.date_end, start_time + timedelta(hours=1.5))
+
+        with self.assertRaises(ValidationError):
+            self.AccessRequest.create([{
+                'membership_id': self.membership.id,
+                'service_id': self.service.id,
+                'date_scheduled': start_time + timedelta(hours=3),
+                'duration_hours': 1.0,
+            }, {
+                'membership_id': self.membership.id,
+                'service_id': self.service.id,
+                'date_scheduled': start_time + timedelta(hours=3.5),
+                'duration_hours': 1.0,
+            }])
+
+        # Una reserva cancelada libera el horario
+        request.action_cancel()
+        self.AccessRequest.create({
+            'membership_id': self.membership.id,
+            'service_id': self.service.id,
+            'date_scheduled': start_time,
+            'duration_hours': 1.0,
+        })
@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+
+from datetime import datetime, timedelta
+
+from odoo import fields
+from odoo.exceptions import ValidationError
+from odoo.tests.common import TransactionCase, tagged
+
+
+@tagged('post_install', '-at_install')
+class TestAccessRequestSeries(TransactionCase):
+
+    def setUp(self):
+        super(TestAccessRequestSeries, self).setUp()
+        partner = self.env['res.partner'].create({'name': 'Series Partner'})
+        plan = self.env['cowork.membership.plan'].create({
+            'name': 'Series Plan',
+            'price': 100.0,
+            'call_room_hours_included': 10,
+        })
+        self.membership = self.env['cowork.membership'].create({
+            'partner_id': partner.id,
+            'plan_id': plan.id,
+            'date_start': fields.Date.today(),
+        })
+        self.membership.action_confirm()
+        self.service = self.env['cowork.service'].create({
+            'name': 'Series Booth',
+            'is_paid': True,
+            'service_type': 'phone_booth',
+        })
+        self.date_start = (datetime.now() + timedelta(days=1)).replace(
+            hour=9, minute=0, second=0, microsecond=0)
+        self.series = self.env['cowork.access.request.series'].create({
+            'membership_id': self.membership.id,
+            'service_id': self.service.id,
+            'date_start': self.date_start,
+            'duration_hours': 1.0,
+            'rrule_type': 'weekly',
+            'count': 4,
+            'payment_method': 'call_room_hours',
+        })
+
+    def test_confirm_creates_occurrences(self):
+        """La serie crea todas sus ocurrencias semanales de una vez"""
+        self.series.action_confirm()
+        requests = self.series.request_ids.sorted('date_scheduled')
+        self.assertEqual(len(requests), 4)
+        self.assertEqual(set(requests.mapped('state')), {'pending'})
+        self.assertEqual(requests[0].date_scheduled, self.date_start)
+        self.assertEqual(requests[3].date_scheduled, self.date_start + timedelta(weeks=3))
+        self.assertEqual(requests[0].name, '%s/001' % self.series.name)
+
+    def test_conflict_blocks_whole_series(self):
+        """Un solape con una reserva existente impide crear la serie"""
+        self.env['cowork.access.request'].create({
+            'membership_id': self.membership.id,
+            'service_id': self.service.id,
+            'date_scheduled': self.date_start + timedelta(weeks=2, minutes=30),
+            'duration_hours': 1.0,
+        })
+        with self.assertRaises(ValidationError):
+            self.series.action_confirm()
+        self.assertFalse(self.series.request_ids)
+
+    def test_cancel_refunds_future_occurrences(self):
+        """Cancelar la serie devuelve las horas de todas las ocurrencias aprobadas"""
+        self.series.action_confirm()
+        self.series.action_approve()
+        self.assertEqual(self.membership.call_room_hours_used, 4.0)
+
+        self.series.action_cancel()
+        self.assertEqual(set(self.series.request_ids.mapped('state')), {'cancelled'})
+        self.assertEqual(self.membership.call_room_hours_used, 0.0)
+        self.assertEqual(self.membership.call_room_hours_remaining, 10.0)
+
+    def test_edit_keeps_unchanged_occurrences(self):
+        """Acortar la serie solo cancela y devuelve las ocurrencias que desaparecen"""
+        self.series.action_confirm()
+        self.series.action_approve()
+        first_three = self.series.request_ids.sorted('date_scheduled')[:3]
+        Outbox = self.env['cowork.notification.outbox']
+        notified = Outbox.search_count([('model', '=', self.series._name), ('res_id', '=', self.series.id)])
+
+        self.series.write({'count': 3})
+
+        active = self.series.request_ids.filtered(lambda r: r.state != 'cancelled')
+        self.assertEqual(active, first_three)
+        self.assertEqual(set(active.mapped('state')), {'approved'})
+        self.assertEqual(self.membership.call_room_hours_used, 3.0)
+        # Sin ocurrencias nuevas por aprobar no hay aviso al administrador
+        self.assertEqual(Outbox.search_count(
+            [('model', '=', self.series._name), ('res_id', '=', self.series.id)]), notified)
+
+    def test_edit_carries_over_approvals(self):
+        """Las ocurrencias que cambian de horario conservan su aprobación"""
+        self.series.action_confirm()
+        self.series.action_approve()
+        self.series.write({'duration_hours': 2.0})
+
+        active = self.series.request_ids.filtered(lambda r: r.state != 'cancelled')
+        self.assertEqual(len(active), 4)
+        self.assertEqual(set(active.mapped('duration_hours')), {2.0})
+        self.assertEqual(set(active.mapped('state')), {'approved'})
+        self.assertEqual(self.membership.call_room_hours_used, 8.0)
+
+    def test_edit_notifies_once_per_series(self):
+        """Las ocurrencias nuevas por aprobar generan un único aviso por serie"""
+        self.series.action_confirm()
+        Outbox = self.env['cowork.notification.outbox']
+        domain = [('model', '=', self.series._name), ('res_id', '=', self.series.id)]
+        self.assertEqual(Outbox.search_count(domain), 1)
+
+        self.series.write({'count': 6})
+
+        self.assertEqual(len(self.series.request_ids), 6)
+        self.assertEqual(Outbox.search_count(domain), 2)
+        self.assertFalse(Outbox.search_count(
+            [('model', '=', 'cowork.access.request'), ('res_id', 'in', self.series.request_ids.ids)]))
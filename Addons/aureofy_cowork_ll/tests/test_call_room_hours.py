@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+
+from datetime import datetime, timedelta
+
+from odoo import fields
+from odoo.exceptions import UserError
+from odoo.tests.common import TransactionCase, tagged
+from dateutil.relativedelta import relativedelta
+
+
+@tagged('post_install', '-at_install')
+class TestCallRoomHours(TransactionCase):
+
+    def setUp(self):
+        super(TestCallRoomHours, self).setUp()
+        self.partner = self.env['res.partner'].create({'name': 'Call Room Partner'})
+        self.plan = self.env['cowork.membership.plan'].create({
+            'name': 'Call Room Plan',
+            'price': 100.0,
+            'call_room_hours_included': 5,
+        })
+        self.membership = self.env['cowork.membership'].create({
+            'partner_id': self.partner.id,
+            'plan_id': self.plan.id,
+            'date_start': fields.Date.today() - relativedelta(months=1),
+        })
+        self.membership.action_confirm()
+        self.service = self.env['cowork.service'].create({
+            'name': 'Phone Booth',
+            'is_paid': True,
+            'service_type': 'phone_booth',
+        })
+
+    def _request(self, hours):
+        return self.env['cowork.access.request'].create({
+            'membership_id': self.membership.id,
+            'service_id': self.service.id,
+            'date_scheduled': datetime.now() + timedelta(days=1),
+            'duration_hours': hours,
+            'payment_method': 'call_room_hours',
+            'state': 'pending',
+        })
+
+    def test_usage_and_refund(self):
+        """El consumo y la devolución quedan en el historial del periodo"""
+        self.assertEqual(self.membership.call_room_hours_remaining, 5.0)
+
+        request = self._request(2.0)
+        request.action_approve()
+        self.assertEqual(self.membership.call_room_hours_used, 2.0)
+        self.assertEqual(self.membership.call_room_hours_remaining, 3.0)
+
+        with self.assertRaises(UserError):
+            self._request(4.0).action_approve()
+
+        request.action_cancel()
+        self.assertEqual(self.membership.call_room_hours_used, 0.0)
+        self.assertEqual(self.membership.call_room_hours_remaining, 5.0)
+        self.assertEqual(
+            sorted(self.membership.call_room_hours_ids.mapped('entry_type')),
+            ['granted', 'refund', 'used'])
+
+    def test_renewal_opens_new_period(self):
+        """La renovación expira el saldo anterior y conserva su historial"""
+        self._request(1.5).action_approve()
+        old_period = self.membership.call_room_period_start
+
+        self.membership.action_renew_monthly_benefits()
+        self.assertEqual(self.membership.call_room_period_start, fields.Date.today())
+        self.assertEqual(self.membership.call_room_hours_used, 0.0)
+        self.assertEqual(self.membership.call_room_hours_remaining, 5.0)
+
+        old_balance = self.env['cowork.call.room.balance'].search([
+            ('membership_id', '=', self.membership.id),
+            ('period_start', '=', old_period),
+        ])
+        self.assertEqual(old_balance.hours_used, 1.5)
+        self.assertEqual(old_balance.balance, 0.0)
@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+
+import threading
+from datetime import datetime, timedelta
+
+import odoo
+from odoo import api, fields, SUPERUSER_ID
+from odoo.exceptions import UserError
+from odoo.tests.common import BaseCase, get_db_name, tagged
+
+
+@tagged('-standard', 'cowork_stress')
+class TestConcurrentSpending(BaseCase):
+    """Aprobaciones simultáneas desde conexiones independientes.
+
+    Cada hilo usa su propio cursor, como lo harían varios workers, por lo que
+    los datos se confirman en la base y se eliminan al terminar.
+    Ejecutar con ``--test-tags cowork_stress``.
+    """
+
+    WORKERS = 20
+    CREDITS = 8
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.registry = odoo.registry(get_db_name())
+
+    def setUp(self):
+        super().setUp()
+        with self.registry.cursor() as cr:
+            env = api.Environment(cr, SUPERUSER_ID, {})
+            partner = env['res.partner'].create({'name': 'Stress Member'})
+            plan = env['cowork.membership.plan'].create({'name': 'Stress Plan', 'price': 1.0})
+            membership = env['cowork.membership'].create({
+                'partner_id': partner.id,
+                'plan_id': plan.id,
+                'date_start': fields.Date.today(),
+            })
+            service = env['cowork.service'].create({
+                'name': 'Stress Room',
+                'is_paid': True,
+                'credits_cost': 1,
+                'service_type': 'meeting_room',
+            })
+            env['cowork.credits'].create({
+                'partner_id': partner.id,
+                'credits_type': 'bonus',
+                'credits_amount': self.CREDITS,
+            })
+            start = datetime.now().replace(microsecond=0) + timedelta(days=1)
+            requests = env['cowork.access.request'].create([{
+                'membership_id': membership.id,
+                'service_id': service.id,
+                'date_scheduled': start + timedelta(hours=i),
+                'duration_hours': 1.0,
+                'payment_method': 'credits',
+                'state': 'pending',
+            } for i in range(self.WORKERS)])
+            self.partner_id = partner.id
+            self.request_ids = requests.ids
+            self.cleanup_ids = [
+                ('cowork.access.request', requests.ids),
+                ('cowork.membership', membership.ids),
+                ('cowork.service', service.ids),
+                ('cowork.membership.plan', plan.ids),
+                ('res.partner', partner.ids),
+            ]
+        self.addCleanup(self._cleanup)
+
+    def _cleanup(self):
+        with self.registry.cursor() as cr:
+            env = api.Environment(cr, SUPERUSER_ID, {})
+            cr.execute("DELETE FROM cowork_credits WHERE partner_id = %s", [self.partner_id])
+            for model, ids in self.cleanup_ids:
+                env[model].browse(ids).exists().unlink()
+
+    def _approve(self, request_id):
+        def approve(env):
+            env['cowork.access.request'].browse(request_id).action_approve()
+
+        with self.registry.cursor() as cr:
+            env = api.Environment(cr, SUPERUSER_ID, {})
+            env['cowork.spending.lock']._run_with_retry(approve, max_tries=50)
+
+    def test_parallel_approvals_never_overspend(self):
+        results = []
+        barrier = threading.Barrier(self.WORKERS)
+
+        def worker(request_id):
+            barrier.wait()
+            try:
+                self._approve(request_id)
+                results.append('approved')
+            except UserError:
+                results.append('rejected')
+
+        threads = [threading.Thread(target=worker, args=(request_id,))
+                   for request_id in self.request_ids]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results.count('approved'), self.CREDITS)
+        self.assertEqual(results.count('rejected'), self.WORKERS - self.CREDITS)
+        with self.registry.cursor() as cr:
+            env = api.Environment(cr, SUPERUSER_ID, {})
+            self.assertEqual(env['cowork.credits'].get_partner_balance(self.partner_id), 0)
+            cr.execute("SELECT SUM(credits_amount) FROM cowork_credits WHERE partner_id = %s",
+                       [self.partner_id])
+            self.assertEqual(cr.fetchone()[0], 0)
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+
+from odoo.tests.common import TransactionCase, tagged
+
+
+@tagged('post_install', '-at_install')
+class TestCreditsBalance(TransactionCase):
+
+    def setUp(self):
+        super(TestCreditsBalance, self).setUp()
+        self.Credits = self.env['cowork.credits']
+        self.Balance = self.env['cowork.credits.balance']
+        self.partner = self.env['res.partner'].create({'name': 'Balance Partner'})
+        self.other_partner = self.env['res.partner'].create({'name': 'Other Partner'})
+
+    def test_balance_follows_ledger(self):
+        """El balance materializado sigue las altas, cambios y bajas del historial"""
+        credit = self.Credits.create({
+            'partner_id': self.partner.id,
+            'credits_type': 'bonus',
+            'credits_amount': 30,
+        })
+        self.Credits.create({
+            'partner_id': self.partner.id,
+            'credits_type': 'used',
+            'credits_amount': -10,
+        })
+        self.assertEqual(self.Credits.get_partner_balance(self.partner.id), 20)
+
+        credit.credits_amount = 50
+        self.assertEqual(self.Credits.get_partner_balance(self.partner.id), 40)
+
+        # Mover el movimiento a otro miembro
+        credit.partner_id = self.other_partner
+        self.assertEqual(self.Credits.get_partner_balance(self.partner.id), -10)
+        self.assertEqual(self.Credits.get_partner_balance(self.other_partner.id), 50)
+
+        credit.unlink()
+        self.assertEqual(self.Credits.get_partner_balance(self.other_partner.id), 0)
+
+    def test_batch_balances(self):
+        """Los balances de varios miembros se obtienen en una sola llamada"""
+        self.Credits.create([
+            {'partner_id': self.partner.id, 'credits_type': 'bonus', 'credits_amount': 5},
+            {'partner_id': self.partner.id, 'credits_type': 'bonus', 'credits_amount': 7},
+            {'partner_id': self.other_partner.id, 'credits_type': 'bonus', 'credits_amount': 3},
+        ])
+        balances = self.Credits.get_partner_balances([self.partner.id, self.other_partner.id])
+        self.assertEqual(balances, {self.partner.id: 12, self.other_partner.id: 3})
+
+    def test_consistency_check_repairs_balance(self):
+        """El verificador detecta y corrige un balance desalineado"""
+        self.Credits.create({
+            'partner_id': self.partner.id,
+            'credits_type': 'bonus',
+            'credits_amount': 15,
+        })
+        self.env.cr.execute(
+            "UPDATE cowork_credits_balance SET balance = 99 WHERE partner_id = %s",
+            [self.partner.id])
+
+        mismatches = self.Balance._check_consistency(fix=True)
+        self.assertIn((self.partner.id, 99, 15), mismatches)
+        self.assertEqual(self.Credits.get_partner_balance(self.partner.id), 15)
+        self.assertFalse(self.Balance._check_consistency(fix=False))
+
+    def test_grant_bulk(self):
+        """El otorgamiento masivo crea un movimiento por miembro y actualiza los balances"""
+        partners = self.partner | self.other_partner
+        credits = self.Credits.grant_bulk(partners.ids + [self.partner.id], 8,
+                                          date_expiration='2099-12-31')
+        self.assertEqual(len(credits), 2)
+        self.assertEqual(set(credits.mapped('remaining_amount')), {8})
+        self.assertEqual(self.Credits.get_partner_balances(partners.ids),
+                         {self.partner.id: 8, self.other_partner.id: 8})
+
+        passes = self.env['cowork.passes'].grant_bulk(partners.ids, 2)
+        self.assertEqual(len(passes), 2)
+        self.assertEqual(self.env['cowork.passes'].get_partner_balance(self.partner.id), 2)
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+
+from datetime import timedelta
+
+from odoo import fields
+from odoo.tests.common import TransactionCase, tagged
+
+
+@tagged('post_install', '-at_install')
+class TestCreditsLiability(TransactionCase):
+
+    def setUp(self):
+        super(TestCreditsLiability, self).setUp()
+        self.today = fields.Date.today()
+        self.partner = self.env['res.partner'].create({'name': 'Liability Member'})
+        self.Credits = self.env['cowork.credits']
+        order = self.env['sale.order'].create({'partner_id': self.partner.id})
+        self.purchase, self.sold, self.granted, self.expired = self.Credits.create([{
+            'partner_id': self.partner.id,
+            'credits_type': 'purchased',
+            'credits_amount': 10,
+            'price_per_credit': 2.0,
+            'date_expiration': self.today + timedelta(days=30),
+        }, {
+            'partner_id': self.partner.id,
+            'credits_type': 'purchased',
+            'credits_amount': 8,
+            'price_per_credit': 1.5,
+            'sale_id': order.id,
+            'date_expiration': self.today + timedelta(days=90),
+        }, {
+            'partner_id': self.partner.id,
+            'credits_type': 'granted',
+            'credits_amount': 5,
+        }, {
+            'partner_id': self.partner.id,
+            'credits_type': 'bonus',
+            'credits_amount': 4,
+            'date_expiration': self.today - timedelta(days=1),
+        }])
+
+    def test_remaining_value_per_lot(self):
+        """El saldo de cada lote coincide con el del historial y se excluyen los vencidos"""
+        self.Credits.consume(self.partner.id, 3)
+        report = self.env['cowork.credits.liability.report'].search(
+            [('partner_id', '=', self.partner.id)])
+        by_lot = {line.id: line for line in report}
+
+        self.assertNotIn(self.expired.id, by_lot)
+        for lot in self.purchase | self.sold | self.granted:
+            self.assertEqual(by_lot[lot.id].remaining_credits, lot.remaining_amount)
+        self.assertEqual(by_lot[self.purchase.id].remaining_credits, 7)
+        self.assertAlmostEqual(by_lot[self.purchase.id].remaining_value, 14.0)
+        self.assertEqual(by_lot[self.purchase.id].channel, 'purchase')
+        self.assertEqual(by_lot[self.sold.id].channel, 'sale_order')
+        self.assertEqual(by_lot[self.granted.id].channel, 'plan')
+
+        groups = self.env['cowork.credits.liability.report']._read_group(
+            [('partner_id', '=', self.partner.id)], ['channel'], ['remaining_value:sum'])
+        self.assertAlmostEqual(dict(groups)['sale_order'], 12.0)
+
+    def test_refund_keeps_channel_and_value(self):
+        """Los créditos devueltos conservan el canal y el precio del lote de origen"""
+        plan = self.env['cowork.membership.plan'].create({'name': 'Liability Plan', 'price': 1.0})
+        membership = self.env['cowork.membership'].create({
+            'partner_id': self.partner.id,
+            'plan_id': plan.id,
+            'date_start': self.today,
+        })
+        service = self.env['cowork.service'].create({
+            'name': 'Liability Room',
+            'is_paid': True,
+            'credits_cost': 3,
+            'service_type': 'meeting_room',
+        })
+        request = self.env['cowork.access.request'].create({
+            'membership_id': membership.id,
+            'service_id': service.id,
+            'date_scheduled': fields.Datetime.now() + timedelta(days=1),
+            'duration_hours': 1.0,
+            'payment_method': 'credits',
+            'state': 'pending',
+        })
+        request.action_approve()
+        request.action_cancel()
+
+        refund = self.Credits.search([('access_request_id', '=', request.id),
+                                      ('credits_type', '=', 'refund')])
+        self.assertEqual(refund.origin_lot_id, self.purchase)
+        line = self.env['cowork.credits.liability.report'].search([('id', '=', refund.id)])
+        self.assertEqual(line.channel, 'purchase')
+        self.assertEqual(line.remaining_credits, 3)
+        self.assertAlmostEqual(line.remaining_value, 6.0)
@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+
+from odoo.tests.common import TransactionCase, tagged
+from odoo.exceptions import UserError
+from odoo import fields
+from dateutil.relativedelta import relativedelta
+
+
+@tagged('post_install', '-at_install')
+class TestCreditsLots(TransactionCase):
+
+    def setUp(self):
+        super(TestCreditsLots, self).setUp()
+        self.Credits = self.env['cowork.credits']
+        self.partner = self.env['res.partner'].create({'name': 'Lots Partner'})
+        today = fields.Date.today()
+        self.lot_late = self.Credits.create({
+            'partner_id': self.partner.id,
+            'credits_type': 'purchased',
+            'credits_amount': 10,
+            'date_expiration': today + relativedelta(months=6),
+        })
+        self.lot_soon = self.Credits.create({
+            'partner_id': self.partner.id,
+            'credits_type': 'purchased',
+            'credits_amount': 10,
+            'date_expiration': today + relativedelta(days=10),
+        })
+
+    def test_fifo_consumption(self):
+        """El consumo se descuenta primero del lote que vence antes"""
+        usages = self.Credits.consume(self.partner.id, 15, {'description': 'Test'})
+
+        self.assertEqual(len(usages), 2)
+        self.assertEqual(usages.mapped('lot_id'), self.lot_soon | self.lot_late)
+        self.assertEqual(sum(usages.mapped('credits_amount')), -15)
+        self.assertEqual(self.lot_soon.remaining_amount, 0)
+        self.assertEqual(self.lot_late.remaining_amount, 5)
+        self.assertEqual(self.Credits.get_partner_balance(self.partner.id), 5)
+
+    def test_manual_consumption_draws_lots(self):
+        """Un consumo manual sin lote también reduce el saldo de los lotes"""
+        self.Credits.create({
+            'partner_id': self.partner.id,
+            'credits_type': 'used',
+            'credits_amount': -4,
+        })
+        self.assertEqual(self.lot_soon.remaining_amount, 6)
+        self.assertEqual(self.lot_late.remaining_amount, 10)
+
+    def test_debit_ignores_unswept_expired_lot(self):
+        """Un lote vencido pendiente de barrido no se puede gastar con debit"""
+        partner = self.env['res.partner'].create({'name': 'Expired Lot Partner'})
+        lot = self.Credits.create({
+            'partner_id': partner.id,
+            'credits_type': 'bonus',
+            'credits_amount': 10,
+            'date_expiration': fields.Date.today() - relativedelta(days=1),
+        })
+        self.assertEqual(self.Credits.get_partner_balance(partner.id), 10)
+
+        with self.assertRaises(UserError):
+            self.Credits.debit(partner.id, 5)
+        self.assertFalse(self.Credits.search([('partner_id', '=', partner.id),
+                                              ('credits_amount', '<', 0)]))
+
+        self.Credits._cron_expire_lots()
+        self.assertEqual(lot.remaining_amount, 0)
+        self.assertEqual(self.Credits.get_partner_balance(partner.id), 0)
+
+    def test_debit_only_writes_linked_rows(self):
+        """debit reparte el consumo entre los lotes vigentes sin movimientos sueltos"""
+        usages = self.Credits.debit(self.partner.id, 12)
+        self.assertEqual(usages.mapped('lot_id'), self.lot_soon | self.lot_late)
+        self.assertEqual(sum(usages.mapped('credits_amount')), -12)
+        with self.assertRaises(UserError):
+            self.Credits.debit(self.partner.id, 9)
+
+    def test_expiry_sweep(self):
+        """El barrido vence el saldo pendiente de los lotes vencidos"""
+        self.Credits.consume(self.partner.id, 3)
+        self.lot_soon.date_expiration = fields.Date.today() - relativedelta(days=1)
+
+        self.assertEqual(self.Credits._cron_expire_lots(), 1)
+
+        expiry = self.Credits.search([('lot_id', '=', self.lot_soon.id),
+                                      ('credits_type', '=', 'expired')])
+        self.assertEqual(expiry.credits_amount, -7)
+        self.assertEqual(self.lot_soon.remaining_amount, 0)
+        self.assertEqual(self.Credits.get_partner_balance(self.partner.id), 10)
+        # Una segunda pasada no vuelve a vencer nada
+        self.assertEqual(self.Credits._cron_expire_lots(), 0)
+
+    def test_renewal_keeps_purchased_credits(self):
+        """Los créditos del plan se gastan antes que los comprados y la renovación no toca estos"""
+        plan = self.env['cowork.membership.plan'].create({
+            'name': 'Lots Recurring Plan',
+            'price': 100.0,
+            'duration_type': 'annual',
+            'is_recurring': True,
+            'credits_included': 5,
+        })
+        partner = self.env['res.partner'].create({'name': 'Lots Member'})
+        purchase = self.Credits.purchase_credits(partner.id, 10, 2.0)
+        membership = self.env['cowork.membership'].create({
+            'partner_id': partner.id,
+            'plan_id': plan.id,
+            'date_start': fields.Date.today(),
+        })
+        membership.action_confirm()
+        membership.action_activate()
+        grant = self.Credits.search([('membership_id', '=', membership.id),
+                                     ('credits_type', '=', 'granted')])
+        self.assertLess(grant.date_expiration, purchase.date_expiration)
+
+        usages = self.Credits.consume(partner.id, 3)
+        self.assertEqual(usages.lot_id, grant)
+
+        membership.action_renew_monthly_benefits()
+        self.assertEqual(grant.remaining_amount, 0)
+        self.assertEqual(purchase.remaining_amount, 10)
+        self.assertEqual(self.Credits.get_partner_balance(partner.id), 10 + 5)
@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+
+from odoo.tests.common import TransactionCase, tagged
+
+
+@tagged('post_install', '-at_install')
+class TestFloorCounters(TransactionCase):
+
+    def setUp(self):
+        super(TestFloorCounters, self).setUp()
+        self.floor, self.other_floor = self.env['cowork.floor'].create([
+            {'name': 'Counter Floor', 'building_name': 'Counter Building'},
+            {'name': 'Other Counter Floor', 'building_name': 'Counter Building'},
+        ])
+        self.desks = self.env['cowork.desk'].create([
+            {'name': 'Counter Desk %s' % i, 'floor_id': self.floor.id} for i in range(4)
+        ])
+        self.beds = self.env['cowork.bed'].create([
+            {'name': 'Counter Bed %s' % i, 'floor_id': self.other_floor.id} for i in range(2)
+        ])
+
+    def _counters(self, floor):
+        fields_list = [name for name in floor._fields if name.startswith(('desk_', 'bed_'))
+                       and name.endswith('_count')]
+        return {name: floor[name] for name in fields_list}
+
+    def test_incremental_counters(self):
+        """Los contadores siguen los cambios de estado, piso y archivado"""
+        self.assertEqual(self.floor.desk_count, 4)
+        self.assertEqual(self.floor.desk_available_count, 4)
+
+        self.desks[0].write({'state': 'occupied'})
+        self.desks[1].action_set_maintenance()
+        self.desks[2].write({'floor_id': self.other_floor.id})
+        self.desks[3].write({'active': False})
+        self.beds[0].write({'state': 'reserved'})
+
+        self.assertEqual(self.floor.desk_count, 2)
+        self.assertEqual(self.floor.desk_occupied_count, 1)
+        self.assertEqual(self.floor.desk_maintenance_count, 1)
+        self.assertEqual(self.floor.desk_available_count, 0)
+        self.assertEqual(self.other_floor.desk_count, 1)
+        self.assertEqual(self.other_floor.bed_reserved_count, 1)
+        self.assertAlmostEqual(self.other_floor.occupancy_rate, 100.0 / 3)
+
+        self.beds[1].unlink()
+        self.assertEqual(self.other_floor.bed_count, 1)
+
+        # La reconstrucción agrupada coincide con los incrementos
+        expected = [self._counters(self.floor), self._counters(self.other_floor)]
+        self.env['cowork.floor']._rebuild_space_counters()
+        self.assertEqual([self._counters(self.floor), self._counters(self.other_floor)], expected)
+
+        occupancy = self.env['cowork.floor'].get_building_occupancy()['Counter Building']
+        self.assertEqual(occupancy['desk_count'], 3)
+        self.assertEqual(occupancy['bed_reserved_count'], 1)
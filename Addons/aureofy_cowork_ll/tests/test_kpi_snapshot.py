@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+
+from datetime import datetime, time, timedelta
+
+from odoo import fields
+from odoo.tests.common import TransactionCase, tagged
+
+
+@tagged('post_install', '-at_install')
+class TestKpiSnapshot(TransactionCase):
+
+    def setUp(self):
+        super(TestKpiSnapshot, self).setUp()
+        self.today = fields.Date.today()
+        self.yesterday = self.today - timedelta(days=1)
+        self.plan = self.env['cowork.membership.plan'].create({
+            'name': 'Snapshot Plan',
+            'price': 300.0,
+            'duration_type': 'monthly',
+            'space_type': 'coworking',
+        })
+        self.floor = self.env['cowork.floor'].create({'name': 'Snapshot Floor'})
+        desk = self.env['cowork.desk'].create({'name': 'Snapshot Desk', 'floor_id': self.floor.id})
+        partner = self.env['res.partner'].create({'name': 'Snapshot Member'})
+        self.membership = self.env['cowork.membership'].create({
+            'partner_id': partner.id,
+            'plan_id': self.plan.id,
+            'desk_id': desk.id,
+            'date_start': self.today - timedelta(days=3),
+        })
+        self.membership.action_confirm()
+        self.membership.action_activate()
+        moment = datetime.combine(self.yesterday, time(12))
+        self.env['cowork.credits'].create([{
+            'partner_id': partner.id,
+            'membership_id': self.membership.id,
+            'credits_type': 'bonus',
+            'credits_amount': 10,
+            'date': moment,
+        }, {
+            'partner_id': partner.id,
+            'membership_id': self.membership.id,
+            'credits_type': 'used',
+            'credits_amount': -4,
+            'date': moment,
+        }])
+        self.Snapshot = self.env['cowork.kpi.snapshot']
+
+    def _rows(self):
+        return self.Snapshot.search([('floor_id', '=', self.floor.id)])
+
+    def test_snapshot_is_idempotent(self):
+        """Repetir un rango reemplaza las filas en lugar de duplicarlas"""
+        date_from = self.today - timedelta(days=3)
+        self.Snapshot._snapshot(date_from, self.yesterday)
+        rows = self._rows()
+        self.assertEqual(len(rows), 3)
+        self.Snapshot._snapshot(date_from, self.yesterday)
+        self.assertEqual(len(self._rows()), 3)
+
+        row = self._rows().filtered(lambda r: r.date == self.yesterday)
+        self.assertEqual(row.plan_id, self.plan)
+        self.assertEqual(row.active_members, 1)
+        self.assertEqual(row.occupied_desks, 1)
+        self.assertEqual(row.credits_issued, 10)
+        self.assertEqual(row.credits_spent, 4)
+        self.assertAlmostEqual(row.mrr, 300.0)
+
+    def test_cron_is_incremental(self):
+        """El cron continúa desde el último día sin volver a generar el histórico"""
+        self.Snapshot._snapshot(self.today - timedelta(days=3), self.today - timedelta(days=2))
+        self.Snapshot._cron_snapshot(refresh_days=1)
+        self.assertEqual(len(self._rows()), 3)
+        self.assertEqual(max(self._rows().mapped('date')), self.yesterday)
+        self.assertFalse(self._rows().filtered(lambda r: r.date < self.today - timedelta(days=3)))
@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+
+from odoo.tests.common import TransactionCase, tagged
+from odoo.exceptions import UserError
+from odoo import fields
+from dateutil.relativedelta import relativedelta
+
+
+@tagged('post_install', '-at_install')
+class TestLedgerCheckpoint(TransactionCase):
+
+    def setUp(self):
+        super(TestLedgerCheckpoint, self).setUp()
+        self.Passes = self.env['cowork.passes']
+        self.Checkpoint = self.env['cowork.ledger.checkpoint']
+        self.partner = self.env['res.partner'].create({'name': 'Checkpoint Partner'})
+        self.old_entries = self.Passes.create([
+            {'partner_id': self.partner.id, 'pass_type': 'granted', 'amount': 10},
+            {'partner_id': self.partner.id, 'pass_type': 'used', 'amount': -3},
+        ])
+        self.old_entries.flush_recordset()
+        # Simular movimientos antiguos, archivables tras el checkpoint
+        self.env.cr.execute("""
+            UPDATE cowork_passes
+               SET date = date - interval '2 days'
+             WHERE id = ANY(%s)
+        """, [self.old_entries.ids])
+
+    def test_balance_is_checkpoint_plus_tail(self):
+        """El balance se mantiene al crear checkpoints y archivar movimientos"""
+        self.assertTrue(self.Checkpoint._create_checkpoints('passes'))
+        checkpoint = self.Checkpoint.search([('partner_id', '=', self.partner.id),
+                                             ('ledger_type', '=', 'passes')])
+        self.assertEqual(checkpoint.balance, 7)
+        self.assertEqual(checkpoint.last_entry_id, max(self.old_entries.ids))
+
+        self.Passes.create({'partner_id': self.partner.id, 'pass_type': 'used', 'amount': -1})
+        self.assertEqual(self.Passes.get_partner_balance(self.partner.id), 6)
+
+        archived = self.Checkpoint._archive_checkpointed_entries(
+            'passes', fields.Datetime.now() - relativedelta(days=1), partner_ids=[self.partner.id])
+        self.assertEqual(archived, 2)
+        self.assertFalse(self.old_entries.exists().filtered('active'))
+        self.assertEqual(self.Passes.get_partner_balance(self.partner.id), 6)
+
+    def test_checkpointed_entries_are_locked(self):
+        """Los movimientos incluidos en un checkpoint no cambian de importe"""
+        self.Checkpoint._create_checkpoints('passes')
+        with self.assertRaises(UserError):
+            self.old_entries[0].amount = 20
+        with self.assertRaises(UserError):
+            self.old_entries[1].unlink()
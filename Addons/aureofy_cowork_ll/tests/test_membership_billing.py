@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+
+from odoo import fields
+from odoo.addons.account.tests.common import AccountTestInvoicingCommon
+from odoo.tests.common import tagged
+
+
+@tagged('post_install', '-at_install')
+class TestMembershipBilling(AccountTestInvoicingCommon):
+
+    @classmethod
+    def setUpClass(cls, chart_template_ref=None):
+        super().setUpClass(chart_template_ref=chart_template_ref)
+        cls.plan = cls.env['cowork.membership.plan'].create({
+            'name': 'Billing Plan',
+            'price': 100.0,
+        })
+        cls.membership = cls.env['cowork.membership'].create({
+            'partner_id': cls.partner_a.id,
+            'plan_id': cls.plan.id,
+            'date_start': fields.Date.today(),
+        })
+
+    def test_amounts_follow_invoices(self):
+        """El resumen guardado sigue la publicación y el pago de las facturas"""
+        invoice = self.init_invoice('out_invoice', partner=self.partner_a, amounts=[100.0])
+        self.membership.invoice_ids = [(4, invoice.id)]
+        self.assertEqual(self.membership.amount_total, 0.0)
+
+        invoice.action_post()
+        self.assertEqual(self.membership.amount_total, invoice.amount_total)
+        self.assertEqual(self.membership.amount_due, invoice.amount_total)
+        overdue = self.env['cowork.membership'].search([('amount_due', '>', 0)])
+        self.assertIn(self.membership, overdue)
+
+        self.env['account.payment.register'].with_context(
+            active_model='account.move', active_ids=invoice.ids,
+        ).create({})._create_payments()
+        self.assertEqual(self.membership.amount_due, 0.0)
+        self.assertEqual(self.membership.amount_paid, invoice.amount_total)
+        self.assertNotIn(self.membership, self.env['cowork.membership'].search([('amount_due', '>', 0)]))
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+
+from unittest.mock import patch
+
+from odoo import fields
+from odoo.exceptions import UserError
+from odoo.tests.common import TransactionCase, tagged
+from dateutil.relativedelta import relativedelta
+
+
+@tagged('post_install', '-at_install')
+class TestMembershipExpiry(TransactionCase):
+
+    def setUp(self):
+        super(TestMembershipExpiry, self).setUp()
+        self.plan = self.env['cowork.membership.plan'].create({
+            'name': 'Expiry Plan',
+            'price': 100.0,
+            'duration_type': 'monthly',
+            'renewal_reminder_days': 7,
+        })
+        self.partner = self.env['res.partner'].create({'name': 'Expiry Member'})
+        today = fields.Date.today()
+        duration = relativedelta(days=self.plan._get_duration_days())
+
+        def membership(date_end):
+            record = self.env['cowork.membership'].create({
+                'partner_id': self.partner.id,
+                'plan_id': self.plan.id,
+                'date_start': date_end - duration,
+            })
+            record.action_confirm()
+            return record
+
+        self.past_due = membership(today - relativedelta(days=1))
+        self.past_due_2 = membership(today - relativedelta(days=3))
+        self.due_soon = membership(today + relativedelta(days=3))
+        self.far_away = membership(today + relativedelta(days=30))
+
+    def test_expiry_sweep(self):
+        """Las vencidas expiran y las próximas reciben un único recordatorio"""
+        self.env['cowork.membership']._cron_check_expiry(batch_size=1)
+
+        self.assertEqual((self.past_due | self.past_due_2).mapped('state'), ['expired', 'expired'])
+        self.assertEqual(self.due_soon.state, 'confirmed')
+        self.assertTrue(self.due_soon.renewal_reminder_sent)
+        self.assertFalse(self.far_away.renewal_reminder_sent)
+
+        # Una segunda ejecución no vuelve a procesar lo ya resuelto
+        self.assertFalse(self.env['cowork.membership']._get_reminder_ids(fields.Date.today(), 10))
+        self.assertFalse(self.env['cowork.membership']._get_expired_ids(fields.Date.today(), 10))
+
+    def test_failing_membership_is_skipped(self):
+        """Un error en una membresía no detiene el resto del bloque ni los siguientes"""
+        Membership = type(self.env['cowork.membership'])
+        action_expire = Membership.action_expire
+        broken = self.past_due
+
+        def failing_expire(records):
+            if broken in records:
+                raise UserError('Broken membership')
+            return action_expire(records)
+
+        with patch.object(Membership, 'action_expire', failing_expire):
+            self.env['cowork.membership']._cron_check_expiry(batch_size=10)
+
+        self.assertEqual(broken.state, 'confirmed')
+        self.assertEqual(self.past_due_2.state, 'expired')
+        self.assertTrue(self.due_soon.renewal_reminder_sent)
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+
+from odoo import fields
+from odoo.exceptions import UserError
+from odoo.tests.common import TransactionCase, tagged
+
+
+@tagged('post_install', '-at_install')
+class TestMembershipLifecycle(TransactionCase):
+
+    def setUp(self):
+        super(TestMembershipLifecycle, self).setUp()
+        self.plan = self.env['cowork.membership.plan'].create({
+            'name': 'Bulk Plan',
+            'price': 100.0,
+            'credits_included': 10,
+            'passes_included': 3,
+            'call_room_hours_included': 2,
+        })
+        floor = self.env['cowork.floor'].create({'name': 'Bulk Floor'})
+        self.desks = self.env['cowork.desk'].create([
+            {'name': 'Bulk Desk %s' % i, 'floor_id': floor.id} for i in range(20)
+        ])
+        partners = self.env['res.partner'].create([
+            {'name': 'Bulk Member %s' % i} for i in range(20)
+        ])
+        self.memberships = self.env['cowork.membership'].create([{
+            'partner_id': partner.id,
+            'plan_id': self.plan.id,
+            'desk_id': desk.id,
+            'date_start': fields.Date.today(),
+        } for partner, desk in zip(partners, self.desks)])
+
+    def test_bulk_transitions(self):
+        """Confirmar, activar y expirar en bloque mantiene espacios y saldos"""
+        self.memberships.action_confirm()
+        self.assertEqual(set(self.memberships.mapped('state')), {'confirmed'})
+        self.assertEqual(set(self.desks.mapped('state')), {'reserved'})
+        for membership in self.memberships:
+            self.assertEqual(membership.desk_id.membership_id, membership)
+            self.assertEqual(membership.desk_id.member_id, membership.partner_id)
+        self.assertEqual(set(self.memberships.mapped('credits_remaining')), {10})
+        self.assertEqual(set(self.memberships.mapped('passes_remaining')), {3})
+        self.assertEqual(set(self.memberships.mapped('call_room_hours_remaining')), {2.0})
+
+        self.memberships.action_activate()
+        self.assertEqual(set(self.memberships.mapped('state')), {'active'})
+        self.assertEqual(set(self.desks.mapped('state')), {'occupied'})
+
+        self.memberships.action_expire()
+        self.assertEqual(set(self.memberships.mapped('state')), {'expired'})
+        self.assertEqual(set(self.desks.mapped('state')), {'available'})
+        self.assertFalse(self.desks.mapped('membership_id'))
+        self.assertEqual(set(self.memberships.mapped('credits_remaining')), {0})
+        self.assertEqual(set(self.memberships.mapped('passes_remaining')), {0})
+        self.assertEqual(set(self.memberships.mapped('call_room_hours_remaining')), {0.0})
+
+    def test_bulk_activation_requires_confirmed(self):
+        """Una membresía fuera de estado impide la activación del bloque completo"""
+        self.memberships[:5].action_confirm()
+        with self.assertRaises(UserError):
+            self.memberships[:6].action_activate()
+        self.assertEqual(set(self.memberships[:5].mapped('state')), {'confirmed'})
+
+    def test_batch_renewal_keeps_spaces(self):
+        """La renovación masiva reserva los espacios y los recibe al empezar"""
+        self.memberships.action_confirm()
+        self.memberships.action_activate()
+
+        renewals = self.memberships._renew_batch(confirm=True)
+        self.assertEqual(len(renewals), len(self.memberships))
+        self.assertEqual(set(renewals.mapped('state')), {'confirmed'})
+        self.assertEqual(renewals.renewed_from_id, self.memberships)
+        for old in self.memberships:
+            new = renewals.filtered(lambda m: m.renewed_from_id == old)
+            self.assertEqual(new.date_start, old.date_end)
+            self.assertEqual(new.desk_id, old.desk_id)
+            # La membresía vigente conserva el escritorio hasta que empieza la renovación
+            self.assertEqual(old.desk_id.membership_id, old)
+        self.assertEqual(set(self.desks.mapped('state')), {'occupied'})
+
+        self.memberships.action_expire()
+        self.env['cowork.space.reservation']._cron_hand_over(date=renewals[0].date_start)
+        self.assertEqual(set(self.desks.mapped('state')), {'reserved'})
+        self.assertEqual(self.desks.membership_id, renewals)
+
+        with self.assertRaises(UserError):
+            self.memberships._renew_batch()
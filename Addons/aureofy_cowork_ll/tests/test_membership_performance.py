@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+
+from odoo.tests.common import tagged
+
+from .common import CoworkQueryCountCase
+
+
+@tagged('post_install', '-at_install')
+class TestMembershipPerformance(CoworkQueryCountCase):
+
+    def _read_list_view(self, memberships):
+        """Leer los saldos como lo hacen la lista y el kanban de membresías"""
+        return self._read_counting_queries(
+            memberships, ['credits_remaining', 'passes_remaining', 'call_room_hours_remaining'])
+
+    def test_membership_list_query_count(self):
+        """El número de consultas no depende de la cantidad de membresías"""
+        small = self._create_memberships(5, credits=[4], passes=[2])
+        large = self._create_memberships(80, credits=[4], passes=[2])
+
+        small_result, small_queries = self._read_list_view(small)
+        large_result, large_queries = self._read_list_view(large)
+
+        self.assertEqual(small_queries, large_queries)
+        self.assertEqual({row['credits_remaining'] for row in small_result + large_result}, {4})
+        self.assertEqual({row['passes_remaining'] for row in small_result + large_result}, {2})
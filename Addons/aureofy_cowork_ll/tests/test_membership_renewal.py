@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+
+from datetime import date
+from unittest.mock import patch
+
+from odoo import fields
+from odoo.exceptions import UserError
+from odoo.tests.common import TransactionCase, tagged
+from dateutil.relativedelta import relativedelta
+
+
+@tagged('post_install', '-at_install')
+class TestMembershipRenewal(TransactionCase):
+
+    def setUp(self):
+        super(TestMembershipRenewal, self).setUp()
+        self.plan = self.env['cowork.membership.plan'].create({
+            'name': 'Recurring Plan',
+            'price': 100.0,
+            'duration_type': 'annual',
+            'is_recurring': True,
+            'passes_included': 4,
+        })
+        self.partner = self.env['res.partner'].create({'name': 'Renewal Member'})
+
+    def _membership(self, date_start):
+        membership = self.env['cowork.membership'].create({
+            'partner_id': self.partner.id,
+            'plan_id': self.plan.id,
+            'date_start': date_start,
+        })
+        membership.action_confirm()
+        membership.action_activate()
+        return membership
+
+    def test_month_end_anniversary(self):
+        """Un inicio el día 31 renueva el último día de los meses cortos"""
+        membership = self._membership(date(2023, 1, 31))
+        self.assertEqual(membership._get_next_benefit_date(date(2023, 2, 1)), date(2023, 2, 28))
+        self.assertEqual(membership._get_next_benefit_date(date(2023, 2, 28)), date(2023, 3, 31))
+        self.assertEqual(membership._get_next_benefit_date(date(2024, 2, 15)), date(2024, 2, 29))
+
+    def test_started_membership_keeps_todays_anniversary(self):
+        """Una membresía iniciada cuyo aniversario es hoy renueva hoy; una nueva, al mes"""
+        today = fields.Date.today()
+        years = 4 if (today.month, today.day) == (2, 29) else 1
+        started = self._membership(today - relativedelta(years=years))
+        self.assertEqual(started.next_benefit_date, today)
+        new = self._membership(today)
+        self.assertEqual(new.next_benefit_date, today + relativedelta(months=1))
+
+    def test_cron_renews_only_due_memberships(self):
+        """El cron renueva las membresías vencidas, incluso con días de retraso"""
+        today = fields.Date.today()
+        due = self._membership(today - relativedelta(months=2))
+        not_due = self._membership(today - relativedelta(days=3))
+        due.next_benefit_date = today - relativedelta(days=5)
+        next_date = not_due.next_benefit_date
+
+        self.env['cowork.membership']._cron_monthly_renewal_benefits()
+
+        self.assertEqual(due.next_benefit_date, due._get_next_benefit_date(today))
+        self.assertGreater(due.next_benefit_date, today)
+        self.assertEqual(not_due.next_benefit_date, next_date)
+        renewals = self.env['cowork.passes'].search([
+            ('membership_id', 'in', (due | not_due).ids),
+            ('pass_type', '=', 'renewal'),
+        ])
+        self.assertEqual(renewals.membership_id, due)
+
+    def test_cron_processes_claimed_chunks(self):
+        """Cada bloque reclamado se renueva una sola vez hasta agotar las pendientes"""
+        today = fields.Date.today()
+        memberships = self.env['cowork.membership']
+        for _i in range(3):
+            membership = self._membership(today - relativedelta(months=1))
+            membership.next_benefit_date = today
+            memberships |= membership
+
+        self.env['cowork.membership']._cron_monthly_renewal_benefits(batch_size=2)
+
+        self.assertEqual(len(memberships.filtered(lambda m: m.next_benefit_date > today)), 3)
+        self.assertFalse(self.env['cowork.membership']._claim_due_renewals(today, 10))
+        for membership in memberships:
+            self.assertEqual(membership.passes_remaining, 4 * 3)
+        renewals = self.env['cowork.passes'].search([
+            ('membership_id', 'in', memberships.ids),
+            ('pass_type', '=', 'renewal'),
+        ])
+        self.assertEqual(len(renewals), 3)
+
+    def test_failing_membership_does_not_block_renewals(self):
+        """Una membresía que falla no impide renovar las demás del bloque ni las siguientes"""
+        today = fields.Date.today()
+        memberships = self.env['cowork.membership']
+        for _i in range(3):
+            membership = self._membership(today - relativedelta(months=1))
+            membership.next_benefit_date = today - relativedelta(days=1)
+            memberships |= membership
+        broken = memberships[0]
+        Membership = type(memberships)
+        renew = Membership.action_renew_monthly_benefits
+
+        def failing_renew(records):
+            if broken in records:
+                raise UserError('Broken membership')
+            return renew(records)
+
+        with patch.object(Membership, 'action_renew_monthly_benefits', failing_renew):
+            self.env['cowork.membership']._cron_monthly_renewal_benefits(batch_size=2)
+
+        self.assertEqual(broken.next_benefit_date, today - relativedelta(days=1))
+        for membership in memberships - broken:
+            self.assertGreater(membership.next_benefit_date, today)
+
+    def test_bulk_mode_skips_chatter(self):
+        """En modo silencioso no hay chatter por registro sino un resumen por lote"""
+        membership = self._membership(fields.Date.today() - relativedelta(months=1))
+        message_count = len(membership.message_ids)
+        company_partner = self.env.company.partner_id
+        summary_count = len(company_partner.message_ids)
+
+        membership._bulk().action_renew_monthly_benefits()
+        membership.action_bulk_transition('action_expire')
+
+        self.assertEqual(membership.state, 'expired')
+        self.assertEqual(len(membership.message_ids), message_count)
+        company_partner.invalidate_recordset(['message_ids'])
+        self.assertEqual(len(company_partner.message_ids), summary_count + 2)
@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+
+from datetime import datetime, timedelta
+
+from odoo import fields
+from odoo.tests.common import TransactionCase, tagged
+
+
+@tagged('post_install', '-at_install')
+class TestNotificationOutbox(TransactionCase):
+
+    def setUp(self):
+        super(TestNotificationOutbox, self).setUp()
+        self.partner = self.env['res.partner'].create({
+            'name': 'Outbox Partner',
+            'email': 'outbox@example.com',
+        })
+        plan = self.env['cowork.membership.plan'].create({'name': 'Outbox Plan', 'price': 1.0})
+        self.membership = self.env['cowork.membership'].create({
+            'partner_id': self.partner.id,
+            'plan_id': plan.id,
+            'date_start': fields.Date.today(),
+        })
+        self.service = self.env['cowork.service'].create({
+            'name': 'Outbox Room',
+            'is_paid': True,
+            'service_type': 'meeting_room',
+        })
+        start = datetime.now().replace(microsecond=0) + timedelta(days=1)
+        self.requests = self.env['cowork.access.request'].create([{
+            'membership_id': self.membership.id,
+            'service_id': self.service.id,
+            'date_scheduled': start + timedelta(hours=i),
+            'duration_hours': 1.0,
+            'payment_method': 'free',
+            'state': 'pending',
+        } for i in range(3)])
+        self.Outbox = self.env['cowork.notification.outbox']
+
+    def _approval_mails(self):
+        return self.env['mail.mail'].search([('subject', 'like', 'Solicitud de Acceso Aprobada')])
+
+    def test_approval_is_queued(self):
+        """Aprobar solo encola; el cron renderiza todos los emails de una vez"""
+        self.requests.action_approve()
+        entries = self.Outbox.search([('res_id', 'in', self.requests.ids),
+                                      ('model', '=', 'cowork.access.request')])
+        self.assertEqual(len(entries), 3)
+        self.assertEqual(set(entries.mapped('state')), {'pending'})
+        self.assertFalse(self._approval_mails())
+
+        self.Outbox._cron_flush()
+        self.assertEqual(set(entries.mapped('state')), {'sent'})
+        self.assertEqual(len(self._approval_mails()), 3)
+
+    def test_digest(self):
+        """Un miembro con resumen recibe un único email por envío"""
+        self.partner.cowork_notification_digest = True
+        self.requests.action_approve()
+        self.Outbox._cron_flush()
+
+        self.assertFalse(self._approval_mails())
+        digest = self.env['mail.mail'].search([('recipient_ids', 'in', self.partner.ids),
+                                               ('subject', 'like', 'Resumen')])
+        self.assertEqual(len(digest), 1)
+        for request in self.requests:
+            self.assertIn(request.name, digest.body_html)
@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+
+from odoo.tests.common import tagged
+
+from .common import CoworkQueryCountCase
+
+
+@tagged('post_install', '-at_install')
+class TestPartnerPerformance(CoworkQueryCountCase):
+
+    def _read_list_view(self, partners):
+        """Leer los campos de cowork como lo hace la lista de contactos"""
+        return self._read_counting_queries(
+            partners, ['membership_count', 'total_credits', 'active_membership_id'])
+
+    def test_partner_list_query_count(self):
+        """El número de consultas no depende de la cantidad de contactos"""
+        small = self._create_memberships(5, credits=[2] * 5).partner_id
+        large = self._create_memberships(50, credits=[2] * 20).partner_id
+
+        small_result, small_queries = self._read_list_view(small)
+        large_result, large_queries = self._read_list_view(large)
+
+        self.assertEqual(small_queries, large_queries)
+        for row in small_result + large_result:
+            self.assertEqual(row['membership_count'], 1)
+            self.assertTrue(row['active_membership_id'])
+        self.assertEqual({row['total_credits'] for row in small_result}, {10})
+        self.assertEqual({row['total_credits'] for row in large_result}, {40})
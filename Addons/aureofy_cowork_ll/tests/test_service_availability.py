@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+
+from datetime import datetime, timedelta
+
+from odoo import fields
+from odoo.exceptions import ValidationError
+from odoo.tests.common import TransactionCase, tagged
+
+
+@tagged('post_install', '-at_install')
+class TestServiceAvailability(TransactionCase):
+
+    def setUp(self):
+        super(TestServiceAvailability, self).setUp()
+        partner = self.env['res.partner'].create({'name': 'Availability Member'})
+        plan = self.env['cowork.membership.plan'].create({'name': 'Availability Plan', 'price': 1.0})
+        self.membership = self.env['cowork.membership'].create({
+            'partner_id': partner.id,
+            'plan_id': plan.id,
+            'date_start': fields.Date.today(),
+        })
+        self.room_a, self.room_b = self.env['cowork.service'].create([
+            {'name': 'Room A', 'is_paid': True, 'service_type': 'meeting_room'},
+            {'name': 'Room B', 'is_paid': True, 'service_type': 'meeting_room'},
+        ])
+        self.day = datetime.combine(fields.Date.today() + timedelta(days=1), datetime.min.time())
+
+    def _book(self, service, hour, duration, state='pending'):
+        return self.env['cowork.access.request'].create({
+            'membership_id': self.membership.id,
+            'service_id': service.id,
+            'date_scheduled': self.day + timedelta(hours=hour),
+            'duration_hours': duration,
+            'state': state,
+        })
+
+    def test_free_intervals(self):
+        """Los huecos libres excluyen reservas vigentes y se ajustan a la rejilla"""
+        self._book(self.room_a, 13, 1.0)
+        self._book(self.room_a, 14, 1.5)
+        self._book(self.room_a, 16.25, 0.5)
+        self._book(self.room_b, 15, 1.0, state='cancelled')
+
+        start, end = self.day + timedelta(hours=12), self.day + timedelta(hours=18)
+        slots = self.env['cowork.service'].available_slots(
+            [self.room_a.id, self.room_b.id], start, end)
+        at = lambda hours: self.day + timedelta(hours=hours)
+        self.assertEqual(slots[self.room_a.id], [(at(12), at(13)), (at(15.5), at(16.25)),
+                                                 (at(16.75), at(18))])
+        self.assertEqual(slots[self.room_b.id], [(start, end)])
+
+        slots = self.env['cowork.service'].available_slots(
+            [self.room_a.id], start, end, granularity=30)
+        self.assertEqual(slots[self.room_a.id], [(at(12), at(13)), (at(15.5), at(16)),
+                                                 (at(17), at(18))])
+
+    def test_shared_capacity(self):
+        """Un servicio compartido admite reservas simultáneas hasta su capacidad"""
+        hall = self.env['cowork.service'].create({
+            'name': 'Hall', 'is_paid': True, 'service_type': 'event_hall', 'capacity': 2,
+        })
+        self._book(hall, 10, 2.0)
+        self._book(hall, 11, 2.0)
+        # A las 12 solo queda ocupada una plaza: la de las 11
+        self._book(hall, 12, 1.0)
+        with self.assertRaises(ValidationError):
+            self._book(hall, 11.5, 0.25)
+
+        at = lambda hours: self.day + timedelta(hours=hours)
+        slots = self.env['cowork.service'].available_slots([hall.id], at(9), at(14))
+        self.assertEqual(slots[hall.id], [(at(9), at(11)), (at(13), at(14))])
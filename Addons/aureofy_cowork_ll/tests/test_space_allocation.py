@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+
+from odoo import fields
+from odoo.tests.common import TransactionCase, tagged
+
+
+@tagged('post_install', '-at_install')
+class TestSpaceAllocation(TransactionCase):
+
+    def setUp(self):
+        super(TestSpaceAllocation, self).setUp()
+        self.plan = self.env['cowork.membership.plan'].create({
+            'name': 'Allocation Plan',
+            'price': 100.0,
+            'space_type': 'coworking',
+        })
+        self.small_floor, self.large_floor, self.exclusive_floor = self.env['cowork.floor'].create([
+            {'name': 'Small Floor', 'city': 'Lima'},
+            {'name': 'Large Floor', 'city': 'Lima'},
+            {'name': 'Exclusive Floor', 'city': 'Lima', 'is_exclusive': True},
+        ])
+        self.env['cowork.desk'].create(
+            [{'name': 'Small %s' % i, 'floor_id': self.small_floor.id, 'desk_type': 'hot_desk'}
+             for i in range(2)]
+            + [{'name': 'Large %s' % i, 'floor_id': self.large_floor.id, 'desk_type': 'hot_desk'}
+               for i in range(2)]
+            + [{'name': 'Large Flex %s' % i, 'floor_id': self.large_floor.id, 'desk_type': 'flexible'}
+               for i in range(2)]
+            + [{'name': 'Exclusive %s' % i, 'floor_id': self.exclusive_floor.id, 'desk_type': 'hot_desk'}
+               for i in range(6)]
+        )
+        self.Allocator = self.env['cowork.space.allocator']
+
+    def _memberships(self, partners):
+        return self.env['cowork.membership'].create([{
+            'partner_id': partner.id,
+            'plan_id': self.plan.id,
+            'date_start': fields.Date.today(),
+        } for partner in partners])
+
+    def test_team_on_same_floor(self):
+        """Un equipo se coloca en un único piso no exclusivo donde quepa completo"""
+        company = self.env['res.partner'].create({'name': 'Team Company', 'is_company': True})
+        team = self._memberships(self.env['res.partner'].create([
+            {'name': 'Team Member %s' % i, 'parent_id': company.id} for i in range(3)
+        ]))
+        self.env['crm.lead'].create([
+            {'name': 'Team Lead', 'membership_id': membership.id, 'city_preference': 'Lima'}
+            for membership in team
+        ])
+        assigned, unplaced = self.Allocator.allocate(team)
+        self.assertEqual(assigned, team)
+        self.assertFalse(unplaced)
+        self.assertEqual(team.desk_id.floor_id, self.large_floor)
+        self.assertEqual(len(team.desk_id), 3)
+
+    def test_preferences_and_report(self):
+        """Se respeta el tipo y la ciudad del lead y se informa lo que no se pudo asignar"""
+        flexible, elsewhere = self._memberships(self.env['res.partner'].create([
+            {'name': 'Flexible Member'}, {'name': 'Remote Member'},
+        ]))
+        self.env['crm.lead'].create([
+            {'name': 'Flexible Lead', 'membership_id': flexible.id, 'preferred_desk_type': 'flexible'},
+            {'name': 'Remote Lead', 'membership_id': elsewhere.id, 'city_preference': 'Cusco'},
+        ])
+        flexible.action_confirm()
+
+        assigned, unplaced = self.Allocator.allocate(flexible | elsewhere)
+        self.assertEqual(assigned, flexible)
+        self.assertEqual(flexible.desk_id.desk_type, 'flexible')
+        self.assertEqual(flexible.desk_id.membership_id, flexible)
+        self.assertTrue(self.env['cowork.space.reservation'].search(
+            [('membership_id', '=', flexible.id), ('desk_id', '=', flexible.desk_id.id)]))
+        self.assertEqual(list(unplaced), [elsewhere])
@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+
+from datetime import timedelta
+
+from psycopg2 import IntegrityError
+
+from odoo import fields
+from odoo.exceptions import ValidationError
+from odoo.tests.common import TransactionCase, tagged
+from odoo.tools import mute_logger
+
+
+@tagged('post_install', '-at_install')
+class TestSpaceReservation(TransactionCase):
+
+    def setUp(self):
+        super(TestSpaceReservation, self).setUp()
+        self.today = fields.Date.today()
+        self.plan = self.env['cowork.membership.plan'].create({
+            'name': 'Reservation Plan',
+            'price': 100.0,
+            'duration_type': 'monthly',
+        })
+        floor = self.env['cowork.floor'].create({'name': 'Reservation Floor', 'city': 'Lima'})
+        self.desk, self.other_desk = self.env['cowork.desk'].create([
+            {'name': 'Reservation Desk', 'floor_id': floor.id, 'desk_type': 'hot_desk'},
+            {'name': 'Other Desk', 'floor_id': floor.id, 'desk_type': 'flexible'},
+        ])
+        self.partners = self.env['res.partner'].create([
+            {'name': 'Reservation Member %s' % i} for i in range(3)
+        ])
+
+    def _membership(self, partner, date_start):
+        return self.env['cowork.membership'].create({
+            'partner_id': partner.id,
+            'plan_id': self.plan.id,
+            'desk_id': self.desk.id,
+            'date_start': date_start,
+        })
+
+    def test_sell_desk_that_frees_up(self):
+        """Un escritorio ocupado se puede vender para cuando quede libre"""
+        current = self._membership(self.partners[0], self.today)
+        current.action_confirm()
+        current.action_activate()
+        free_from = current.date_end
+
+        Desk = self.env['cowork.desk']
+        self.assertNotIn(self.desk, Desk.search_available('hot_desk', 'Lima', self.today, free_from))
+        self.assertIn(self.desk, Desk.search_available('hot_desk', 'Lima', free_from,
+                                                       free_from + timedelta(days=30)))
+        self.assertNotIn(self.other_desk, Desk.search_available('hot_desk', 'Lima', free_from))
+
+        following = self._membership(self.partners[1], free_from)
+        following.action_confirm()
+        self.assertEqual(self.desk.membership_id, current)
+        self.assertEqual(self.desk.state, 'occupied')
+
+        overlapping = self._membership(self.partners[2], free_from - timedelta(days=1))
+        with self.assertRaises(ValidationError), self.cr.savepoint():
+            overlapping.action_confirm()
+
+        # Al expirar queda libre; pasa a la siguiente membresía cuando empieza su reserva
+        current.action_expire()
+        self.assertFalse(self.desk.membership_id)
+        self.assertEqual(self.desk.state, 'available')
+
+        Reservation = self.env['cowork.space.reservation']
+        Reservation._cron_hand_over(date=free_from)
+        self.assertEqual(self.desk.membership_id, following)
+        self.assertEqual(self.desk.member_id, self.partners[1])
+        self.assertEqual(self.desk.state, 'reserved')
+
+    def test_cancel_frees_dates(self):
+        """Cancelar una membresía libera sus fechas para otra"""
+        first = self._membership(self.partners[0], self.today + timedelta(days=10))
+        first.action_confirm()
+        first.action_cancel()
+        reservation = self.env['cowork.space.reservation'].search([('membership_id', '=', first.id)])
+        self.assertEqual(reservation.state, 'cancelled')
+
+        second = self._membership(self.partners[1], self.today + timedelta(days=10))
+        second.action_confirm()
+        # El escritorio no se asigna hasta que empieza la membresía
+        self.assertFalse(self.desk.membership_id)
+        self.env['cowork.space.reservation']._cron_hand_over(date=self.today + timedelta(days=10))
+        self.assertEqual(self.desk.membership_id, second)
+
+    def test_future_reservation_does_not_block_current_sale(self):
+        """Una reserva futura no impide vender y ocupar el escritorio en las semanas previas"""
+        future = self._membership(self.partners[0], self.today + timedelta(days=40))
+        future.action_confirm()
+        self.assertFalse(self.desk.membership_id)
+        self.assertEqual(self.desk.state, 'available')
+
+        self.assertIn(self.desk, self.env['cowork.desk'].search_available(
+            'hot_desk', 'Lima', self.today, self.today + timedelta(days=30)))
+        current = self._membership(self.partners[1], self.today)
+        current.action_confirm()
+        current.action_activate()
+        self.assertEqual(self.desk.membership_id, current)
+        self.assertEqual(self.desk.state, 'occupied')
+
+    def test_overlap_is_excluded_in_database(self):
+        """La base rechaza una reserva solapada aunque no pase por la comprobación previa"""
+        first = self._membership(self.partners[0], self.today + timedelta(days=5))
+        first.action_confirm()
+        second = self._membership(self.partners[1], self.today + timedelta(days=10))
+        with self.assertRaises(IntegrityError), mute_logger('odoo.sql_db'), self.cr.savepoint():
+            self.env['cowork.space.reservation'].create({
+                'membership_id': second.id,
+                'desk_id': self.desk.id,
+                'date_start': second.date_start,
+            })
+
+    def test_change_desk_moves_reservation(self):
+        """Cambiar el escritorio de una membresía vigente mueve su reserva y libera el anterior"""
+        current = self._membership(self.partners[0], self.today)
+        current.action_confirm()
+        current.action_activate()
+
+        current.desk_id = self.other_desk
+        Reservation = self.env['cowork.space.reservation']
+        reservation = Reservation.search([('membership_id', '=', current.id),
+                                          ('state', '=', 'confirmed')])
+        self.assertEqual(reservation.desk_id, self.other_desk)
+        self.assertEqual(self.other_desk.membership_id, current)
+        self.assertEqual(self.other_desk.state, 'occupied')
+        self.assertFalse(self.desk.membership_id)
+        self.assertEqual(self.desk.state, 'available')
+
+        following = self._membership(self.partners[1], self.today)
+        following.action_confirm()
+        self.assertEqual(self.desk.membership_id, following)
+
+        with self.assertRaises(ValidationError), self.cr.savepoint():
+            current.desk_id = self.desk
+        self.assertEqual(current.desk_id, self.other_desk)
@@ -3,3 +3,6 @@
 from . import mass_mail_wizard
 from . import member_card_wizard
 from . import cowork_sell_credit_package
+from . import cowork_grant_bulk_wizard
+from . import cowork_renew_batch_wizard
+from . import cowork_allocate_spaces_wizard
@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+
+from odoo import models, fields, api, _
+
+
+class CoworkAllocateSpacesWizard(models.TransientModel):
+    _name = 'cowork.allocate.spaces.wizard'
+    _description = 'Asistente de Asignación Automática de Espacios'
+
+    membership_ids = fields.Many2many('cowork.membership', string='Membresías', required=True,
+                                       domain=[('state', 'in', ('draft', 'confirmed'))])
+    state = fields.Selection([
+        ('draft', 'Borrador'),
+        ('done', 'Realizada'),
+    ], default='draft')
+    assigned_count = fields.Integer(string='Membresías Asignadas', readonly=True)
+    unplaced_ids = fields.Many2many('cowork.membership', 'cowork_allocate_spaces_unplaced_rel',
+                                    'wizard_id', 'membership_id', string='Sin Asignar', readonly=True)
+    unplaced_note = fields.Text(string='Motivos', readonly=True)
+
+    @api.model
+    def default_get(self, fields_list):
+        res = super().default_get(fields_list)
+        active_ids = self._context.get('active_ids', [])
+        if active_ids and self._context.get('active_model') == 'cowork.membership':
+            res['membership_ids'] = [(6, 0, active_ids)]
+        return res
+
+    def action_allocate(self):
+        """Asignar espacios a las membresías seleccionadas y mostrar las no asignadas"""
+        self.ensure_one()
+        assigned, unplaced = self.env['cowork.space.allocator'].allocate(self.membership_ids)
+        self.write({
+            'state': 'done',
+            'assigned_count': len(assigned),
+            'unplaced_ids': [(6, 0, [membership.id for membership in unplaced])],
+            'unplaced_note': '\n'.join('%s: %s' % (membership.display_name, reason)
+                                       for membership, reason in unplaced.items()),
+        })
+        return {
+            'type': 'ir.actions.act_window',
+            'name': _('Asignación de Espacios'),
+            'res_model': self._name,
+            'res_id': self.id,
+            'view_mode': 'form',
+            'target': 'new',
+        }
@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+
+from odoo import models, fields, api, _
+from odoo.exceptions import UserError
+
+
+class CoworkGrantBulkWizard(models.TransientModel):
+    _name = 'cowork.grant.bulk.wizard'
+    _description = 'Asistente de Otorgamiento Masivo de Créditos y Pases'
+
+    partner_ids = fields.Many2many('res.partner', string='Miembros', required=True,
+                                    domain=[('is_cowork_member', '=', True)])
+    grant_type = fields.Selection([
+        ('credits', 'Créditos'),
+        ('passes', 'Pases'),
+    ], string='Otorgar', required=True, default='credits')
+    amount = fields.Integer(string='Cantidad por Miembro', required=True, default=1)
+    credits_type = fields.Selection([
+        ('bonus', 'Bonificación'),
+        ('granted', 'Otorgados por Plan'),
+        ('refund', 'Reembolso'),
+    ], string='Tipo de Crédito', default='bonus')
+    pass_type = fields.Selection([
+        ('bonus', 'Bonificación'),
+        ('granted', 'Otorgados por Plan'),
+        ('refund', 'Reembolso'),
+    ], string='Tipo de Pase', default='bonus')
+    date_expiration = fields.Date(string='Fecha de Vencimiento')
+    description = fields.Char(string='Descripción')
+
+    @api.model
+    def default_get(self, fields_list):
+        res = super().default_get(fields_list)
+        active_ids = self._context.get('active_ids', [])
+        if active_ids and self._context.get('active_model') == 'res.partner':
+            res['partner_ids'] = [(6, 0, active_ids)]
+        elif active_ids and self._context.get('active_model') == 'cowork.membership':
+            memberships = self.env['cowork.membership'].browse(active_ids)
+            res['partner_ids'] = [(6, 0, memberships.partner_id.ids)]
+        return res
+
+    def action_grant(self):
+        """Otorgar créditos o pases a todos los miembros seleccionados"""
+        self.ensure_one()
+        if self.amount <= 0:
+            raise UserError(_('La cantidad a otorgar debe ser mayor que cero.'))
+
+        if self.grant_type == 'credits':
+            records = self.env['cowork.credits'].grant_bulk(
+                self.partner_ids.ids, self.amount,
+                credits_type=self.credits_type,
+                date_expiration=self.date_expiration,
+                description=self.description,
+            )
+        else:
+            records = self.env['cowork.passes'].grant_bulk(
+                self.partner_ids.ids, self.amount,
+                pass_type=self.pass_type,
+                description=self.description,
+            )
+
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'title': _('Éxito'),
+                'message': _('Otorgamiento registrado para %s miembros.') % len(records),
+                'type': 'success',
+                'sticky': False,
+                'next': {'type': 'ir.actions.act_window_close'},
+            }
+        }
@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+
+from odoo import models, fields, api, _
+
+
+class CoworkRenewBatchWizard(models.TransientModel):
+    _name = 'cowork.renew.batch.wizard'
+    _description = 'Asistente de Renovación Masiva de Membresías'
+
+    membership_ids = fields.Many2many('cowork.membership', string='Membresías', required=True,
+                                       domain=[('state', 'in', ('confirmed', 'active', 'expired'))])
+    confirm = fields.Boolean(string='Confirmar Renovaciones', default=False,
+                              help='Confirmar las nuevas membresías y otorgar sus beneficios')
+    create_sale_orders = fields.Boolean(string='Crear Órdenes de Venta', default=False)
+
+    @api.model
+    def default_get(self, fields_list):
+        res = super().default_get(fields_list)
+        active_ids = self._context.get('active_ids', [])
+        if active_ids and self._context.get('active_model') == 'cowork.membership':
+            res['membership_ids'] = [(6, 0, active_ids)]
+        return res
+
+    def action_renew(self):
+        """Renovar todas las membresías seleccionadas"""
+        self.ensure_one()
+        renewals = self.membership_ids._bulk()._renew_batch(
+            confirm=self.confirm,
+            create_sale_orders=self.create_sale_orders,
+        )
+        renewals._post_bulk_summary(_('Renovación masiva: %s membresías creadas') % len(renewals))
+        return {
+            'type': 'ir.actions.act_window',
+            'name': _('Membresías Renovadas'),
+            'res_model': 'cowork.membership',
+            'view_mode': 'tree,form',
+            'domain': [('id', 'in', renewals.ids)],
+        }